@@ -6,17 +6,32 @@ import traceback
 import subprocess
 import os
 import json
+from collections import deque
 import psutil
 import win32file
 import win32pipe
 import pywintypes
 import argparse
-from signalrcore.hub_connection_builder import HubConnectionBuilder
+from omni_hub_client import HubClient
+from omni_hub_journal import OutboundJournal
+from omni_hub_endpoints import hub_urls
+from ai_session_health import SessionHealth, probe_session, gemini_pipe_path
+from ai_transcript_store import TranscriptStore
+from ai_response_blocks import BLOCKS_VERSION, render_blocks
 
 # --- CONFIGURATION ---
-HUB_URL = "http://127.0.0.1:5000/signalrhub"
+HUB_URL = hub_urls()   # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
 API_KEY = "test_api_key"
 GEMINI_CLI_DIR = r"D:\\SSDProjects\\Tools\\gemini-cli"
+TRANSCRIPT_DIR = os.path.join(os.getcwd(), "ai_transcripts")
+LEASE_SECONDS = 30         # How long a claimed AI message stays ours without renewal
+CLAIM_BACKOFF = 0.75       # Head start given to the listener that owns the target session
+WORK_WATCH_SECONDS = 600   # How long a losing listener keeps watching a message in case its owner dies
+PROBE_INTERVAL = 15        # Seconds between health probes of idle Gemini sessions
+RENDER_BLOCKS = False      # Also send pre-parsed response blocks for the phone (--blocks)
+HEDGE_DELAY = None         # Seconds without a first chunk before a prompt is raced on a second session (--hedge-delay)
+RESPONSE_TTL = 3600        # How long an undelivered AI response is kept for replay after a hub restart
+HUB_COMMAND_TTL = 30       # AI-issued hub commands are only worth replaying shortly after they were made
 # ---------------------
 
 # Configure logging
@@ -31,10 +46,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger("AIListener")
 
-connection_started = False
 hub = None
 GLOBAL_LOOP = None
 TARGET_PID = None
+OWNED_PID = None          # Gemini PID this listener was launched for (--pid)
+WATCHED_WORK = {}         # messageId -> asyncio.Event, woken when the work is released or completed
+COMPLETED_WORK = set()
+BUSY_PIDS = set()         # Gemini PIDs with a pipe turn in flight from this listener
+DRAINING = set()          # Losing hedge turns still running; referenced so they aren't collected
+SESSION_HEALTH = SessionHealth()
+TRANSCRIPTS = None        # TranscriptStore, opened in main()
 
 def get_all_gemini_pids():
     """Finds all PIDs of Gemini CLI processes."""
@@ -51,28 +72,73 @@ def get_all_gemini_pids():
             pass
     return pids
 
-async def handle_get_sessions(args):
+def listener_owned_pids():
+    """Gemini PIDs that other ai_listener instances were launched for (--pid)."""
+    pids = set()
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        try:
+            cmdline = proc.info['cmdline'] or []
+            if proc.info['pid'] == os.getpid() or not any('ai_listener.py' in part for part in cmdline):
+                continue
+            for i, part in enumerate(cmdline):
+                value = cmdline[i + 1] if part == '--pid' and i + 1 < len(cmdline) else part[6:] if part.startswith('--pid=') else None
+                if value and value.isdigit():
+                    pids.add(int(value))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return pids
+
+async def handle_get_sessions():
     pids = get_all_gemini_pids()
     logger.info(f"Discovery found PIDs: {pids}")
-    hub.send("ReceiveAiSessions", [pids])
+    await hub.send("ReceiveAiSessions", pids)
+
+def session_key(pid):
+    """Transcript key for a Gemini process; includes its start time because PIDs get reused."""
+    try:
+        return f"{pid}-{int(psutil.Process(pid).create_time())}"
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return str(pid)
+
+def record_transcript(pid, role, text, **extra):
+    try:
+        TRANSCRIPTS.append(session_key(pid), role, text, **extra)
+    except Exception as e:
+        logger.error(f"Failed to record transcript: {e}")
+
+def compact_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+async def send_history_blocks(history, records):
+    """Sends block layouts aligned with a history list, reusing blocks cached in the transcript."""
+    cached = {r["text"]: r["blocks"] for r in records if r.get("blocks_v") == BLOCKS_VERSION}
+    blocks = [cached.get(entry.get("text", "")) or render_blocks(entry.get("text", "")) for entry in history]
+    await hub.send("SendAiHistoryBlocks", compact_json(blocks))
 
-async def handle_switch_session(args):
+async def handle_switch_session(pid):
     global TARGET_PID
-    pid = args[0]
     TARGET_PID = pid
     logger.info(f"Switched to Gemini PID: {pid}")
+
+    # Show what we already recorded right away; the CLI's own history replaces it when it arrives
+    records = await asyncio.to_thread(TRANSCRIPTS.records, session_key(pid))
+    if records:
+        stored = [{"sender": r["role"], "text": r["text"]} for r in records]
+        await hub.send("ReceiveAiHistory", json.dumps(stored))
+        if RENDER_BLOCKS:
+            await send_history_blocks(stored, records)
     
     # Fetch history for the new session
     history_resp = await asyncio.to_thread(sync_pipe_comm, pid, "", "getHistory")
     if history_resp.startswith("[HISTORY_DATA]"):
         history_json = history_resp[len("[HISTORY_DATA]"):]
-        hub.send("ReceiveAiHistory", [history_json])
-
-def on_get_sessions(args):
-    asyncio.run_coroutine_threadsafe(handle_get_sessions(args), GLOBAL_LOOP)
+        await hub.send("ReceiveAiHistory", history_json)
+        if RENDER_BLOCKS:
+            try:
+                await send_history_blocks(json.loads(history_json), records)
+            except (ValueError, AttributeError) as e:
+                logger.error(f"Failed to render history blocks: {e}")
 
-def on_switch_session(args):
-    asyncio.run_coroutine_threadsafe(handle_switch_session(args), GLOBAL_LOOP)
 
 def get_gemini_pid():
     """Finds the PID of the Gemini CLI process, prioritizing local development versions."""
@@ -116,13 +182,19 @@ def get_gemini_pid():
         logger.warning(f"Using fallback dist process: PID {fallback_pid}")
     return fallback_pid
 
-def sync_pipe_comm(pid, command_text, command_type="prompt"):
-    """Synchronous part of pipe communication to be run in a thread."""
-    pipe_path = f"\\\\.\\pipe\\gemini-cli-{pid}"
+def sync_pipe_comm(pid, command_text, command_type="prompt", on_first_chunk=None):
+    """Synchronous part of pipe communication to be run in a thread.
+
+    on_first_chunk is called once when the first response text arrives.
+    """
+    pipe_path = gemini_pipe_path(pid)
     logger.info(f"Connecting to pipe: {pipe_path} for {command_type}")
     
     handle = None
     for i in range(10):
+        if not psutil.pid_exists(pid):
+            logger.error(f"Gemini PID {pid} is not running.")
+            return f"Error: Gemini PID {pid} is not running."
         try:
             handle = win32file.CreateFile(
                 pipe_path,
@@ -181,6 +253,8 @@ def sync_pipe_comm(pid, command_text, command_type="prompt"):
                             elif text == '[Command Handled]':
                                 pass
                             else:
+                                if on_first_chunk and not full_text:
+                                    on_first_chunk()
                                 full_text += text + "\n"
                     except json.JSONDecodeError:
                         continue
@@ -198,10 +272,16 @@ def sync_pipe_comm(pid, command_text, command_type="prompt"):
 async def send_remote_command(command_text):
     global TARGET_PID
     pid = TARGET_PID if TARGET_PID else get_gemini_pid()
+
+    if pid and not SESSION_HEALTH.allow(pid):
+        # Route around a session whose circuit is open instead of waiting on it
+        fallback = next((p for p in get_all_gemini_pids() if p != pid and SESSION_HEALTH.allow(p)), None)
+        logger.warning(f"Gemini PID {pid} is unhealthy, routing to {fallback or 'a new session'}")
+        pid = fallback
     
     if not pid:
         logger.info("No Gemini CLI found. Auto-starting new session...")
-        hub.send("SendAiStatus", ["Starting Gemini..."])
+        await hub.send("SendAiStatus", "Starting Gemini...")
         
         # Launch Gemini CLI
         launch_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "launch_gemini_cli.py")
@@ -218,22 +298,158 @@ async def send_remote_command(command_text):
             if pid:
                 logger.info(f"Gemini started with PID: {pid}")
                 TARGET_PID = pid
-                hub.send("SendAiStatus", ["Thinking..."])
+                await hub.send("SendAiStatus", "Thinking...")
                 break
         
         if not pid:
-            return "Error: Failed to auto-start Gemini CLI."
+            return None, "Error: Failed to auto-start Gemini CLI."
 
-    # Run synchronous pipe I/O in a separate thread to avoid blocking the event loop
-    return await asyncio.to_thread(sync_pipe_comm, pid, command_text)
+    if HEDGE_DELAY is not None and not command_text.startswith('/'):
+        # Slash commands mutate session state and must only ever reach the selected session
+        return await send_hedged_command(pid, command_text)
+    return pid, await run_pipe_turn(pid, command_text)
 
-async def handle_and_reply(message):
+async def run_pipe_turn(pid, command_text, on_first_chunk=None):
+    BUSY_PIDS.add(pid)
+    response = None
     try:
-        hub.send("SendAiStatus", ["Thinking..."])
+        # Run synchronous pipe I/O in a separate thread to avoid blocking the event loop
+        response = await asyncio.to_thread(sync_pipe_comm, pid, command_text, "prompt", on_first_chunk)
+        return response
+    finally:
+        BUSY_PIDS.discard(pid)
+        if response is None:
+            SESSION_HEALTH.release(pid)
+        else:
+            record_session_health(pid, not is_failed_response(response))
+
+def record_session_health(pid, healthy):
+    was_state, state = SESSION_HEALTH.record(pid, healthy)
+    if was_state != state:
+        logger.info(f"Gemini PID {pid} circuit {was_state} -> {state}")
+
+async def health_probe_loop():
+    """Probes idle sessions so dead ones are routed around and recovered ones come back."""
+    while True:
+        try:
+            pids = await asyncio.to_thread(get_all_gemini_pids)
+            SESSION_HEALTH.forget_missing(pids)
+            for pid in pids:
+                # A turn in flight reports its own outcome; open breakers wait for their cool-down
+                if pid in BUSY_PIDS or not SESSION_HEALTH.allow(pid):
+                    continue
+                record_session_health(pid, await asyncio.to_thread(probe_session, pid))
+        except Exception as e:
+            logger.error(f"Health probe failed: {e}")
+        await asyncio.sleep(PROBE_INTERVAL)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class HedgeStats:
+    """Tracks what hedging buys (latency) and what it costs (extra model turns)."""
+
+    def __init__(self, window=500):
+        self.latencies = deque(maxlen=window)
+        # Latency the primary session alone would have had
+        self.primary_latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, latency, primary_latency, hedged, hedge_won):
+        self.requests += 1
+        self.hedges += int(hedged)
+        self.hedge_wins += int(hedge_won)
+        self.latencies.append(latency)
+        self.primary_latencies.append(primary_latency)
+
+    def summary(self):
+        return (f"hedged p50={percentile(self.latencies, 0.5):.2f}s p99={percentile(self.latencies, 0.99):.2f}s | "
+                f"primary-only p50={percentile(self.primary_latencies, 0.5):.2f}s p99={percentile(self.primary_latencies, 0.99):.2f}s | "
+                f"extra turns {self.hedges}/{self.requests} ({self.hedges / max(1, self.requests):.0%}), hedge wins {self.hedge_wins}")
+
+HEDGE_STATS = HedgeStats()
+
+def is_failed_response(response):
+    return not response or response.startswith("Error:")
+
+async def send_hedged_command(pid, command_text):
+    """Runs the prompt on pid and races it on an idle session if no first chunk arrives within HEDGE_DELAY."""
+    start = time.monotonic()
+    first_chunk = asyncio.Event()
+    primary = asyncio.create_task(run_pipe_turn(
+        pid, command_text, lambda: GLOBAL_LOOP.call_soon_threadsafe(first_chunk.set)))
+    first_chunk_wait = asyncio.create_task(first_chunk.wait())
+
+    await asyncio.wait({primary, first_chunk_wait}, timeout=HEDGE_DELAY, return_when=asyncio.FIRST_COMPLETED)
+    first_chunk_wait.cancel()
+
+    # Sessions other listeners were launched for are someone's working sessions; never hedge into those
+    claimed = await asyncio.to_thread(listener_owned_pids)
+    idle_pids = [p for p in get_all_gemini_pids()
+                 if p != pid and p not in BUSY_PIDS and p not in claimed and SESSION_HEALTH.available(p)]
+    if primary.done() or first_chunk.is_set() or not idle_pids or not SESSION_HEALTH.allow(idle_pids[0]):
+        response = await primary
+        latency = time.monotonic() - start
+        HEDGE_STATS.record(latency, latency, False, False)
+        return pid, response
+
+    hedge_pid = idle_pids[0]
+    logger.info(f"No first chunk from PID {pid} after {HEDGE_DELAY}s, hedging on PID {hedge_pid}")
+    hedge = asyncio.create_task(run_pipe_turn(hedge_pid, command_text))
+
+    pending = {primary, hedge}
+    winner = None
+    while pending and (winner is None or is_failed_response(winner.result())):
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        # Prefer a successful answer when both finish in the same iteration
+        winner = min(done, key=lambda task: is_failed_response(task.result()))
+
+    latency = time.monotonic() - start
+    hedge_won = winner is hedge
+
+    def record(primary_latency):
+        HEDGE_STATS.record(latency, primary_latency, True, hedge_won)
+        logger.info(f"Hedge result: {'PID ' + str(hedge_pid) if hedge_won else 'primary'} won. {HEDGE_STATS.summary()}")
+
+    # The losing CLI keeps running its turn regardless, so its reply is drained in the background
+    # and discarded; its session stays in BUSY_PIDS until then, so nothing else is sent into it.
+    for task in pending:
+        DRAINING.add(task)
+        task.add_done_callback(DRAINING.discard)
+    if primary in pending:
+        # Also times the no-hedge baseline
+        primary.add_done_callback(lambda _: record(time.monotonic() - start))
+    else:
+        record(latency)
+    return (hedge_pid if hedge_won else pid), winner.result()
+
+async def handle_and_reply(message, lease_lost=None):
+    try:
+        await hub.send("SendAiStatus", "Thinking...")
     except Exception as e:
         logger.error(f"Error sending status to hub: {e}")
 
-    response = await send_remote_command(message)
+    pid, response = await send_remote_command(message)
+    if lease_lost and lease_lost.is_set():
+        logger.warning("Lease lost during the turn; dropping the reply so the message isn't answered twice.")
+        try:
+            await hub.send("SendAiStatus", None)
+        except Exception as e:
+            logger.error(f"Error sending status to hub: {e}")
+        return
+
+    blocks = render_blocks(response) if RENDER_BLOCKS and response else None
+    if pid and not is_failed_response(response):
+        await asyncio.to_thread(record_transcript, pid, "User", message)
+        if blocks:
+            await asyncio.to_thread(record_transcript, pid, "AI", response, blocks=blocks, blocks_v=BLOCKS_VERSION)
+        else:
+            await asyncio.to_thread(record_transcript, pid, "AI", response)
     
     if response:
         if "HUB_COMMAND:" in response:
@@ -250,44 +466,105 @@ async def handle_and_reply(message):
                 
                 if cmd_name:
                     logger.info(f"Forwarding AI Hub Command: {cmd_name}")
-                    hub.send("SendAiHubCommand", [cmd_name, cmd_payload])
+                    await hub.send("SendAiHubCommand", cmd_name, cmd_payload, durable=True, ttl=HUB_COMMAND_TTL)
             except Exception as e:
                 logger.error(f"Failed to parse AI Hub Command: {e}")
 
         try:
-            hub.send("SendAiResponse", [response])
-            hub.send("SendAiStatus", [None]) 
+            await hub.send("SendAiResponse", response, durable=True, ttl=RESPONSE_TTL)
+            if blocks:
+                await hub.send("SendAiResponseBlocks", compact_json(blocks), durable=True, ttl=RESPONSE_TTL)
+            await hub.send("SendAiStatus", None) 
         except Exception as e:
             logger.error(f"Error sending response to hub: {e}")
     else:
         try:
-            hub.send("SendAiStatus", [None]) 
+            await hub.send("SendAiStatus", None) 
         except: pass
 
-def on_ai_message(args):
+async def try_claim_work(message_id):
     try:
-        sender_id, message = args
-        our_id = getattr(hub.transport, 'connection_id', None)
-        if our_id and sender_id == our_id:
-            return 
-            
-        logger.info(f"Received AI Message: {message[:50]}...")
-        asyncio.run_coroutine_threadsafe(handle_and_reply(message), GLOBAL_LOOP)
+        return bool(await hub.invoke("ClaimAiWork", message_id, LEASE_SECONDS, timeout=5))
     except Exception as e:
-        logger.error(f"Error in on_ai_message callback: {e}")
+        logger.warning(f"Claim of AI work {message_id} failed: {e}")
+        return False
+
+async def renew_work_lease(message_id, lease_lost):
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        try:
+            if not await hub.invoke("RenewAiWork", message_id, LEASE_SECONDS, timeout=5):
+                # Expired, so another listener may have claimed it and be answering it already
+                logger.warning(f"Lost lease on AI work {message_id}")
+                lease_lost.set()
+                return
+        except Exception as e:
+            logger.warning(f"Lease renewal for {message_id} failed: {e}")
+
+async def claim_and_handle(message_id, message, target_pid):
+    """Competes for a broadcast AI message; only the listener holding the lease runs the turn."""
+    if target_pid and target_pid != OWNED_PID and target_pid in await asyncio.to_thread(listener_owned_pids):
+        # Let the listener that owns the target session win
+        await asyncio.sleep(CLAIM_BACKOFF)
+
+    woken = asyncio.Event()
+    WATCHED_WORK[message_id] = woken
+    try:
+        deadline = GLOBAL_LOOP.time() + WORK_WATCH_SECONDS
+        while True:
+            if message_id in COMPLETED_WORK or GLOBAL_LOOP.time() > deadline:
+                return
+            if await try_claim_work(message_id):
+                break
+            # Someone else holds it; retry once it is released or its lease could have expired
+            woken.clear()
+            try:
+                await asyncio.wait_for(woken.wait(), timeout=LEASE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        WATCHED_WORK.pop(message_id, None)
+
+    logger.info(f"Claimed AI work {message_id}")
+    lease_lost = asyncio.Event()
+    renew_task = asyncio.create_task(renew_work_lease(message_id, lease_lost))
+    try:
+        await handle_and_reply(message, lease_lost)
+    finally:
+        renew_task.cancel()
+        if not lease_lost.is_set():   # Otherwise no longer ours to complete
+            try:
+                await hub.send("CompleteAiWork", message_id, durable=True, ttl=WORK_WATCH_SECONDS)
+            except Exception as e:
+                logger.error(f"Error completing AI work {message_id}: {e}")
+
+def _wake_work_watcher(message_id, completed):
+    if completed:
+        COMPLETED_WORK.add(message_id)
+        if len(COMPLETED_WORK) > 1000:
+            COMPLETED_WORK.clear()
+    woken = WATCHED_WORK.get(message_id)
+    if woken:
+        woken.set()
+
+def on_ai_work_item(message_id, sender_id, message, target_pid):
+    if hub.connection_id and sender_id == hub.connection_id:
+        return
+
+    logger.info(f"Received AI Message {message_id}: {message[:50]}...")
+    asyncio.create_task(claim_and_handle(message_id, message, target_pid))
+
+def on_ai_work_released(message_id):
+    _wake_work_watcher(message_id, False)
+
+def on_ai_work_completed(message_id):
+    _wake_work_watcher(message_id, True)
 
 def on_close():
-    global connection_started
     logger.info("Connection closed.")
-    connection_started = False
 
 def on_open():
-    global connection_started
     logger.info("Connection opened.")
-    connection_started = True
-
-def on_error(error):
-    logger.error(f"Connection error: {error}")
 
 async def main():
     global hub, GLOBAL_LOOP
@@ -295,38 +572,37 @@ async def main():
 
     parser = argparse.ArgumentParser(description="AI Listener for OmniSync")
     parser.add_argument("--pid", type=int, help="Specific Gemini PID to target")
+    parser.add_argument("--blocks", action="store_true", help="Send pre-parsed response blocks alongside the markdown text")
+    parser.add_argument("--hedge-delay", type=float, help="Race prompts on a second idle session if the first chunk takes longer than this many seconds")
     args = parser.parse_args()
     
-    global TARGET_PID
+    global TARGET_PID, OWNED_PID, HEDGE_DELAY, TRANSCRIPTS, RENDER_BLOCKS
+    TRANSCRIPTS = TranscriptStore(TRANSCRIPT_DIR)
+    RENDER_BLOCKS = args.blocks
+    if args.hedge_delay is not None:
+        HEDGE_DELAY = args.hedge_delay
+        logger.info(f"Hedging enabled after {HEDGE_DELAY}s without a first chunk")
     if args.pid:
         TARGET_PID = args.pid
+        OWNED_PID = args.pid
         logger.info(f"Initial target Gemini PID: {TARGET_PID}")
 
-    hub = HubConnectionBuilder()\
-        .with_url(HUB_URL)\
-        .configure_logging(logging.INFO)\
-        .with_automatic_reconnect({
-            "type": "raw",
-            "keep_alive_interval": 10,
-            "reconnect_interval": 5,
-            "max_attempts": 999
-        }).build()
-
-    hub.on("ReceiveAiMessage", on_ai_message)
-    hub.on("RequestAiSessions", on_get_sessions)
-    hub.on("SwitchAiSession", on_switch_session)
-    hub.on_close(on_close) 
-    hub.on_open(on_open)   
-    hub.on_error(on_error) 
-
-    logger.info(f"Connecting to {HUB_URL}...")
-    hub.start()
-
-    while not connection_started:
-        await asyncio.sleep(0.5)
-    
-    hub.send("Authenticate", [API_KEY])
+    # Responses computed while the hub is restarting are journaled and delivered once it is back
+    outbox = OutboundJournal(os.path.join(TRANSCRIPT_DIR, f"outbox-{OWNED_PID or 'default'}.journal"), default_ttl=RESPONSE_TTL)
+    hub = HubClient(HUB_URL, api_key=API_KEY, keep_alive_interval=10, journal=outbox)
+
+    hub.on("ReceiveAiWorkItem", on_ai_work_item)
+    hub.on("AiWorkReleased", on_ai_work_released)
+    hub.on("AiWorkCompleted", on_ai_work_completed)
+    hub.on("RequestAiSessions", handle_get_sessions)
+    hub.on("SwitchAiSession", handle_switch_session)
+    hub.on_close(on_close)
+    hub.on_open(on_open)
+
+    logger.info(f"Connecting to {', '.join(HUB_URL)}...")
+    await hub.start()
     logger.info("Authenticated. Listening for AI messages via Named Pipe Hook.")
+    asyncio.create_task(health_probe_loop())
 
     while True:
         await asyncio.sleep(1)
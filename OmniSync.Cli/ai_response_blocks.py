@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Pre-parses AI markdown replies into a compact, versioned block structure.
+
+The listener computes this once per reply so the phone can lay out long answers
+without parsing markdown on its UI thread. Format (version 1), serialized as JSON:
+
+    {"v": 1, "blocks": [block, ...]}
+
+    {"t": "h", "l": level, "s": spans}            heading
+    {"t": "p", "s": spans}                        paragraph (soft line breaks kept as "\\n")
+    {"t": "code", "lang": "py", "text": "..."}    fenced code block
+    {"t": "ul", "items": [[depth, spans], ...]}   bullet list
+    {"t": "ol", "start": 1, "items": [...]}       numbered list
+    {"t": "quote", "s": spans}                    block quote
+    {"t": "hr"}                                   horizontal rule
+
+A span is a plain string when unstyled, otherwise [text, style] or [text, style, url]
+where style is a bitmask of STYLE_BOLD, STYLE_ITALIC, STYLE_CODE and STYLE_LINK.
+"""
+import re
+import sys
+import json
+
+BLOCKS_VERSION = 1
+
+STYLE_BOLD = 1
+STYLE_ITALIC = 2
+STYLE_CODE = 4
+STYLE_LINK = 8
+
+FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*([\w+#.-]*)')
+HEADING_RE = re.compile(r'^\s*(#{1,6})\s+(.*?)\s*#*\s*$')
+HR_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+ULIST_RE = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+OLIST_RE = re.compile(r'^(\s*)(\d+)[.)]\s+(.*)$')
+QUOTE_RE = re.compile(r'^\s*>\s?(.*)$')
+INLINE_RE = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\[(?P<ltext>[^\]]+)\]\((?P<lurl>[^)\s]+)\)'
+    r'|<(?P<auto>https?://[^>\s]+)>'
+    r'|(?P<bare>https?://[^\s<>()\[\]]+[^\s<>()\[\].,;:!?\'"])'
+    r'|\*\*(?P<b1>.+?)\*\*|__(?P<b2>.+?)__'
+    r'|\*(?P<i1>[^*\s](?:[^*]*[^*\s])?)\*'
+    r'|(?<!\w)_(?P<i2>[^_\s](?:[^_]*[^_\s])?)_(?!\w)'
+)
+
+def _span(text, style, url=None):
+    if url:
+        return [text, style, url]
+    return [text, style] if style else text
+
+def parse_inline(text, style=0, spans=None):
+    """Splits inline markdown into spans."""
+    spans = [] if spans is None else spans
+    pos = 0
+    for match in INLINE_RE.finditer(text):
+        if match.start() > pos:
+            spans.append(_span(text[pos:match.start()], style))
+        groups = match.groupdict()
+        if groups["code"] is not None:
+            spans.append(_span(groups["code"], style | STYLE_CODE))
+        elif groups["ltext"] is not None:
+            spans.append(_span(groups["ltext"], style | STYLE_LINK, groups["lurl"]))
+        elif groups["auto"] or groups["bare"]:
+            url = groups["auto"] or groups["bare"]
+            spans.append(_span(url, style | STYLE_LINK, url))
+        elif groups["b1"] is not None or groups["b2"] is not None:
+            parse_inline(groups["b1"] if groups["b1"] is not None else groups["b2"], style | STYLE_BOLD, spans)
+        else:
+            parse_inline(groups["i1"] if groups["i1"] is not None else groups["i2"], style | STYLE_ITALIC, spans)
+        pos = match.end()
+    if pos < len(text):
+        spans.append(_span(text[pos:], style))
+    return spans
+
+def render_blocks(markdown):
+    """Parses markdown into the version 1 block structure."""
+    blocks = []
+    paragraph = []
+    quote = []
+    lines = markdown.replace("\r\n", "\n").split("\n")
+
+    def flush():
+        if paragraph:
+            blocks.append({"t": "p", "s": parse_inline("\n".join(paragraph))})
+            paragraph.clear()
+        if quote:
+            blocks.append({"t": "quote", "s": parse_inline("\n".join(quote))})
+            quote.clear()
+
+    def list_item(kind, indent, text, start=None):
+        last = blocks[-1] if blocks else None
+        if not (last and last["t"] == kind and not paragraph and not quote):
+            flush()
+            last = {"t": kind, "items": []}
+            if kind == "ol":
+                last["start"] = start
+            blocks.append(last)
+        last["items"].append([len(indent.expandtabs(4)) // 2, text])
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = FENCE_RE.match(line)
+        if fence:
+            flush()
+            marker = fence.group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code.append(lines[i])
+                i += 1
+            blocks.append({"t": "code", "lang": fence.group(2), "text": "\n".join(code)})
+            i += 1
+            continue
+
+        heading = HEADING_RE.match(line)
+        ulist = ULIST_RE.match(line)
+        olist = OLIST_RE.match(line)
+        quoted = QUOTE_RE.match(line)
+        if not line.strip():
+            flush()
+        elif heading:
+            flush()
+            blocks.append({"t": "h", "l": len(heading.group(1)), "s": parse_inline(heading.group(2))})
+        elif HR_RE.match(line):
+            flush()
+            blocks.append({"t": "hr"})
+        elif ulist:
+            list_item("ul", ulist.group(1), ulist.group(2))
+        elif olist:
+            list_item("ol", olist.group(1), olist.group(3), int(olist.group(2)))
+        elif quoted:
+            if paragraph:
+                flush()
+            quote.append(quoted.group(1))
+        elif blocks and blocks[-1]["t"] in ("ul", "ol") and not paragraph and not quote and line[:1].isspace():
+            # Indented continuation of the previous list item
+            blocks[-1]["items"][-1][1] += "\n" + line.strip()
+        else:
+            if quote:
+                flush()
+            paragraph.append(line)
+        i += 1
+    flush()
+
+    for block in blocks:
+        if block["t"] in ("ul", "ol"):
+            block["items"] = [[depth, parse_inline(text)] for depth, text in block["items"]]
+    return {"v": BLOCKS_VERSION, "blocks": blocks}
+
+if __name__ == "__main__":
+    print(json.dumps(render_blocks(sys.stdin.read()), indent=2, ensure_ascii=False))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Health tracking for Gemini CLI sessions used by ai_listener.
+
+Each Gemini PID gets a circuit breaker. Failed or timed-out turns and failed probes
+open it, so prompts are routed around the session instead of paying for pipe retries
+and read timeouts. After a cool-down the breaker goes half-open and lets a single
+trial (a probe or a real prompt) through; success closes it again.
+"""
+import time
+import psutil
+import win32pipe
+import pywintypes
+
+PROBE_TIMEOUT_MS = 250
+ERROR_SEM_TIMEOUT = 121   # WaitNamedPipe: every pipe instance is busy serving a client
+
+def gemini_pipe_path(pid):
+    return f"\\\\.\\pipe\\gemini-cli-{pid}"
+
+def probe_session(pid, timeout_ms=PROBE_TIMEOUT_MS):
+    """Cheap liveness check: the process exists and its remote-control pipe is listening."""
+    try:
+        if psutil.Process(pid).status() in (psutil.STATUS_ZOMBIE, psutil.STATUS_STOPPED):
+            return False
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        pass
+
+    try:
+        win32pipe.WaitNamedPipe(gemini_pipe_path(pid), timeout_ms)
+        return True
+    except pywintypes.error as e:
+        # All instances busy means the session is alive and serving a turn
+        return e.winerror == ERROR_SEM_TIMEOUT
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=2, reset_timeout=15.0, max_reset_timeout=300.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.current_timeout = reset_timeout
+        self.trial_in_flight = False
+
+    def _refresh(self):
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.current_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+
+    def available(self):
+        """Whether a request could be let through right now, without claiming the half-open trial."""
+        self._refresh()
+        return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self.trial_in_flight)
+
+    def allow(self):
+        """Claims permission to use the session; in half-open state only one trial is let through."""
+        self._refresh()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.current_timeout = self.reset_timeout
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            # Failed trial: back off further before the next one
+            self.current_timeout = min(self.current_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """Gives back a half-open trial whose outcome is unknown (e.g. the request was cancelled)."""
+        self.trial_in_flight = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.trial_in_flight = False
+
+class SessionHealth:
+    """Circuit breakers keyed by Gemini PID."""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self.breakers = {}
+
+    def breaker(self, pid):
+        if pid not in self.breakers:
+            self.breakers[pid] = CircuitBreaker(**self.breaker_options)
+        return self.breakers[pid]
+
+    def available(self, pid):
+        return self.breaker(pid).available()
+
+    def allow(self, pid):
+        return self.breaker(pid).allow()
+
+    def record(self, pid, healthy):
+        breaker = self.breaker(pid)
+        was_state = breaker.state
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return was_state, breaker.state
+
+    def release(self, pid):
+        self.breaker(pid).release()
+
+    def forget_missing(self, live_pids):
+        for pid in list(self.breakers):
+            if pid not in live_pids:
+                del self.breakers[pid]
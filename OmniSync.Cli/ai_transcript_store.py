@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Durable transcript store for AI conversations relayed by ai_listener.
+
+Every prompt and response is appended to a single append-only log (one JSON record
+per line). A small SQLite index keeps the byte offset of each record per session and
+a full-text (FTS5) index over the text, so a session's history is loaded with a few
+seeks and searches over months of transcripts stay in the millisecond range.
+
+The log is the source of truth: on open, records written after the last indexed
+offset (e.g. after a crash) are re-indexed and a torn trailing line is dropped.
+
+Usage:
+    python ai_transcript_store.py sessions
+    python ai_transcript_store.py show <session>
+    python ai_transcript_store.py search "query terms"
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+DEFAULT_STORE_DIR = os.path.join(os.getcwd(), "ai_transcripts")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    ts REAL NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_session ON entries(session, seq);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(text, content='');
+"""
+
+def fts_query(text):
+    """Turns free text into an FTS5 query matching all terms, immune to FTS syntax characters."""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+class TranscriptStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "transcript.log")
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.log = open(self.log_path, "ab")
+        self.reader = open(self.log_path, "rb")
+        self._catch_up()
+
+    def close(self):
+        with self.lock:
+            self.log.close()
+            self.reader.close()
+            self.db.close()
+
+    def _indexed_bytes(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'indexed_bytes'").fetchone()
+        return row[0] if row else 0
+
+    def _index(self, record, offset, length):
+        cursor = self.db.execute(
+            "INSERT INTO entries (session, seq, role, ts, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+            (record["session"], record["seq"], record["role"], record["ts"], offset, length))
+        self.db.execute("INSERT INTO entries_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, record["text"]))
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('indexed_bytes', ?)", (offset + length,))
+        return cursor.lastrowid
+
+    def _catch_up(self):
+        """Indexes records appended after the last indexed offset and drops a torn final line."""
+        offset = self._indexed_bytes()
+        self.reader.seek(offset)
+        for line in self.reader:
+            if not line.endswith(b"\n"):
+                self.log.truncate(offset)
+                break
+            self._index(json.loads(line), offset, len(line))
+            offset += len(line)
+        self.db.commit()
+
+    def _next_seq(self, session):
+        row = self.db.execute("SELECT MAX(seq) FROM entries WHERE session = ?", (session,)).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def append(self, session, role, text, **extra):
+        """Durably appends one message and indexes it. Returns the entry id."""
+        with self.lock:
+            record = {"session": str(session), "seq": self._next_seq(str(session)), "role": role,
+                      "ts": time.time(), "text": text, **extra}
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            offset = self.log.seek(0, os.SEEK_END)
+            self.log.write(line)
+            self.log.flush()
+            os.fsync(self.log.fileno())
+            entry_id = self._index(record, offset, len(line))
+            self.db.commit()
+            return entry_id
+
+    def _read(self, offset, length):
+        self.reader.seek(offset)
+        return json.loads(self.reader.read(length))
+
+    def records(self, session, limit=None):
+        """Returns the raw records of a session in order, optionally only the last `limit`."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT offset, length FROM entries WHERE session = ? ORDER BY seq DESC LIMIT ?",
+                (str(session), -1 if limit is None else limit)).fetchall()
+            return [self._read(offset, length) for offset, length in reversed(rows)]
+
+    def history(self, session, limit=None):
+        """Session history in the [{"sender", "text"}] shape ReceiveAiHistory carries."""
+        return [{"sender": r["role"], "text": r["text"]} for r in self.records(session, limit)]
+
+    def sessions(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT session, COUNT(*), MIN(ts), MAX(ts) FROM entries GROUP BY session ORDER BY MAX(ts) DESC").fetchall()
+
+    def search(self, text, limit=50):
+        """Full-text search across all sessions, best matches first."""
+        query = fts_query(text)
+        if not query:
+            return []
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT e.offset, e.length FROM entries_fts f JOIN entries e ON e.id = f.rowid "
+                "WHERE entries_fts MATCH ? ORDER BY f.rank LIMIT ?", (query, limit)).fetchall()
+            return [self._read(offset, length) for offset, length in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the AI transcript store.")
+    parser.add_argument("--dir", default=DEFAULT_STORE_DIR, help="Store directory")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("sessions", help="List sessions")
+    show = sub.add_parser("show", help="Print a session's transcript")
+    show.add_argument("session")
+    search = sub.add_parser("search", help="Full-text search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    store = TranscriptStore(args.dir)
+    try:
+        if args.action == "sessions":
+            for session, count, first, last in store.sessions():
+                print(f"{session:<24} {count:>6} msgs  {time.strftime('%Y-%m-%d %H:%M', time.localtime(first))} .. "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(last))}")
+        elif args.action == "show":
+            for record in store.records(args.session):
+                print(f"--- {record['role']} ({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['ts']))})")
+                print(record["text"])
+        elif args.action == "search":
+            start = time.perf_counter()
+            results = store.search(args.query, args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            for record in results:
+                preview = record["text"].replace("\n", " ")[:100]
+                print(f"[{record['session']} #{record['seq']} {record['role']}] {preview}")
+            print(f"{len(results)} result(s) in {elapsed:.1f} ms")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
-import uuid
 import argparse
 import sys
 import time
 import logging
 import asyncio 
 import traceback 
-from signalrcore.hub_connection_builder import HubConnectionBuilder
+import urllib.parse
+from omni_hub_client import HubError
+from omni_hub_broker import BrokerClient, connect_hub
+from omni_hub_latency import LatencyRecorder
+from omni_hub_endpoints import hub_urls
+from omni_command_graph import CommandGraph, ScriptError, DEFAULT_WINDOW, COMMAND_TIMEOUT
 
 # --- CONFIGURATION ---
-HUB_URL = "http://10.0.0.37:5000/signalrhub" # Your PC IP
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
 API_KEY = "test_api_key"                     # Your Hub Secret
 # ---------------------
 
@@ -21,7 +25,21 @@ group.add_argument("--persistent", "-p", action="store_true",
                    help="Enter persistent mode for rapid, successive command execution. Reads commands from stdin.")
 group.add_argument("--sequence", "-s", type=str, 
                    help="Enter sequence mode. Sends semicolon-separated commands, e.g., 'cmd1;cmd2;cmd3'")
+group.add_argument("--script", metavar="FILE",
+                   help="Run a dependency script ('id(dep, ...): command' per line, '-' for stdin); "
+                        "independent commands run concurrently. See omni_command_graph.py.")
+parser.add_argument("--hosts", nargs="+", metavar="[NAME=]URL[|URL...]",
+                    help="Fan-out: run the command, sequence or script on every listed hub at once "
+                         "('|' separates alternative URLs of one host, raced like HUB_URL)")
+parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                    help="Script mode: most commands running at once")
+parser.add_argument("--timeout", type=float, default=COMMAND_TIMEOUT,
+                    help="Seconds to wait for each command to complete")
+parser.add_argument("--latency", metavar="FILE",
+                    help="Accumulate per-method round-trip histograms in FILE (see omni_hub_latency.py)")
 args = parser.parse_args()
+if args.hosts and args.persistent:
+    parser.error("--hosts cannot be combined with --persistent")
 
 command_to_run_single_mode = None
 commands_to_run = [] # Initialize as empty list
@@ -34,117 +52,167 @@ elif args.sequence:
         print("Error: --sequence requires at least one command.")
         sys.exit(1)
     
+elif args.script:
+    try:
+        with (sys.stdin if args.script == "-" else open(args.script, encoding="utf-8")) as script_file:
+            script_text = script_file.read()
+        command_graph = CommandGraph.parse(script_text)   # Validated once up front; each host runs its own copy
+    except (OSError, ScriptError) as e:
+        print(f"Error: cannot use script {args.script}: {e}")
+        sys.exit(1)
+
 IS_PERSISTENT_MODE = args.persistent
 IS_SEQUENCE_MODE = args.sequence is not None
-IS_SINGLE_COMMAND_MODE = not IS_PERSISTENT_MODE and not IS_SEQUENCE_MODE
+IS_SCRIPT_MODE = args.script is not None
+IS_SINGLE_COMMAND_MODE = not IS_PERSISTENT_MODE and not IS_SEQUENCE_MODE and not IS_SCRIPT_MODE
 
-is_done = False 
-connection_started = False 
+def parse_host(spec):
+    """'[name=]url[|url...]' -> (name, urls); the name defaults to the first URL's host."""
+    name, sep, rest = spec.partition("=")
+    if not sep or "/" in name:   # An '=' inside a URL's query, not a name
+        name, rest = "", spec
+    urls = [u.strip() for u in rest.split("|") if u.strip()]
+    if not urls:
+        parser.error(f"--hosts: no URL in '{spec}'")
+    return name.strip() or urllib.parse.urlsplit(urls[0]).hostname or urls[0], urls
 
-# For sequence mode, we need a single event to signal completion of *any* command
-sequence_command_completed_event = asyncio.Event()
+HOSTS = [parse_host(spec) for spec in args.hosts or []]
+if len({name for name, _ in HOSTS}) != len(HOSTS):
+    parser.error("--hosts: host names must be unique (use name=url)")
 
-def on_command_completed(args):
-    global is_done
-    command_str = args[0]
-    
-    # Check if this command completion is relevant for the current mode
-    if IS_SINGLE_COMMAND_MODE and command_str == command_to_run_single_mode:
-        print(f"Command '{command_str}' completed.")
-        is_done = True
-    elif IS_SEQUENCE_MODE:
-        print(f"Command '{command_str}' completed. Scheduling event set to main loop.")
-        GLOBAL_EVENT_LOOP.call_soon_threadsafe(sequence_command_completed_event.set)
-
-async def connect_and_authenticate():
-    global connection_started
-
-    hub = HubConnectionBuilder()\
-        .with_url(HUB_URL)\
-        .configure_logging(logging.INFO)\
-        .with_automatic_reconnect({
-            "type": "raw",
-            "keep_alive_interval": 10,
-            "reconnect_interval": 5,
-            "max_attempts": 5
-        }).build()
-
-    hub.on("ReceiveCommandOutput", on_output)
-    if not IS_PERSISTENT_MODE:
-        hub.on("CommandExecutionCompleted", on_command_completed)
-    hub.on_close(on_close) 
-    hub.on_open(on_open)   
-    hub.on_error(on_error) 
-
-    print(f"Attempting to connect to {HUB_URL}...")
-    hub.start() 
-    print("hub.start() initiated (without await).")
-
-    timeout = 15 
-    start_time = time.time()
-    while not connection_started and (time.time() - start_time) < timeout:
-        print(f"Waiting for connection... ({int(time.time() - start_time)}s/{timeout}s)")
-        await asyncio.sleep(1) 
-    
-    if not connection_started:
-        print("Failed to establish connection within timeout.")
-        hub.stop() 
-        sys.exit(1)
+LATENCY = LatencyRecorder.resume(args.latency, label="omni_cli_script") if args.latency else None
+
+async def connect_and_authenticate(urls=HUB_URL, prefix=""):
+    print(f"{prefix}Attempting to connect to {', '.join(urls)}...")
+    # Reuses a running omni_hub_broker when there is one; either way the client is authenticated
+    hub = await asyncio.wait_for(connect_hub(urls, API_KEY, keep_alive_interval=10, latency=LATENCY), timeout=15)
+    hub.on("ReceiveCommandOutput", output_printer(prefix))
+    hub.on_close(lambda: print(f"{prefix}Connection closed."))
+    via = "via local broker" if isinstance(hub, BrokerClient) else f"direct to {hub.url}"
+    print(f"{prefix}Connection established and authenticated ({via}).")
 
-    print("Connection established. Authenticating...")
-    # Authentication does not need an invocationId to be tracked
-    hub.send("Authenticate", [API_KEY]) 
-    print("Authentication sent.")
-    
     return hub
 
-# Configure logging for signalrcore
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+async def run_command(hub, command, prefix=""):
+    """Runs one command and waits for the hub to complete that exact invocation; returns True on success."""
+    try:
+        await hub.invoke("ExecuteCommand", command, timeout=args.timeout)
+        print(f"{prefix}Command '{command}' completed.")
+        return True
+    except asyncio.TimeoutError:
+        print(f"{prefix}Timeout waiting for command '{command}' to complete.")
+    except (HubError, ConnectionError) as e:
+        print(f"{prefix}Command '{command}' failed: {e}")
+    return False
 
-def on_output(args):
-    print(args[0], end="")
+async def run_commands(hub, prefix=""):
+    """Runs the single command, sequence or script on one hub; returns (succeeded, total) command counts."""
+    if IS_SINGLE_COMMAND_MODE:
+        print(f"{prefix}Executing single command: {command_to_run_single_mode}")
+        return int(await run_command(hub, command_to_run_single_mode, prefix)), 1
+    if IS_SEQUENCE_MODE:
+        print(f"{prefix}Executing sequence of {len(commands_to_run)} commands...")
+        succeeded = 0
+        for cmd in commands_to_run:
+            print(f"{prefix}Sending command: {cmd}")
+            succeeded += await run_command(hub, cmd, prefix)
 
-def on_close():
-    global is_done, connection_started 
-    print("Connection closed.")
-    is_done = True
-    connection_started = False
+        print(f"{prefix}All sequence commands sent and processed (or timed out).")
+        return succeeded, len(commands_to_run)
+    graph = CommandGraph.parse(script_text)
+    print(f"{prefix}Executing script of {len(graph.order)} commands (window {args.window})...")
+    succeeded = await graph.run(hub, window=args.window, timeout=args.timeout,
+                                on_output=script_output_printer(prefix), on_status=script_status_printer(prefix))
+    for line in graph.summary().splitlines():
+        print(f"{prefix}{line}")
+    print(f"{prefix}Script completed." if succeeded else f"{prefix}Script finished with failures.")
+    return sum(node.status == "ok" for node in graph.order), len(graph.order)
 
-def on_open():
-    global connection_started
-    print("Connection opened.")
-    connection_started = True
+async def run_on_host(name, urls):
+    """One host of a fan-out: connect, run, disconnect. Never raises, so one bad host can't stop the rest."""
+    prefix = f"[{name}] "
+    result = {"host": name, "url": urls[0], "succeeded": 0, "total": 0, "error": None}
+    started = time.perf_counter()
+    hub = None
+    try:
+        hub = await connect_and_authenticate(urls, prefix)
+        result["url"] = getattr(hub, "url", urls[0])
+        result["succeeded"], result["total"] = await run_commands(hub, prefix)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        result["error"] = f"unreachable: {e or 'timed out'}"
+        print(f"{prefix}Failed to establish connection: {e or 'timed out'}")
+    except Exception as e:
+        result["error"] = str(e)
+        print(f"{prefix}Error during execution: {e}")
+    finally:
+        if hub:
+            await hub.stop()
+        result["seconds"] = time.perf_counter() - started
+    return result
 
-def on_error(error):
-    print(f"Connection error: {error}")
+async def run_fleet():
+    """Runs on every host concurrently, so the whole fleet takes about as long as its slowest host."""
+    print(f"Fanning out to {len(HOSTS)} hosts: {', '.join(name for name, _ in HOSTS)}")
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_on_host(name, urls) for name, urls in HOSTS))
+    wall = time.perf_counter() - started
 
-GLOBAL_EVENT_LOOP = None
+    width = max(len("host"), *(len(r["host"]) for r in results))
+    print(f"{'host':<{width}} {'status':<11} {'ok':>7} {'seconds':>8}  endpoint")
+    for r in results:
+        status = "unreachable" if r["error"] and not r["total"] else \
+                 "ok" if not r["error"] and r["succeeded"] == r["total"] else "failed"
+        detail = f"  {r['error']}" if r["error"] else ""
+        print(f"{r['host']:<{width}} {status:<11} {r['succeeded']:>3}/{r['total']:<3} {r['seconds']:8.2f}  {r['url']}{detail}")
+    healthy = sum(not r["error"] and r["succeeded"] == r["total"] for r in results)
+    print(f"{healthy}/{len(results)} hosts succeeded; wall {wall:.2f} s, "
+          f"slowest host {max(r['seconds'] for r in results):.2f} s, sum of hosts {sum(r['seconds'] for r in results):.2f} s")
 
-async def main():
-    global is_done, connection_started, command_to_run_single_mode, GLOBAL_EVENT_LOOP
+# Configure logging
+logging.basicConfig(level=logging.INFO, 
+                    format='%(asctime)s - %(levelname)s - %(message)s')
 
-    total_execution_start_time = time.time() # Start stopwatch
+def output_printer(prefix=""):
+    if not prefix:
+        return lambda output: print(output, end="")
+    # Several hosts interleave, so every line carries its host
+    def on_output(output):
+        for line in output.splitlines():
+            print(f"{prefix}{line}")
+    return on_output
+
+def script_output_printer(prefix=""):
+    # Interleaved across concurrent commands, so every line carries its command's id
+    def on_script_output(node, text):
+        for line in text.splitlines():
+            print(f"{prefix}[{node.id}] {line}")
+    return on_script_output
+
+def script_status_printer(prefix=""):
+    def on_script_status(node):
+        if node.status == "running":
+            print(f"{prefix}[{node.id}] started: {node.command}")
+        else:
+            print(f"{prefix}[{node.id}] {node.status}" + (f" (exit {node.exit_code})" if node.exit_code is not None else ""))
+    return on_script_status
 
-    GLOBAL_EVENT_LOOP = asyncio.get_running_loop() # Get reference to the main event loop
+async def main():
+    total_execution_start_time = time.time() # Start stopwatch
 
     hub = None # Initialize hub to None
     try:
-        hub = await connect_and_authenticate()
-    
-        if IS_SINGLE_COMMAND_MODE:
-            print(f"Executing single command: {command_to_run_single_mode}")
-            hub.send("ExecuteCommand", [command_to_run_single_mode]) 
-            print("Command execution sent.")
-
-            start_time = time.time()
-            while not is_done and (time.time() - start_time) < 30: 
-                 await asyncio.sleep(0.5)
-
-            if not is_done:
-                print("Command output might not have completed within timeout or connection hung.")
-        elif IS_PERSISTENT_MODE:
+        if HOSTS:
+            await run_fleet()
+            return
+        try:
+            hub = await connect_and_authenticate()
+        except (asyncio.TimeoutError, OSError, PermissionError) as e:
+            print(f"Failed to establish connection: {e or 'timed out'}")
+            sys.exit(1)
+
+        if IS_PERSISTENT_MODE:
             print("Entering persistent mode. Type commands and press Enter. Type '_QUIT_' to exit.")
+            in_flight = set()
             while True:
                 try:
                     command = await asyncio.to_thread(input, "> ")
@@ -158,32 +226,28 @@ async def main():
                         except ValueError:
                             print("Invalid _SLEEP_X_ format. Use _SLEEP_SECONDS_.")
                         continue
-                    hub.send("ExecuteCommand", [command])
+                    # Don't block the prompt; completions are reported as they arrive
+                    task = asyncio.create_task(run_command(hub, command))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
                 except EOFError: # Ctrl-D or stdin closed
                     print("EOF received. Exiting persistent mode.")
                     break
-        elif IS_SEQUENCE_MODE:
-            print(f"Executing sequence of {len(commands_to_run)} commands...")
-            for cmd in commands_to_run:
-                print(f"Sending command: {cmd}")
-                sequence_command_completed_event.clear() # Clear the event before sending the next command
-                hub.send("ExecuteCommand", [cmd])
-                
-                try:
-                    # Wait for completion of this specific command with a timeout
-                    await asyncio.wait_for(sequence_command_completed_event.wait(), timeout=30) 
-                except asyncio.TimeoutError:
-                    print(f"Timeout waiting for command '{cmd}' to complete.")
-
-            print("All sequence commands sent and processed (or timed out).")
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        else:
+            await run_commands(hub)
 
     except Exception as e: 
         print(f"Error during execution: {e}") 
         traceback.print_exc() 
     finally:
-        if hub and connection_started: # Only try to stop if it was actually started
-            hub.stop() 
+        if hub:
+            await hub.stop()
             print("Connection stopped.")
+        if LATENCY:
+            LATENCY.save()
+            print(LATENCY.summary())
         
         elapsed_time = time.time() - total_execution_start_time
         print(f"Total script execution duration: {elapsed_time:.2f} seconds")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Dependency-graph command scripts for omni_cli_script (--script).
+
+A script lists commands with an id and, in parentheses, the ids they depend on:
+
+    # Build and check the app
+    restore: dotnet restore D:\\src\\app
+    lint: npm run lint --prefix D:\\src\\web
+    build(restore): dotnet build D:\\src\\app --no-restore
+    test(build): dotnet test D:\\src\\app --no-build
+    package(test, lint): pwsh D:\\src\\pack.ps1
+
+Lines without an id run independently under their line number (so a bare command
+starting with a drive letter, like "C:\\tools\\x.exe", needs an id). Every command
+starts as soon as all of its dependencies succeeded, with at most `window` running at
+once, through the hub's StartCommand: output and exit code come back tagged with that
+command's id, so output is shown per command, a failure skips only what depends on
+it, and the run takes about as long as its critical path rather than the sum.
+"""
+import re
+import time
+import uuid
+import asyncio
+
+from omni_hub_client import HubError
+
+COMMAND_TIMEOUT = 30
+DEFAULT_WINDOW = 4
+
+_LINE = re.compile(r"^([A-Za-z_][\w.-]*)\s*(?:\(([^)]*)\))?\s*:\s*(.+)$")
+
+class ScriptError(ValueError):
+    pass
+
+class CommandNode:
+    def __init__(self, node_id, command, dependencies, line):
+        self.id = node_id
+        self.command = command
+        self.dependencies = dependencies
+        self.line = line
+        self.status = "pending"   # -> running -> ok | failed | timeout, or skipped
+        self.exit_code = None
+        self.error = None
+        self.output = []
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self):
+        return self.finished - self.started if self.started and self.finished else 0.0
+
+class CommandGraph:
+    def __init__(self, nodes):
+        self.nodes = {}
+        for node in nodes:
+            if node.id in self.nodes:
+                raise ScriptError(f"line {node.line}: duplicate id '{node.id}'")
+            self.nodes[node.id] = node
+        for node in nodes:
+            for dependency in node.dependencies:
+                if dependency not in self.nodes:
+                    raise ScriptError(f"line {node.line}: '{node.id}' depends on unknown id '{dependency}'")
+        self.order = self._topological_order()
+
+    @classmethod
+    def parse(cls, text):
+        nodes = []
+        for number, raw in enumerate(text.splitlines(), 1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = _LINE.match(line)
+            if match:
+                dependencies = [d.strip() for d in (match.group(2) or "").split(",") if d.strip()]
+                nodes.append(CommandNode(match.group(1), match.group(3).strip(), dependencies, number))
+            else:
+                nodes.append(CommandNode(f"line{number}", line, [], number))
+        if not nodes:
+            raise ScriptError("script has no commands")
+        return cls(nodes)
+
+    def _topological_order(self):
+        remaining = {node_id: len(node.dependencies) for node_id, node in self.nodes.items()}
+        dependents = {node_id: [] for node_id in self.nodes}
+        for node in self.nodes.values():
+            for dependency in node.dependencies:
+                dependents[dependency].append(node.id)
+        ready = [node_id for node_id, count in remaining.items() if not count]
+        order = []
+        while ready:
+            node_id = ready.pop(0)
+            order.append(self.nodes[node_id])
+            for dependent in dependents[node_id]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if len(order) != len(self.nodes):
+            cycle = sorted(node_id for node_id, count in remaining.items() if count)
+            raise ScriptError(f"dependency cycle among: {', '.join(cycle)}")
+        return order
+
+    async def run(self, hub, window=DEFAULT_WINDOW, timeout=COMMAND_TIMEOUT, on_output=None, on_status=None):
+        """Runs the graph; returns True when every command succeeded."""
+        loop = asyncio.get_running_loop()
+        run_id = uuid.uuid4().hex[:8]
+        tags = {f"{run_id}:{node.id}": node for node in self.order}
+        exit_codes = {}   # tag -> future, while the command runs
+
+        def receive_output(tag, text):
+            node = tags.get(tag)   # Other runs sharing a broker connection use other tags
+            if node:
+                node.output.append(text)
+                if on_output:
+                    on_output(node, text)
+
+        def command_finished(tag, exit_code):
+            future = exit_codes.get(tag)
+            if future and not future.done():
+                future.set_result(exit_code)
+
+        hub.on("ReceiveTaggedCommandOutput", receive_output)
+        hub.on("CommandFinished", command_finished)
+        slots = asyncio.Semaphore(window)
+        tasks = {}
+
+        async def run_node(node, tag):
+            if not all(await asyncio.gather(*(tasks[d] for d in node.dependencies))):
+                node.status = "skipped"
+            else:
+                async with slots:
+                    exit_codes[tag] = loop.create_future()
+                    node.status = "running"
+                    node.started = time.perf_counter()
+                    if on_status:
+                        on_status(node)
+                    try:
+                        await hub.invoke("StartCommand", tag, node.command)
+                        node.exit_code = await asyncio.wait_for(exit_codes[tag], timeout)
+                        node.status = "ok" if node.exit_code == 0 else "failed"
+                    except asyncio.TimeoutError:
+                        node.status = "timeout"
+                    except (HubError, ConnectionError) as e:
+                        node.status = "failed"
+                        node.error = str(e)
+                    finally:
+                        node.finished = time.perf_counter()
+                        exit_codes.pop(tag, None)
+            if on_status:
+                on_status(node)
+            return node.status == "ok"
+
+        try:
+            # Topological order guarantees every dependency's task exists before its dependents'
+            for tag, node in tags.items():
+                tasks[node.id] = asyncio.ensure_future(run_node(node, tag))
+            results = await asyncio.gather(*tasks.values())
+        finally:
+            hub.off("ReceiveTaggedCommandOutput", receive_output)
+            hub.off("CommandFinished", command_finished)
+        return all(results)
+
+    def critical_path(self):
+        """Longest chain of measured durations through the dependencies."""
+        finish = {}
+        for node in self.order:
+            finish[node.id] = node.duration + max((finish[d] for d in node.dependencies), default=0.0)
+        return max(finish.values(), default=0.0)
+
+    def summary(self):
+        lines = [f"{'id':<20} {'status':<8} {'exit':>5} {'seconds':>8}"]
+        for node in self.order:
+            exit_code = "" if node.exit_code is None else node.exit_code
+            detail = f"  {node.error}" if node.error else ""
+            lines.append(f"{node.id:<20} {node.status:<8} {exit_code!s:>5} {node.duration:8.2f}{detail}")
+        total = sum(node.duration for node in self.order)
+        lines.append(f"Critical path {self.critical_path():.2f} s, sum of commands {total:.2f} s")
+        return "\n".join(lines)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""Parallel, resumable downloads of hub files over GetFileChunk.
+
+A serial GetFileChunk loop spends most of its time waiting: one round trip per chunk,
+with the link idle in between. ChunkedDownload keeps `window` chunk requests in flight
+instead and sizes chunks from the measured throughput (each should take about
+CHUNK_SECONDS), so a fast LAN gets multi-megabyte chunks and a slow link small ones
+that still pipeline. Chunks are written straight into a preallocated, memory-mapped
+"<local>.part" file at their offsets, in whatever order they arrive.
+
+Every JOURNAL_INTERVAL the mapped file is flushed and the byte ranges on disk are
+recorded in "<local>.part.json". An interrupted download (Ctrl-C, dropped connection,
+crash) resumes from there, provided the remote file still has the same size and
+modification time. Otherwise it starts over. Once every byte is in, the result is checked
+against the hub's SHA-256 of the file (GetFileHash). Hubs without GetFileHash only get
+a size check. Then the .part file is renamed into place.
+
+    hub = HubClient(hub_urls(), api_key="...", bulk_window=None)
+    await hub.start()
+    download = ChunkedDownload(hub, "D:\\\\Videos\\\\talk.mkv", "talk.mkv")
+    await download.run()
+    print(download.summary())
+
+HubClient's bulk_window caps the chunk bytes in flight on a connection, to keep
+interactive calls responsive. A dedicated connection with bulk_window=None (as the
+command line does) lets the window fill the link. For bulk pulls of big files,
+omni_stream_download fetches over several HTTP connections to /api/stream instead,
+without going through the SignalR connection at all.
+
+Usage:
+    python omni_file_download.py <remote path> [local path] [--window 8] [--no-verify]
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import base64
+import ntpath
+import asyncio
+import hashlib
+import logging
+import argparse
+import collections
+
+from omni_hub_client import HubClient, HubError
+from omni_hub_endpoints import hub_urls
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+DEFAULT_WINDOW = 8              # Chunk requests in flight
+FIRST_CHUNK = 256 << 10
+MIN_CHUNK = 64 << 10
+MAX_CHUNK = 4 << 20
+CHUNK_SECONDS = 0.25            # Target transfer time of one chunk at the measured throughput
+RATE_SPAN = 2.0                 # Seconds of completed chunks the throughput is measured over
+JOURNAL_INTERVAL = 1.0
+MAX_RETRIES = 5                 # Consecutive failed chunk requests before giving up
+CHUNK_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+class DownloadError(Exception):
+    pass
+
+def _timestamp(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+async def stat_remote(hub, path):
+    """(size, modified) of a remote file: GetFileInfo, or its parent's listing on hubs without it."""
+    try:
+        entry = await hub.invoke("GetFileInfo", path)
+    except HubError as e:
+        entry, error = None, e
+    else:
+        error = None
+    if entry is None:
+        name = ntpath.basename(path).lower()
+        try:
+            listing = await hub.invoke("ListDirectory", ntpath.dirname(path))
+        except HubError as e:
+            raise DownloadError(f"cannot stat {path}: {error or e}") from e
+        entry = next((item for item in listing if (item.get("name") or "").lower() == name), None)
+        if entry is None:
+            raise DownloadError(f"cannot stat {path}: {error or 'not found'}")
+    if entry.get("isDirectory"):
+        raise DownloadError(f"{path} is a directory")
+    return entry.get("size"), _timestamp(entry.get("lastModified"))
+
+def merge_ranges(ranges):
+    """Sorted, coalesced copy of [start, end) byte ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def missing_ranges(size, done):
+    """The [start, end) ranges of a size-byte file not covered by the merged ranges in done."""
+    gaps, position = [], 0
+    for start, end in done:
+        if start > position:
+            gaps.append([position, start])
+        position = max(position, end)
+    if position < size:
+        gaps.append([position, size])
+    return gaps
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class DownloadJournal:
+    """The sidecar of a .part file: what it is a download of and which byte ranges are on disk."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, remote, size, modified, done):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"remote": remote, "size": size, "modified": modified, "done": done}, f)
+        os.replace(temp_path, self.path)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class ChunkedDownload:
+    def __init__(self, hub, remote_path, local_path, window=DEFAULT_WINDOW, verify=True, on_progress=None):
+        self.hub = hub
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.part_path = local_path + ".part"
+        self.journal = DownloadJournal(self.part_path + ".json")
+        self.window = window
+        self.verify = verify
+        self.on_progress = on_progress
+        self.size = None
+        self.modified = None
+        self.resumed = 0          # Bytes already on disk from an earlier, interrupted run
+        self.received = 0         # Bytes fetched by this run
+        self.chunk_size = FIRST_CHUNK
+        self.retries = 0
+        self.verified = None      # "sha256" or "size" once complete
+        self.seconds = 0.0
+        self.verify_seconds = 0.0  # Part of seconds spent on the checksum comparison
+        self._recent = collections.deque()   # (completed at, bytes) of the last RATE_SPAN seconds
+        self._done = []
+
+    @property
+    def rate(self):
+        """Current throughput in bytes per second, over the last RATE_SPAN seconds."""
+        if len(self._recent) < 2:
+            return 0.0
+        span = self._recent[-1][0] - self._recent[0][0]
+        # The oldest chunk completed at the start of the span, so its bytes fall outside it
+        return (sum(n for _, n in self._recent) - self._recent[0][1]) / span if span > 0 else 0.0
+
+    async def run(self):
+        """Downloads (or resumes) the file; raises DownloadError, leaving the journal behind to resume from."""
+        started = time.perf_counter()
+        self.size, self.modified = await stat_remote(self.hub, self.remote_path)
+        state = self.journal.load()
+        if (state and (state.get("remote"), state.get("size"), state.get("modified")) == (self.remote_path, self.size, self.modified)
+                and os.path.exists(self.part_path) and os.path.getsize(self.part_path) == self.size):
+            self._done = merge_ranges(state.get("done") or [])
+            self.resumed = sum(end - start for start, end in self._done)
+            logger.info(f"Resuming {self.remote_path}: {self.resumed} of {self.size} bytes already on disk.")
+
+        with open(self.part_path, "r+b" if self._done else "w+b") as f:
+            f.truncate(self.size)   # Preallocates; sparse where the filesystem allows
+            view = mmap.mmap(f.fileno(), self.size) if self.size else None
+            try:
+                await self._fetch(view, missing_ranges(self.size, self._done))
+            finally:
+                self._checkpoint(view)
+                if view:
+                    view.close()
+
+        if await stat_remote(self.hub, self.remote_path) != (self.size, self.modified):
+            self.journal.delete()
+            raise DownloadError(f"{self.remote_path} changed during the download")
+        verify_started = time.perf_counter()
+        await self._verify()
+        self.verify_seconds = time.perf_counter() - verify_started
+        os.replace(self.part_path, self.local_path)
+        self.journal.delete()
+        self.seconds = time.perf_counter() - started
+        return self
+
+    async def _fetch(self, view, pending):
+        pending = collections.deque(pending)   # Unrequested [start, end) ranges, lowest first
+        failures = 0
+        last_checkpoint = time.monotonic()
+
+        async def worker():
+            nonlocal failures, last_checkpoint
+            while pending:
+                start, end = pending[0]
+                stop = min(end, start + self.chunk_size)
+                if stop == end:
+                    pending.popleft()
+                else:
+                    pending[0] = [stop, end]
+                try:
+                    chunk = await self.hub.invoke("GetFileChunk", self.remote_path, start, stop - start, timeout=CHUNK_TIMEOUT)
+                except (HubError, ConnectionError, asyncio.TimeoutError) as e:
+                    pending.appendleft([start, stop])
+                    failures += 1
+                    if failures > MAX_RETRIES:
+                        raise DownloadError(f"chunk at {start} failed {failures} times in a row: {e!r}") from e
+                    self.retries += 1
+                    logger.warning(f"Chunk at {start} failed ({e!r}); retrying.")
+                    await asyncio.sleep(min(0.25 * 2 ** failures, 5))
+                    continue
+                if isinstance(chunk, str):
+                    chunk = base64.b64decode(chunk)   # JSON hub protocol
+                if len(chunk) != stop - start:
+                    raise DownloadError(f"{self.remote_path} changed during the download (short chunk at {start})")
+                failures = 0
+                view[start:stop] = chunk
+                self._done.append([start, stop])
+                self.received += len(chunk)
+                self._adapt(len(chunk))
+                if time.monotonic() - last_checkpoint >= JOURNAL_INTERVAL:
+                    last_checkpoint = time.monotonic()
+                    self._checkpoint(view)
+                if self.on_progress:
+                    self.on_progress(self)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.window)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def _adapt(self, nbytes):
+        now = time.monotonic()
+        self._recent.append((now, nbytes))
+        while now - self._recent[0][0] > RATE_SPAN:
+            self._recent.popleft()
+        if len(self._recent) < self.window:
+            return
+        target = int(self.rate * CHUNK_SECONDS)
+        # Powers of two, at most a doubling or halving per chunk, so the size settles instead of jittering
+        target = 1 << max(target.bit_length() - 1, 0)
+        self.chunk_size = max(MIN_CHUNK, min(MAX_CHUNK, self.chunk_size * 2, max(self.chunk_size // 2, target)))
+
+    def _checkpoint(self, view):
+        """Makes the written chunks durable, then records them; the journal never claims unflushed bytes."""
+        if view:
+            view.flush()
+        self._done = merge_ranges(self._done)
+        self.journal.save(self.remote_path, self.size, self.modified, self._done)
+
+    async def _verify(self):
+        if not self.verify:
+            return
+        if os.path.getsize(self.part_path) != self.size or missing_ranges(self.size, self._done):
+            raise DownloadError(f"{self.part_path} is incomplete")
+        try:
+            # The hub reads the whole file; allow for a slow disk on large files
+            remote_hash = await self.hub.invoke("GetFileHash", self.remote_path, timeout=max(60, self.size / (20 << 20)))
+        except HubError as e:
+            remote_hash = None
+            logger.warning(f"Hub cannot hash files ({e}); verified the size only.")
+        if not remote_hash:
+            self.verified = "size"
+            return
+        local_hash = await asyncio.to_thread(sha256_file, self.part_path)
+        if local_hash != remote_hash.lower():
+            self.journal.delete()   # The ranges on disk can't be trusted; start over next time
+            raise DownloadError(f"SHA-256 mismatch for {self.remote_path}: hub {remote_hash}, local {local_hash}")
+        self.verified = "sha256"
+
+    def summary(self):
+        mb = self.received / (1 << 20)
+        rate = mb / self.seconds if self.seconds else 0.0
+        resumed = f", {self.resumed / (1 << 20):.1f} MB resumed" if self.resumed else ""
+        return (f"{self.local_path}: {self.size} bytes; fetched {mb:.1f} MB in {self.seconds:.2f} s ({rate:.1f} MB/s){resumed}; "
+                f"last chunk {self.chunk_size >> 10} KB, {self.retries} retries, verified: {self.verified or 'no'}")
+
+async def download_file(args):
+    local_path = args.local or ntpath.basename(args.remote)
+    last_progress = 0.0
+
+    def print_progress(download):
+        nonlocal last_progress
+        if time.monotonic() - last_progress < 0.5:
+            return
+        last_progress = time.monotonic()
+        have = download.resumed + download.received
+        print(f"\r{have / (1 << 20):8.1f} / {download.size / (1 << 20):.1f} MB  {download.rate / (1 << 20):6.1f} MB/s  "
+              f"chunk {download.chunk_size >> 10} KB   ", end="", flush=True)
+
+    # A connection of its own, so the window isn't capped by bulk_window
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return 1
+    try:
+        download = ChunkedDownload(hub, args.remote, local_path, window=args.window, verify=not args.no_verify,
+                                   on_progress=print_progress)
+        await download.run()
+        print()
+        print(download.summary())
+        return 0
+    except DownloadError as e:
+        print(f"\nDownload failed: {e}")
+        if os.path.exists(download.journal.path):
+            print("Run the same command again to resume.")
+        return 1
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Download a file from the OmniSync hub over parallel, resumable chunks.")
+    parser.add_argument("remote", help="Path of the file on the hub's PC")
+    parser.add_argument("local", nargs="?", help="Destination (default: the remote file name, in the current directory)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Chunk requests in flight")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the SHA-256 comparison with the hub")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        sys.exit(asyncio.run(download_file(args)))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
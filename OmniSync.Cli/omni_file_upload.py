@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Chunked, resumable uploads to the hub's PC.
+
+ExecuteCommand("write_file ...") and SendPayload("SAVE_FILE", ...) carry a whole file
+as one text message. ChunkedUpload streams it instead, in chunks of at most
+FileService.MaxUploadChunkSize bytes (binary over MessagePack), with `window` chunks
+in flight:
+
+    BeginUpload(path, size, sha256) -> {uploadId, size, receivedBytes, received}
+    UploadChunk(uploadId, offset, data) -> bytes received so far
+    CompleteUpload(uploadId) -> the FileSystemEntry of the written file
+
+The hub writes each chunk at its offset into a hidden staging file next to the
+destination and flushes it to disk before acknowledging it. Its record of the ranges
+received outlives both the connection and the hub process. So after a disconnect, or in a
+later run, BeginUpload with the same file returns the same upload and only the
+missing ranges are sent. CompleteUpload checks the SHA-256 and moves the staging file
+over the destination in one step; the destination is never half-written. A failure
+that can't be resumed aborts the upload, and the hub removes staging files that no
+upload has touched for a week.
+
+    upload = ChunkedUpload(hub, "talk.mkv", "D:\\\\Videos\\\\talk.mkv")
+    entry = await upload.run()
+
+As with downloads, HubClient's bulk_window caps the chunk bytes in flight on a shared
+connection; the command line uses a connection of its own without that cap.
+
+Usage:
+    python omni_file_upload.py <local file> <remote path> [--window 4] [--chunk-kb 512]
+"""
+import os
+import sys
+import mmap
+import time
+import asyncio
+import logging
+import argparse
+import collections
+
+from omni_hub_client import HubClient, HubError
+from omni_hub_endpoints import hub_urls
+from omni_file_download import missing_ranges, sha256_file
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+DEFAULT_WINDOW = 4              # Chunks in flight
+DEFAULT_CHUNK = 512 << 10
+MAX_CHUNK = 1 << 20             # FileService.MaxUploadChunkSize on the hub
+MAX_RETRIES = 5                 # Consecutive rounds without progress before giving up
+CHUNK_TIMEOUT = 60
+RECONNECT_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+
+class UploadError(Exception):
+    pass
+
+def _status_field(status, name):
+    # PascalCase over MessagePack, camelCase over JSON
+    return next((value for key, value in status.items() if key.lower() == name.lower()), None)
+
+class ChunkedUpload:
+    def __init__(self, hub, local_path, remote_path, window=DEFAULT_WINDOW, chunk_size=DEFAULT_CHUNK, on_progress=None):
+        if not 0 < chunk_size <= MAX_CHUNK:
+            raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK}")
+        self.hub = hub
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.window = window
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.size = None
+        self.sha256 = None
+        self.upload_id = None
+        self.resumed = 0          # Bytes the hub already had when this run started
+        self.sent = 0             # Bytes sent by this run, including chunks resent after an interruption
+        self.acknowledged = 0     # Bytes the hub reports as on disk
+        self.rounds = 1           # BeginUpload calls; more than one means the upload was resumed mid-run
+        self.seconds = 0.0
+
+    async def run(self):
+        """Uploads (or resumes) the file; returns the written file's FileSystemEntry."""
+        started = time.perf_counter()
+        self.size = os.path.getsize(self.local_path)
+        self.sha256 = await asyncio.to_thread(sha256_file, self.local_path)
+        received = await self._begin()
+        self.resumed = self.acknowledged
+        if self.resumed:
+            logger.info(f"Resuming upload to {self.remote_path}: the hub has {self.resumed} of {self.size} bytes.")
+
+        try:
+            entry = await self._upload(received)
+        except OSError as e:
+            # The local file went away or changed size, so what the hub has can't be resumed
+            await self._give_up(e)
+            raise
+        self.seconds = time.perf_counter() - started
+        return entry
+
+    async def _upload(self, received):
+        with open(self.local_path, "rb") as f:
+            view = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ) if self.size else None
+            try:
+                failures = 0
+                while True:
+                    before = self.acknowledged
+                    try:
+                        await self._send(view, collections.deque(missing_ranges(self.size, received)))
+                        break
+                    except (HubError, ConnectionError, asyncio.TimeoutError) as e:
+                        failures = 0 if self.acknowledged > before else failures + 1
+                        if failures > MAX_RETRIES:
+                            raise UploadError(f"upload to {self.remote_path} made no progress in {failures} attempts: {e!r}") from e
+                        logger.warning(f"Upload interrupted ({e!r}); resuming from the hub's record.")
+                        await asyncio.sleep(min(0.25 * 2 ** failures, 5))
+                        # The hub reconnects on its own; its list of received ranges is what counts
+                        await asyncio.wait_for(self.hub.connected.wait(), RECONNECT_TIMEOUT)
+                        received = await self._begin()
+                        self.rounds += 1
+            finally:
+                if view:
+                    view.close()
+
+        try:
+            # The hub hashes the whole file before moving it into place
+            return await self.hub.invoke("CompleteUpload", self.upload_id, timeout=max(60, self.size / (20 << 20)))
+        except HubError as e:
+            # Rejected at the last step (e.g. the SHA-256 didn't match); a rerun would start over anyway
+            await self._give_up(e)
+            raise UploadError(f"hub rejected {self.remote_path}: {e}") from e
+
+    async def _begin(self):
+        try:
+            status = await self.hub.invoke("BeginUpload", self.remote_path, self.size, self.sha256)
+        except HubError as e:
+            raise UploadError(f"cannot upload to {self.remote_path}: {e}") from e
+        self.upload_id = _status_field(status, "uploadId")
+        self.acknowledged = _status_field(status, "receivedBytes") or 0
+        return [list(r) for r in _status_field(status, "received") or []]
+
+    async def _send(self, view, pending):
+        async def worker():
+            while pending:
+                start, end = pending[0]
+                stop = min(end, start + self.chunk_size)
+                if stop == end:
+                    pending.popleft()
+                else:
+                    pending[0] = [stop, end]
+                self.sent += stop - start
+                self.acknowledged = await self.hub.invoke("UploadChunk", self.upload_id, start, view[start:stop],
+                                                          timeout=CHUNK_TIMEOUT)
+                if self.on_progress:
+                    self.on_progress(self)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.window)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def abort(self):
+        """Discards the hub's staging file for this upload."""
+        if self.upload_id:
+            await self.hub.invoke("AbortUpload", self.upload_id)
+
+    async def _give_up(self, error):
+        logger.warning(f"Giving up on {self.remote_path} ({error!r}); discarding the hub's staging file.")
+        try:
+            await self.abort()
+        except (HubError, ConnectionError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not abort the upload: {e!r}")
+
+    def summary(self):
+        mb = self.sent / (1 << 20)
+        rate = mb / self.seconds if self.seconds else 0.0
+        resumed = f", {self.resumed / (1 << 20):.1f} MB already on the hub" if self.resumed else ""
+        interruptions = f", resumed {self.rounds - 1}x after interruptions" if self.rounds > 1 else ""
+        return (f"{self.remote_path}: {self.size} bytes; sent {mb:.1f} MB in {self.seconds:.2f} s ({rate:.1f} MB/s)"
+                f"{resumed}{interruptions}; SHA-256 verified by the hub")
+
+async def upload_file(args):
+    last_progress = 0.0
+
+    def print_progress(upload):
+        nonlocal last_progress
+        if time.monotonic() - last_progress < 0.5:
+            return
+        last_progress = time.monotonic()
+        print(f"\r{upload.acknowledged / (1 << 20):8.1f} / {upload.size / (1 << 20):.1f} MB on the hub   ",
+              end="", flush=True)
+
+    # A connection of its own, so the window isn't capped by bulk_window
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return 1
+    try:
+        upload = ChunkedUpload(hub, args.local, args.remote, window=args.window, chunk_size=args.chunk_kb << 10,
+                               on_progress=print_progress)
+        entry = await upload.run()
+        print()
+        print(upload.summary())
+        print(f"Written: {entry.path if entry is not None else args.remote}")
+        return 0
+    except (UploadError, OSError) as e:
+        print(f"\nUpload failed: {e}")
+        print("Run the same command again to resume.")
+        return 1
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload a file to the OmniSync hub's PC in resumable chunks.")
+    parser.add_argument("local", help="File to upload")
+    parser.add_argument("remote", help="Destination path on the hub's PC")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Chunks in flight")
+    parser.add_argument("--chunk-kb", type=int, default=DEFAULT_CHUNK >> 10, help=f"Chunk size (at most {MAX_CHUNK >> 10})")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+    if not 0 < args.chunk_kb <= MAX_CHUNK >> 10:
+        parser.error(f"--chunk-kb must be between 1 and {MAX_CHUNK >> 10}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        sys.exit(asyncio.run(upload_file(args)))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
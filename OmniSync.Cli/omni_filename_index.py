@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""Client-side trigram index of the file names on the hub's PC.
+
+SearchFiles walks the disk on the hub for every query and stops at 100 results.
+FilenameIndex crawls the browse roots once (with TreeWalker) and keeps every path,
+indexed by the trigrams (three-character substrings) of its lowercased name:
+
+    index = await FilenameIndex.build(hub)      # "" is the hub's browse root, or every drive
+    index.save()
+    ...
+    index = FilenameIndex.load()
+    for path in index.search("invoice"):        # every name containing "invoice"
+        print(path)
+    for score, path in index.fuzzy("invocie", limit=20):
+        print(f"{score:.2f} {path}")
+
+A substring query intersects the posting lists (sorted path ids) of its trigrams,
+smallest first, and checks the few names left; queries shorter than three characters
+scan the names. A fuzzy query counts, for every name, how many of the query's
+trigrams it contains and ranks by that share, so typos and swapped letters still
+match. Either way the cost depends on the matches, not on
+the size of the tree. Queries match names only, not the directories above them.
+
+On disk the index is a small header plus zlib sections: the paths in path order,
+a directory flag per path, the trigrams, and the delta-encoded posting lists. A
+posting list is only decoded the first time a query needs it, so loading stays
+cheap even for millions of paths.
+
+IndexUpdater keeps an index fresh. The hub watches every directory it lists (the
+crawl lists them all) and broadcasts FileChanged(fullPath, unixMs). The updater
+relists the parent directories of changed paths after a short debounce and applies
+the difference; new directories are crawled, removed ones drop their whole subtree.
+Events missed while disconnected can't be recovered, so a reconnect triggers a
+full recrawl. The hub only keeps watchers for the directories requested most
+recently, so on a large tree some changes go unreported; a periodic recrawl
+(`recrawl_every`, --recrawl-every) catches up with those.
+
+Usage:
+    python omni_filename_index.py build [root ...] [--window 16] [--index FILE]
+    python omni_filename_index.py search <text> [--fuzzy] [--limit N] [--files | --dirs] [--index FILE]
+    python omni_filename_index.py watch [root ...] [--save-every 60] [--recrawl-every 900] [--index FILE]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import math
+import heapq
+import struct
+import asyncio
+import bisect
+import getpass
+import logging
+import argparse
+import tempfile
+import itertools
+import collections
+from array import array
+
+from omni_hub_client import HubClient, HubError
+from omni_hub_endpoints import hub_urls
+from omni_tree_walker import TreeWalker, list_directory
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+MAGIC = b"OMNIIDX1"
+DEFAULT_WINDOW = 16             # Listing calls in flight while crawling
+DEBOUNCE = 0.5                  # Seconds to collect FileChanged events before relisting
+RECRAWL_EVERY = 900             # Seconds between recrawls for changes in directories the hub stopped watching
+NARROW_ENOUGH = 32              # Stop intersecting posting lists once this few candidates are left
+
+logger = logging.getLogger(__name__)
+
+def default_index_path():
+    return os.path.join(tempfile.gettempdir(), f"omnisync-filename-index-{getpass.getuser()}.bin")
+
+def _key(path):
+    # Windows paths: case-insensitive, with or without a trailing separator
+    return path.rstrip("\\/").lower()
+
+def _parent(path):
+    trimmed = path.rstrip("\\/")
+    parent = trimmed[:max(trimmed.rfind("\\"), trimmed.rfind("/"), 0)]
+    return parent + "\\" if parent.endswith(":") else parent    # "C:\\", not "C:"
+
+def _name(path):
+    trimmed = path.rstrip("\\/")
+    return trimmed[max(trimmed.rfind("\\"), trimmed.rfind("/")) + 1:] or path
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _intersect(small, large):
+    """Sorted ids in both lists; binary searches when one list is much longer than the other."""
+    if len(large) > 16 * len(small):
+        out = array("I")
+        low = 0
+        for value in small:
+            low = bisect.bisect_left(large, value, low)
+            if low == len(large):
+                break
+            if large[low] == value:
+                out.append(value)
+        return out
+    return array("I", sorted(set(small).intersection(large)))
+
+def _section(data):
+    packed = zlib.compress(data, 6)
+    return struct.pack("<I", len(packed)) + packed
+
+class FilenameIndex:
+    def __init__(self, roots=("",)):
+        self.roots = list(roots)
+        self.built = None            # Unix time of the crawl
+        self.crawl_seconds = 0.0
+        self.index_seconds = 0.0
+        self.paths = []              # id -> path; None once removed (ids are compacted on save)
+        self.directories = bytearray()
+        self.removed = 0
+        self._postings = {}          # trigram -> array of ids, decoded
+        self._packed = {}            # trigram -> (start, end) in _deltas, not decoded yet
+        self._deltas = array("I")
+        self._names = None           # id -> lowercased name, built for scans
+        self._ids = None             # path key -> id, built for updates
+        self._children = None        # parent key -> set of ids, built for updates
+
+    def __len__(self):
+        return len(self.paths) - self.removed
+
+    # --- Building ---
+
+    @classmethod
+    async def build(cls, hub, roots=("",), window=DEFAULT_WINDOW, on_progress=None):
+        """Crawls the roots and indexes every file and directory below them."""
+        index = cls(roots)
+        started = time.perf_counter()
+        walker = TreeWalker(hub, window=window)
+        seen = set()
+        paths, directories = [], []
+        for root in index.roots:
+            async for _, entry in walker.walk(root):
+                if _key(entry.path) in seen:
+                    continue      # Overlapping roots
+                seen.add(_key(entry.path))
+                paths.append(entry.path)
+                directories.append(entry.is_directory)
+                if on_progress and len(paths) % 10000 == 0:
+                    on_progress(len(paths), walker.listed)
+        index.crawl_seconds = time.perf_counter() - started
+        if walker.errors:
+            logger.warning(f"{len(walker.errors)} directories could not be listed and are missing from the index.")
+
+        # Seconds of CPU for big trees; off the event loop, so the connection stays alive
+        started = time.perf_counter()
+        await asyncio.to_thread(index._fill, paths, directories)
+        index.built = time.time()
+        index.index_seconds = time.perf_counter() - started
+        return index
+
+    def _fill(self, paths, directories):
+        order = sorted(range(len(paths)), key=lambda i: paths[i].lower())
+        self.paths = [paths[i] for i in order]
+        self.directories = bytearray(directories[i] for i in order)
+        postings = collections.defaultdict(lambda: array("I"))
+        for i, path in enumerate(self.paths):
+            for gram in trigrams(_name(path).lower()):
+                postings[gram].append(i)
+        self._postings = dict(postings)
+
+    async def recrawl(self, hub, window=DEFAULT_WINDOW):
+        """Replaces the contents with a fresh crawl of the same roots; queries keep working meanwhile."""
+        fresh = await FilenameIndex.build(hub, self.roots, window)
+        self.__dict__.update(fresh.__dict__)
+
+    # --- Queries ---
+
+    def _posting(self, gram):
+        posting = self._postings.get(gram)
+        if posting is None:
+            span = self._packed.pop(gram, None)
+            if span is None:
+                return array("I")
+            posting = self._postings[gram] = array("I", itertools.accumulate(self._deltas[span[0]:span[1]]))
+        return posting
+
+    def name(self, i):
+        if self._names is not None:
+            return self._names[i]
+        return _name(self.paths[i]).lower()
+
+    def _wanted(self, i, files, dirs):
+        return self.paths[i] is not None and (dirs if self.directories[i] else files)
+
+    def search(self, text, files=True, dirs=True):
+        """Yields every path whose name contains text (case-insensitive).
+
+        Paths come in path order, except that those added since the index was loaded
+        or saved come last.
+        """
+        needle = text.lower()
+        grams = trigrams(needle)
+        if not grams:
+            if self._names is None:
+                self._names = [_name(path).lower() if path is not None else "" for path in self.paths]
+            candidates = range(len(self.paths))
+        else:
+            lists = sorted((self._posting(gram) for gram in grams), key=len)
+            candidates = lists[0]
+            for posting in lists[1:]:
+                if len(candidates) <= NARROW_ENOUGH:
+                    break     # Cheaper to check the names than to intersect further
+                candidates = _intersect(candidates, posting)
+        for i in candidates:
+            if self._wanted(i, files, dirs) and needle in self.name(i):
+                yield self.paths[i]
+
+    def fuzzy(self, text, limit=None, min_score=0.4, files=True, dirs=True):
+        """Returns [(score, path)], best first: names containing enough of text's trigrams.
+
+        The score is the share of the query's trigrams found in the name, 1.0 when all
+        are (as for every substring match). Among equal scores, names closer in length
+        to the query rank first. Words are matched separately ("budget 2023" finds
+        "2023_Budget.xlsx"); queries without a word of three characters fall back to
+        search().
+        """
+        grams = set().union(*(trigrams(word) for word in text.lower().split()))
+        if not grams:
+            matches = [(1.0, path) for path in self.search(text, files, dirs)]
+            return matches[:limit] if limit is not None else matches
+        counts = collections.Counter()
+        for gram in grams:
+            counts.update(self._posting(gram))
+        threshold = max(1, math.ceil(min_score * len(grams)))
+        scored = []
+        for i, shared in counts.items():
+            if shared >= threshold and self._wanted(i, files, dirs):
+                # Jaccard similarity of the two trigram sets breaks ties
+                similarity = shared / (len(grams) + max(len(self.name(i)) - 2, 0) - shared)
+                scored.append((shared, similarity, i))
+        best = heapq.nlargest(limit, scored) if limit is not None else sorted(scored, reverse=True)
+        return [(shared / len(grams), self.paths[i]) for shared, _, i in best]
+
+    # --- Updates ---
+
+    def _ensure_maps(self):
+        if self._ids is not None:
+            return
+        self._ids = {}
+        self._children = collections.defaultdict(set)
+        for i, path in enumerate(self.paths):
+            if path is not None:
+                self._ids[_key(path)] = i
+                self._children[_key(_parent(path))].add(i)
+
+    def knows_directory(self, path):
+        self._ensure_maps()
+        key = _key(path)
+        i = self._ids.get(key)
+        return (i is not None and self.directories[i]) or key in self._children
+
+    def add(self, path, is_directory):
+        self._ensure_maps()
+        key = _key(path)
+        if key in self._ids:
+            return self._ids[key]
+        i = len(self.paths)
+        self.paths.append(path)
+        self.directories.append(bool(is_directory))
+        name = _name(path).lower()
+        if self._names is not None:
+            self._names.append(name)
+        for gram in trigrams(name):
+            posting = self._posting(gram)
+            if not posting:
+                self._postings[gram] = posting
+            posting.append(i)          # Ids only grow, so the list stays sorted
+        self._ids[key] = i
+        self._children[_key(_parent(path))].add(i)
+        return i
+
+    def remove(self, path):
+        """Removes path and, for a directory, everything below it; returns how many paths went."""
+        self._ensure_maps()
+        i = self._ids.get(_key(path))
+        return self._remove_id(i) if i is not None else 0
+
+    def _remove_id(self, i):
+        removed = 0
+        stack = [i]
+        while stack:
+            i = stack.pop()
+            path = self.paths[i]
+            key = _key(path)
+            # Stale ids stay in the posting lists until the next save; queries skip them
+            self.paths[i] = None
+            if self._names is not None:
+                self._names[i] = ""
+            del self._ids[key]
+            self._children[_key(_parent(path))].discard(i)
+            stack.extend(self._children.pop(key, ()))
+            removed += 1
+        self.removed += removed
+        return removed
+
+    async def refresh_directory(self, hub, directory, window=DEFAULT_WINDOW):
+        """Relists one directory and applies the difference; returns (paths added, paths removed)."""
+        self._ensure_maps()
+        try:
+            entries = await list_directory(hub, directory)
+        except HubError:
+            # Gone (or no longer readable): drop it with everything below it
+            return 0, self.remove(directory)
+        current = {_key(entry.path): entry for entry in entries if entry.name != ".."}
+        known = {_key(self.paths[i]): i for i in self._children.get(_key(directory), ())}
+        removed = sum(self._remove_id(i) for key, i in known.items() if key not in current)
+        added = 0
+        for key, entry in current.items():
+            if key in known:
+                if bool(self.directories[known[key]]) == entry.is_directory:
+                    continue
+                removed += self._remove_id(known[key])   # A file replaced by a directory, or vice versa
+            self.add(entry.path, entry.is_directory)
+            added += 1
+            if entry.is_directory:
+                async for _, below in TreeWalker(hub, window=window).walk(entry.path):
+                    self.add(below.path, below.is_directory)
+                    added += 1
+        return added, removed
+
+    # --- Storage ---
+
+    def save(self, path=None):
+        """Writes the index compacted and in path order; removed ids are dropped."""
+        path = path or default_index_path()
+        kept = sorted(((p, flag) for p, flag in zip(self.paths, self.directories) if p is not None),
+                      key=lambda item: item[0].lower())
+        live = [p for p, _ in kept]
+        directories = bytearray(flag for _, flag in kept)
+        postings = collections.defaultdict(lambda: array("I"))
+        for i, p in enumerate(live):
+            for gram in trigrams(_name(p).lower()):
+                postings[gram].append(i)
+        grams = sorted(postings)
+        lengths = array("I", (len(postings[gram]) for gram in grams))
+        deltas = array("I")
+        for gram in grams:
+            posting = postings[gram]
+            deltas.append(posting[0])
+            deltas.extend(b - a for a, b in zip(posting, itertools.islice(posting, 1, None)))
+        header = json.dumps({"version": 1, "roots": self.roots, "built": self.built, "count": len(live)}).encode()
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(_section("\n".join(live).encode("utf-8")))
+            f.write(_section(bytes(directories)))
+            f.write(_section("".join(grams).encode("utf-8")))
+            f.write(_section(lengths.tobytes()))
+            f.write(_section(deltas.tobytes()))
+        os.replace(temp_path, path)
+
+        # Adopt the compacted layout, so ids match the file again
+        self.paths, self.directories, self.removed = live, directories, 0
+        self._postings, self._packed, self._deltas = dict(postings), {}, array("I")
+        self._names = self._ids = self._children = None
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or default_index_path()
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a filename index")
+        offset = len(MAGIC)
+        (length,) = struct.unpack_from("<I", data, offset)
+        header = json.loads(data[offset + 4:offset + 4 + length])
+        offset += 4 + length
+        sections = []
+        for _ in range(5):
+            (length,) = struct.unpack_from("<I", data, offset)
+            sections.append(zlib.decompress(data[offset + 4:offset + 4 + length]))
+            offset += 4 + length
+        paths, directories, grams, lengths, deltas = sections
+
+        index = cls(header["roots"])
+        index.built = header["built"]
+        index.paths = paths.decode("utf-8").split("\n") if header["count"] else []
+        index.directories = bytearray(directories)
+        grams = grams.decode("utf-8")
+        lengths = array("I", lengths)
+        index._deltas = array("I", deltas)
+        starts = itertools.accumulate(lengths, initial=0)
+        index._packed = {grams[3 * n:3 * n + 3]: (start, start + size)
+                         for n, (start, size) in enumerate(zip(starts, lengths))}
+        return index
+
+class IndexUpdater:
+    def __init__(self, hub, index, window=DEFAULT_WINDOW, debounce=DEBOUNCE, recrawl_every=RECRAWL_EVERY):
+        self.hub = hub
+        self.index = index
+        self.window = window
+        self.debounce = debounce
+        self.recrawl_every = recrawl_every
+        self.events = 0
+        self.refreshes = 0
+        self.recrawls = 0
+        self._dirty = set()          # Directories to relist
+        self._recrawl = False
+        self._wake = asyncio.Event()
+        hub.on("FileChanged", self._file_changed)
+        hub.on_open(self._reconnected)
+
+    def _file_changed(self, full_path, unix_ms=None):
+        self.events += 1
+        self._dirty.add(_parent(full_path) or full_path)
+        self._wake.set()
+
+    def _reconnected(self):
+        # Whatever changed while disconnected went unreported
+        self._recrawl = True
+        self._wake.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        recrawl_at = loop.time() + self.recrawl_every if self.recrawl_every else None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), None if recrawl_at is None else max(0, recrawl_at - loop.time()))
+            except asyncio.TimeoutError:
+                self._recrawl = True
+            await asyncio.sleep(self.debounce)
+            self._wake.clear()
+            if self._recrawl:
+                self._recrawl = False
+                self._dirty.clear()
+                await self.index.recrawl(self.hub, self.window)
+                self.recrawls += 1
+                if recrawl_at is not None:
+                    recrawl_at = loop.time() + self.recrawl_every
+                logger.info(f"Recrawled: {len(self.index)} paths.")
+                continue
+            dirty, self._dirty = self._dirty, set()
+            for directory in dirty:
+                # Events also arrive for directories other clients are watching
+                if not self.index.knows_directory(directory):
+                    continue
+                try:
+                    added, removed = await self.index.refresh_directory(self.hub, directory, self.window)
+                except (ConnectionError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Could not relist {directory}: {e!r}")
+                    self._dirty.add(directory)
+                    continue
+                self.refreshes += 1
+                if added or removed:
+                    logger.info(f"{directory}: +{added} -{removed}")
+
+async def connect(args):
+    hub = HubClient(args.hub_url, api_key=API_KEY)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return None
+    return hub
+
+def print_build(index, size, path):
+    print(f"Indexed {len(index)} paths in {index.crawl_seconds:.1f} s crawling + {index.index_seconds:.2f} s indexing; "
+          f"{size / (1 << 20):.1f} MB at {path}")
+
+async def build_index(args):
+    hub = await connect(args)
+    if hub is None:
+        return 1
+    try:
+        index = await FilenameIndex.build(hub, args.roots or [""], window=args.window,
+                                          on_progress=lambda paths, dirs: print(
+                                              f"\r{paths} paths in {dirs} directories...", end="", flush=True))
+        print()
+        print_build(index, index.save(args.index), args.index)
+        return 0
+    finally:
+        await hub.stop()
+
+async def watch_index(args):
+    hub = await connect(args)
+    if hub is None:
+        return 1
+    try:
+        # Subscribed before crawling, so changes made during the crawl aren't lost
+        index = FilenameIndex(args.roots or [""])
+        updater = IndexUpdater(hub, index, window=args.window, recrawl_every=args.recrawl_every or None)
+        await index.recrawl(hub, args.window)
+        print_build(index, index.save(args.index), args.index)
+        task = asyncio.ensure_future(updater.run())
+        try:
+            while True:
+                await asyncio.sleep(args.save_every)
+                if updater.refreshes or updater.recrawls:
+                    index.save(args.index)
+                    print(f"Saved {len(index)} paths ({updater.events} events, {updater.refreshes} directories relisted)")
+                    updater.refreshes = updater.recrawls = 0
+        finally:
+            task.cancel()
+            index.save(args.index)
+    finally:
+        await hub.stop()
+
+def search_index(args):
+    try:
+        index = FilenameIndex.load(args.index)
+    except FileNotFoundError:
+        print(f"No index at {args.index}; run: python omni_filename_index.py build")
+        return 1
+    started = time.perf_counter()
+    files, dirs = not args.dirs, not args.files
+    if args.fuzzy:
+        results = [f"{score:.2f}  {path}" for score, path in index.fuzzy(args.text, args.limit, files=files, dirs=dirs)]
+    else:
+        results = list(itertools.islice(index.search(args.text, files=files, dirs=dirs), args.limit))
+    elapsed = time.perf_counter() - started
+    for line in results:
+        print(line)
+    print(f"{len(results)} matches among {len(index)} paths in {elapsed * 1000:.1f} ms"
+          f" (index built {time.strftime('%Y-%m-%d %H:%M', time.localtime(index.built))})", file=sys.stderr)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Instant file name search over a local index of the hub's PC.")
+    sub = parser.add_subparsers(dest="action", required=True)
+    build = sub.add_parser("build", help="Crawl the hub's file system and write the index")
+    watch = sub.add_parser("watch", help="Crawl, then keep the index fresh from FileChanged events")
+    for command in (build, watch):
+        command.add_argument("roots", nargs="*", help="Directories to index (default: the hub's browse root, or all drives)")
+        command.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Directory listings in flight")
+        command.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    watch.add_argument("--save-every", type=float, default=60.0, help="Seconds between saves of a changed index")
+    watch.add_argument("--recrawl-every", type=float, default=RECRAWL_EVERY,
+                       help="Seconds between full recrawls, for changes the hub didn't report (0: never)")
+    search = sub.add_parser("search", help="Query the index")
+    search.add_argument("text")
+    search.add_argument("--fuzzy", action="store_true", help="Rank by trigram similarity instead of exact substring")
+    search.add_argument("--limit", type=int, default=None, help="At most this many results (default: all)")
+    kinds = search.add_mutually_exclusive_group()
+    kinds.add_argument("--files", action="store_true", help="Files only")
+    kinds.add_argument("--dirs", action="store_true", help="Directories only")
+    for command in (build, watch, search):
+        command.add_argument("--index", default=default_index_path(), help="Index file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.action == "watch" else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.action == "search":
+        sys.exit(search_index(args))
+    try:
+        sys.exit(asyncio.run(build_index(args) if args.action == "build" else watch_index(args)))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Local connection broker for the OmniSync hub.
+
+Runs as a small daemon that holds one authenticated, auto-reconnecting HubClient
+and serves local processes over a Unix domain socket (a named pipe on Windows).
+A one-shot script then skips negotiate, the websocket handshake and Authenticate
+and only pays for a local connect plus the hub round trip.
+
+The local wire format is one JSON object per line:
+
+    -> {"id": 1, "op": "invoke", "target": "ListDirectory", "args": ["C:\\\\"], "timeout": 30}
+    <- {"id": 1, "result": [...]}
+    <- {"id": 1, "error": "...", "kind": "hub" | "timeout" | "connection" | "request"}
+    -> {"id": 2, "op": "send", "target": "SendAiStatus", "args": ["hi"]}
+    <- {"id": 2, "result": null}
+    -> {"id": 3, "op": "subscribe", "targets": ["ReceiveCommandOutput"]}
+    <- {"id": 3, "result": null}
+    <- {"event": "ReceiveCommandOutput", "args": ["..."]}
+    -> {"id": 4, "op": "hello"}
+    <- {"id": 4, "result": {"hub_url": "...", "connected": true, "connection_id": "..."}}
+
+Every local client shares the broker's hub connection, so caller-targeted events
+(e.g. ReceiveCommandOutput) reach every client subscribed to them. It also means
+the hub runs their invocations one at a time: SignalR allows one invocation in
+progress per connection by default, so one client's long call (a slow ExecuteCommand,
+a big SearchFiles) holds up every other client's invocations until it returns.
+Scripts that make long calls should open their own HubClient instead of
+going through the broker.
+
+BrokerClient mirrors the HubClient API (start/stop/on/send/invoke), so scripts
+can use whichever is available; see connect_hub().
+
+One-shot calls from a shell go through omni_hub_call.py, which stays free of
+asyncio and websockets to keep its startup cost down.
+
+Usage:
+    python omni_hub_broker.py [--hub-url URL] [--address PATH]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import datetime
+import logging
+import argparse
+
+from omni_hub_client import HubClient, HubError
+from omni_hub_call import default_address
+from omni_hub_endpoints import hub_urls
+from omni_hub_entries import EntryList, decode_event, decode_result
+from omni_hub_latency import LatencyRecorder
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+STREAM_LIMIT = 64 * 1024 * 1024   # Largest single line (e.g. a base64 file chunk) on the local socket
+
+logger = logging.getLogger("OmniHubBroker")
+
+async def _serve(handle_client, address):
+    if sys.platform == "win32":
+        loop = asyncio.get_running_loop()
+
+        def factory():
+            reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+            return asyncio.StreamReaderProtocol(reader, handle_client)
+
+        # Proactor-only API; each pipe instance accepts one client and is replaced automatically
+        servers = await loop.start_serving_pipe(factory, address)
+        return lambda: [server.close() for server in servers]
+
+    if os.path.exists(address):
+        os.unlink(address)
+    server = await asyncio.start_unix_server(handle_client, address, limit=STREAM_LIMIT)
+    os.chmod(address, 0o600)
+
+    def close():
+        server.close()
+        if os.path.exists(address):
+            os.unlink(address)
+    return close
+
+async def _open(address):
+    if sys.platform == "win32":
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.create_pipe_connection(lambda: protocol, address)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+    return await asyncio.open_unix_connection(address, limit=STREAM_LIMIT)
+
+def _json_default(value):
+    # Values only the MessagePack hub protocol produces; render them the way the JSON protocol does
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, EntryList):
+        return value.to_dicts()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":"), default=_json_default) + "\n").encode("utf-8")
+
+class HubBroker:
+    def __init__(self, hub_url=HUB_URL, api_key=API_KEY, address=None, latency=None):
+        self.hub_url = hub_url
+        self.address = address or default_address()
+        self.latency = latency
+        self.hub = HubClient(hub_url, api_key=api_key, keep_alive_interval=10, latency=latency)
+        self.subscribers = {}   # lowercased target -> set of client writers
+        self.clients = set()
+        self._close_server = None
+
+    async def run(self):
+        self.hub.on_open(lambda: logger.info(f"Hub connection up ({self.hub.connection_id})"))
+        self.hub.on_close(lambda: logger.warning("Hub connection lost, reconnecting..."))
+        await self.hub.start()
+        self._close_server = await _serve(self._handle_client, self.address)
+        logger.info(f"Broker serving {self.hub_url} on {self.address}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._close_server()
+            await self.hub.stop()
+            if self.latency:
+                self.latency.save()
+
+    def _subscribe(self, target, writer):
+        key = target.lower()
+        if key not in self.subscribers:
+            self.subscribers[key] = set()
+            self.hub.on(target, lambda *args: self._publish(target, key, args))
+        self.subscribers[key].add(writer)
+
+    def _publish(self, target, key, args):
+        line = _encode({"event": target, "args": list(args)})
+        for writer in list(self.subscribers.get(key, ())):
+            if writer.is_closing():
+                self.subscribers[key].discard(writer)
+            else:
+                writer.write(line)
+
+    async def _handle_client(self, reader, writer):
+        self.clients.add(writer)
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    writer.write(_encode({"id": None, "error": "Malformed request", "kind": "request"}))
+                    continue
+                # Requests run concurrently so a slow invocation doesn't hold up the ones behind it
+                task = asyncio.create_task(self._handle_request(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for subscribers in self.subscribers.values():
+                subscribers.discard(writer)
+            self.clients.discard(writer)
+            writer.close()
+
+    async def _handle_request(self, request, writer):
+        reply = {"id": request.get("id")}
+        op = request.get("op")
+        try:
+            if op == "invoke":
+                reply["result"] = await self.hub.invoke(request["target"], *request.get("args", []),
+                                                        timeout=request.get("timeout", 30))
+            elif op == "send":
+                await self.hub.send(request["target"], *request.get("args", []))
+                reply["result"] = None
+            elif op == "subscribe":
+                for target in request.get("targets", []):
+                    self._subscribe(target, writer)
+                reply["result"] = None
+            elif op == "hello":
+                reply["result"] = {"hub_url": self.hub_url, "connected": self.hub.connected.is_set(),
+                                   "connection_id": self.hub.connection_id}
+            else:
+                reply.update(error=f"Unknown op: {op}", kind="request")
+        except HubError as e:
+            reply.update(error=str(e), kind="hub")
+        except asyncio.TimeoutError:
+            reply.update(error="Timed out waiting for the hub", kind="timeout")
+        except ConnectionError as e:
+            reply.update(error=str(e), kind="connection")
+        except (KeyError, TypeError) as e:
+            reply.update(error=f"Bad request: {e}", kind="request")
+        if not writer.is_closing():
+            writer.write(_encode(reply))
+
+class BrokerClient:
+    """HubClient-compatible client that talks to a running broker instead of the hub."""
+
+    def __init__(self, address=None, latency=None):
+        self.address = address or default_address()
+        self.latency = latency
+        self.hub_url = None
+        self.connection_id = None
+        self._handlers = {}
+        self._open_callbacks = []
+        self._close_callbacks = []
+        self._pending = {}
+        self._next_id = 0
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+
+    def on(self, target, handler):
+        self._handlers.setdefault(target.lower(), []).append(handler)
+        if self._writer:
+            # Written synchronously so it reaches the broker ahead of any later request
+            self._writer.write(_encode({"id": None, "op": "subscribe", "targets": [target]}))
+
+    def off(self, target, handler):
+        """Removes a handler added with on()."""
+        key = target.lower()
+        handlers = list(self._handlers.get(key, ()))   # A copy: dispatch may be iterating the old list
+        if handler in handlers:
+            handlers.remove(handler)
+        if handlers:
+            self._handlers[key] = handlers
+        else:
+            self._handlers.pop(key, None)
+
+    def on_open(self, callback):
+        self._open_callbacks.append(callback)
+
+    def on_close(self, callback):
+        self._close_callbacks.append(callback)
+
+    async def start(self):
+        self._reader, self._writer = await _open(self.address)
+        self._reader_task = asyncio.create_task(self._read_loop())
+        hello = await self._request({"op": "hello"})
+        self.hub_url, self.connection_id = hello["hub_url"], hello["connection_id"]
+        if self._handlers:
+            await self._request({"op": "subscribe", "targets": list(self._handlers)})
+        for callback in self._open_callbacks:
+            callback()
+
+    async def stop(self, flush_timeout=5):
+        if self._writer:
+            self._writer.close()
+        if self._reader_task:
+            await asyncio.wait([self._reader_task], timeout=flush_timeout)
+
+    async def send(self, target, *arguments):
+        await self._request({"op": "send", "target": target, "args": list(arguments)})
+
+    async def invoke(self, target, *arguments, timeout=30):
+        # The broker enforces the timeout; the local wait gets a little slack on top
+        queued = time.perf_counter()
+        result = await asyncio.wait_for(
+            self._request({"op": "invoke", "target": target, "args": list(arguments), "timeout": timeout}),
+            timeout + 5)
+        if self.latency:
+            self.latency.record(target, time.perf_counter() - queued)
+        return decode_result(target, result)
+
+    async def _request(self, request):
+        self._next_id += 1
+        request["id"] = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        try:
+            self._writer.write(_encode(request))
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request["id"], None)
+
+    async def _read_loop(self):
+        try:
+            while line := await self._reader.readline():
+                message = json.loads(line)
+                if "event" in message:
+                    arguments = decode_event(message["event"], message["args"])
+                    for handler in self._handlers.get(message["event"].lower(), []):
+                        result = handler(*arguments)
+                        if asyncio.iscoroutine(result):
+                            asyncio.create_task(result)
+                    continue
+                future = self._pending.pop(message.get("id"), None)
+                if not future or future.done():
+                    continue
+                kind = message.get("kind")
+                if kind is None:
+                    future.set_result(message.get("result"))
+                elif kind == "hub":
+                    future.set_exception(HubError(message["error"]))
+                elif kind == "timeout":
+                    future.set_exception(asyncio.TimeoutError(message["error"]))
+                elif kind == "connection":
+                    future.set_exception(ConnectionError(message["error"]))
+                else:
+                    future.set_exception(ValueError(message["error"]))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Broker connection closed"))
+            for callback in self._close_callbacks:
+                callback()
+
+def _url_list(hub_url):
+    return [hub_url] if isinstance(hub_url, str) else list(hub_url or [])
+
+async def connect_hub(hub_url, api_key, **hub_options):
+    """Returns a started client: the local broker when it serves hub_url, otherwise a direct HubClient.
+
+    Invocations through the broker queue behind other clients' (see the module docstring).
+    """
+    broker = BrokerClient(latency=hub_options.get("latency"))
+    try:
+        await asyncio.wait_for(broker.start(), timeout=2)
+        if _url_list(broker.hub_url) == _url_list(hub_url):
+            return broker
+    except (OSError, asyncio.TimeoutError, ValueError):
+        pass
+    # Not used (other hub, or no answer in time after connecting): don't leave the socket open
+    await broker.stop(flush_timeout=1)
+    hub = HubClient(hub_url, api_key=api_key, **hub_options)
+    await hub.start()
+    return hub
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local connection to the OmniSync hub.")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    parser.add_argument("--address", default=None, help="Socket path / pipe name (default: per-user)")
+    parser.add_argument("--latency", metavar="FILE", help="Record per-method round-trip histograms, saved to FILE every few seconds "
+                                                         "(view with: omni_hub_latency.py live FILE)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    latency = LatencyRecorder(args.latency, autosave_interval=5, label=f"broker {args.hub_url}") if args.latency else None
+    try:
+        asyncio.run(HubBroker(args.hub_url, API_KEY, args.address, latency).run())
+    except KeyboardInterrupt:
+        logger.info("Broker stopped.")
+
+if __name__ == "__main__":
+    main()
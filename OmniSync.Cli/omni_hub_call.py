@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""One-shot hub calls through a running omni_hub_broker.
+
+Deliberately stdlib-only and blocking (no asyncio, no websockets) so that a call
+costs little more than interpreter startup plus the hub round trip.
+
+Usage:
+    python omni_hub_call.py GetVolume
+    python omni_hub_call.py ListDirectory '"C:\\\\"'
+    python omni_hub_call.py --send SendAiStatus Working...
+"""
+import os
+import sys
+import json
+import time
+import socket
+import getpass
+import argparse
+import tempfile
+
+class BrokerCallError(Exception):
+    """The broker answered with an error; `kind` is hub, timeout, connection or request."""
+
+    def __init__(self, message, kind):
+        super().__init__(message)
+        self.kind = kind
+
+def default_address():
+    """Per-user broker address: a named pipe on Windows, a Unix socket elsewhere."""
+    if sys.platform == "win32":
+        return f"\\\\.\\pipe\\omnisync-hub-broker-{getpass.getuser()}"
+    return os.path.join(tempfile.gettempdir(), f"omnisync-hub-broker-{os.getuid()}.sock")
+
+def _open(address):
+    if sys.platform == "win32":
+        return open(address, "r+b", buffering=0)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock.makefile("rwb", buffering=0)
+
+def call(target, *arguments, op="invoke", timeout=30, address=None):
+    """Invokes (or sends) a hub method through the broker and returns the result."""
+    request = {"id": 1, "op": op, "target": target, "args": list(arguments), "timeout": timeout}
+    with _open(address or default_address()) as pipe:
+        pipe.write((json.dumps(request, separators=(",", ":")) + "\n").encode("utf-8"))
+        reply = json.loads(pipe.readline())
+    if "error" in reply:
+        raise BrokerCallError(reply["error"], reply.get("kind"))
+    return reply.get("result")
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoke a hub method through the local broker and print the result.")
+    parser.add_argument("target")
+    parser.add_argument("args", nargs="*", help="JSON-encoded arguments (bare words are taken as strings)")
+    parser.add_argument("--send", action="store_true", help="Fire-and-forget instead of waiting for the hub's completion")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--address", default=None, help="Broker socket path / pipe name (default: per-user)")
+    args = parser.parse_args()
+
+    arguments = []
+    for raw in args.args:
+        try:
+            arguments.append(json.loads(raw))
+        except ValueError:
+            arguments.append(raw)
+
+    start = time.perf_counter()
+    try:
+        result = call(args.target, *arguments, op="send" if args.send else "invoke",
+                      timeout=args.timeout, address=args.address)
+    except OSError as e:
+        print(f"Broker not reachable at {args.address or default_address()}: {e}", file=sys.stderr)
+        print("Start it with: python omni_hub_broker.py", file=sys.stderr)
+        return 1
+    except BrokerCallError as e:
+        print(f"Error ({e.kind}): {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms via broker)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""Asyncio-native SignalR client shared by the OmniSync Python tools.
+
+Speaks the SignalR JSON hub protocol over a websocket directly on the event loop,
+so there are no transport threads and no call_soon_threadsafe hops: handlers run on
+the loop, start() is awaitable and send() applies backpressure through a bounded
+outgoing queue drained by a single writer task (which also keeps message order).
+
+    hub = HubClient("http://127.0.0.1:5000/signalrhub", api_key="...")
+    hub.on("ReceiveAiResponse", lambda response: print(response))
+    await hub.start()                                   # returns once authenticated
+    await hub.send("SendAiMessage", "hello")            # fire-and-forget
+    entries = await hub.invoke("ListDirectory", "C:\\")  # waits for the hub's completion
+    drives, procs = await asyncio.gather(               # invocations pipeline freely
+        hub.invoke("ListDirectory", "D:\\"), hub.invoke("ListProcesses"))
+    await hub.stop()
+
+The MessagePack hub protocol is used when the `msgpack` package is installed and the
+hub offers it (falling back to JSON otherwise); binary results such as GetFileChunk
+then arrive as bytes instead of base64 text. Note that MessagePack keeps .NET
+property names as they are (PascalCase), where JSON camel-cases them.
+
+FileSystemEntry arrays (ListDirectory, SearchFiles, GetAvailableDrives and their
+Receive* events) are returned as compact EntryLists (omni_hub_entries) whose
+entries answer to either casing.
+
+Sends that must survive a hub restart (or a crash of this process) can be made
+durable by passing an OutboundJournal (omni_hub_journal) and send(..., durable=True):
+they are journaled, replayed in order after re-authentication and dropped once
+their TTL has passed.
+
+Pass latency=LatencyRecorder() (omni_hub_latency) to keep per-method round-trip
+histograms of every invoke() and send().
+
+The hub runs one invocation per connection at a time, so input sent while a download
+or upload is in flight waits behind every chunk requested before it. Invocations of bulk
+methods (BULK_TARGETS) therefore only go out while the estimated size of bulk transfers
+in flight stays under bulk_window bytes; interactive calls are never held back and so
+queue behind at most that much. bulk_window=None turns the limit off.
+
+`url` may also be a list of hub URLs (see omni_hub_endpoints.hub_urls()): every
+connect then races them and uses whichever negotiates first.
+
+Handlers receive the invocation arguments positionally and may be coroutines.
+invoke() raises HubError when the hub method throws, asyncio.TimeoutError when no
+completion arrives in time and ConnectionError when the connection drops first.
+Requires the `websockets` package; `msgpack` is optional.
+"""
+import ssl
+import json
+import base64
+import time
+import asyncio
+import logging
+import urllib.parse
+
+from omni_hub_endpoints import EndpointCache, race
+from omni_hub_entries import decode_event, decode_result
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger("OmniHubClient")
+
+RECORD_SEPARATOR = "\x1e"
+
+# SignalR hub message types
+INVOCATION = 1
+STREAM_ITEM = 2
+COMPLETION = 3
+STREAM_INVOCATION = 4
+CANCEL_INVOCATION = 5
+PING = 6
+CLOSE = 7
+
+# Hub methods with large responses (or requests), and an estimate of their size from the arguments
+BULK_TARGETS = {
+    "GetFileChunk": lambda path, offset, size: size,
+    "UploadChunk": lambda upload_id, offset, data: len(data),
+    "ListDirectory": lambda *arguments: 64 << 10,
+    "GetDirectoryListing": lambda *arguments: 64 << 10,
+    "SearchFiles": lambda *arguments: 64 << 10,
+}
+DEFAULT_BULK_WINDOW = 1 << 20
+
+def ws_connect(url, **options):
+    # Imported on first use: it is the bulk of this module's import time, and broker
+    # clients (omni_hub_broker) never open a websocket themselves
+    try:
+        from websockets.asyncio.client import connect
+    except ImportError:  # websockets < 13
+        from websockets import connect
+    return connect(url, **options)
+
+async def http_request(url, method="GET", body=b"", headers=None, timeout=10):
+    """Minimal one-shot HTTP/1.1 request on the event loop. Returns (status, headers, body)."""
+    parts = urllib.parse.urlsplit(url)
+    secure = parts.scheme in ("https", "wss")
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None), timeout)
+    try:
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    head_lines = head.decode("latin-1").split("\r\n")
+    status = int(head_lines[0].split()[1])
+    response_headers = {}
+    for line in head_lines[1:]:
+        name, _, value = line.partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    if response_headers.get("transfer-encoding", "").lower() == "chunked":
+        payload = _dechunk(payload)
+    return status, response_headers, payload
+
+def _dechunk(data):
+    body = bytearray()
+    pos = 0
+    while True:
+        line_end = data.index(b"\r\n", pos)
+        size = int(data[pos:line_end].split(b";")[0], 16)
+        if size == 0:
+            return bytes(body)
+        body += data[line_end + 2:line_end + 2 + size]
+        pos = line_end + 2 + size + 2
+
+class HubError(Exception):
+    """The hub method threw; carries the error text from the completion message."""
+
+def is_unknown_method(error):
+    """Whether a HubError means the hub has no such method (an older hub build)."""
+    return isinstance(error, HubError) and "Unknown hub method" in str(error)
+
+def _json_default(value):
+    # byte[] parameters (UploadChunk) travel as base64 text in the JSON protocol
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class JsonHubProtocol:
+    name = "json"
+    version = 1
+
+    def encode(self, message):
+        return json.dumps(message, separators=(",", ":"), default=_json_default) + RECORD_SEPARATOR
+
+    def join(self, encoded_messages):
+        return "".join(encoded_messages)
+
+    def decode(self, data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return [json.loads(frame) for frame in data.split(RECORD_SEPARATOR) if frame]
+
+# MessagePack completion result kinds
+RESULT_ERROR = 1
+RESULT_VOID = 2
+RESULT_NON_VOID = 3
+
+class MessagePackHubProtocol:
+    """SignalR MessagePack hub protocol: varint length-prefixed MessagePack arrays."""
+    name = "messagepack"
+    version = 1
+
+    def encode(self, message):
+        message_type = message["type"]
+        if message_type == INVOCATION:
+            payload = [INVOCATION, {}, message.get("invocationId"), message["target"], message["arguments"], []]
+        elif message_type == CANCEL_INVOCATION:
+            payload = [CANCEL_INVOCATION, {}, message["invocationId"]]
+        else:
+            payload = [message_type]
+        body = msgpack.packb(payload, use_bin_type=True)
+        prefix = bytearray()
+        length = len(body)
+        while True:
+            byte = length & 0x7F
+            length >>= 7
+            prefix.append(byte | 0x80 if length else byte)
+            if not length:
+                return bytes(prefix) + body
+
+    def join(self, encoded_messages):
+        return b"".join(encoded_messages)
+
+    def decode(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        view = memoryview(data)
+        messages = []
+        pos = 0
+        while pos < len(view):
+            length = shift = 0
+            while True:
+                byte = view[pos]
+                pos += 1
+                length |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            # unpackb reads straight from the memoryview slice, so frames are never copied
+            item = msgpack.unpackb(view[pos:pos + length], raw=False, timestamp=3, strict_map_key=False)
+            pos += length
+            message = self._to_message(item)
+            if message:
+                messages.append(message)
+        return messages
+
+    @staticmethod
+    def _to_message(item):
+        message_type = item[0]
+        if message_type == INVOCATION:
+            return {"type": INVOCATION, "invocationId": item[2], "target": item[3], "arguments": item[4]}
+        if message_type == STREAM_ITEM:
+            return {"type": STREAM_ITEM, "invocationId": item[2], "item": item[3]}
+        if message_type == COMPLETION:
+            message = {"type": COMPLETION, "invocationId": item[2]}
+            if item[3] == RESULT_ERROR:
+                message["error"] = item[4]
+            elif item[3] == RESULT_NON_VOID:
+                message["result"] = item[4]
+            return message
+        if message_type == CLOSE:
+            return {"type": CLOSE, "error": item[1] if len(item) > 1 else None}
+        if message_type == PING:
+            return {"type": PING}
+        return None
+
+def default_protocols():
+    """Protocols to offer, in order of preference."""
+    return [MessagePackHubProtocol(), JsonHubProtocol()] if msgpack else [JsonHubProtocol()]
+
+class HubClient:
+    def __init__(self, url, api_key=None, reconnect_intervals=(0, 1, 2, 5, 10),
+                 keep_alive_interval=15, server_timeout=30, send_queue_size=256, max_batch=64, protocol=None,
+                 journal=None, latency=None, bulk_window=DEFAULT_BULK_WINDOW):
+        self.urls = [url] if isinstance(url, str) else list(url)
+        self.url = self.urls[0]      # The endpoint of the current connection
+        self._endpoint_cache = EndpointCache() if len(self.urls) > 1 else None
+        self.api_key = api_key
+        self.reconnect_intervals = reconnect_intervals
+        self.keep_alive_interval = keep_alive_interval
+        self.server_timeout = server_timeout
+        self.max_batch = max_batch
+        self._protocols = [protocol] if protocol else default_protocols()
+        self.protocol = self._protocols[0]
+        self.connection_id = None
+        self.connected = asyncio.Event()
+        self._handlers = {}
+        self._open_callbacks = []
+        self._close_callbacks = []
+        self._send_queue = asyncio.Queue(maxsize=send_queue_size)
+        self._ws = None
+        self._pending = {}           # invocationId -> future awaiting its completion
+        self._next_invocation_id = 0
+        self._unsent = []            # messages dequeued but not written when the socket died
+        self.journal = journal
+        self.latency = latency
+        self._timed_sends = {}       # invocationId -> (target, queued at), only with a latency recorder
+        self.bulk_window = bulk_window
+        self._bulk_in_flight = 0     # estimated bytes of bulk responses requested but not yet received
+        self._bulk_available = asyncio.Condition()
+        self._durable = {}           # invocationId -> journal entry, until the hub completes it
+        self._written_durable = set()
+        # Durable messages that must be rewritten after (re)authentication; at first that is
+        # whatever a previous run left unacknowledged
+        self._replay = [self._track_durable(entry)[0] for entry in journal.pending()] if journal else []
+        self._reader_task = None
+        self._writer_task = None
+        self._stopping = False
+
+    # --- Registration -------------------------------------------------------
+
+    def on(self, target, handler):
+        self._handlers.setdefault(target.lower(), []).append(handler)
+
+    def off(self, target, handler):
+        """Removes a handler added with on()."""
+        key = target.lower()
+        handlers = list(self._handlers.get(key, ()))   # A copy: dispatch may be iterating the old list
+        if handler in handlers:
+            handlers.remove(handler)
+        if handlers:
+            self._handlers[key] = handlers
+        else:
+            self._handlers.pop(key, None)
+
+    def on_open(self, callback):
+        """Called after every successful (re)connect and authentication."""
+        self._open_callbacks.append(callback)
+
+    def on_close(self, callback):
+        self._close_callbacks.append(callback)
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    async def start(self):
+        """Connects, performs the handshake and authenticates; reconnects automatically afterwards."""
+        self._stopping = False
+        await self._connect()
+        self._reader_task = asyncio.create_task(self._run())
+
+    async def stop(self, flush_timeout=5):
+        if self.connected.is_set():
+            await self.flush(flush_timeout)
+        self._stopping = True
+        for task in (self._reader_task, self._writer_task):
+            if task:
+                task.cancel()
+        if self._ws:
+            await self._ws.close()
+        self._fail_pending(ConnectionError("Hub client stopped"))
+        self._mark_closed()
+
+    async def _negotiate(self):
+        if len(self.urls) == 1:
+            return await self._negotiate_at(self.url)
+        self.url, negotiation = await race(self.urls, self._negotiate_at, self._endpoint_cache)
+        return negotiation
+
+    async def _negotiate_at(self, url):
+        status, _, body = await http_request(f"{url.rstrip('/')}/negotiate?negotiateVersion=1", method="POST")
+        if status != 200:
+            raise ConnectionError(f"Negotiate failed with HTTP {status}")
+        return json.loads(body)
+
+    def _websocket_url(self, negotiation):
+        parts = urllib.parse.urlsplit(self.url)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        token = negotiation.get("connectionToken") or negotiation.get("connectionId")
+        query = "&".join(filter(None, [parts.query, f"id={urllib.parse.quote(token)}"]))
+        return urllib.parse.urlunsplit((scheme, parts.netloc, parts.path, query, ""))
+
+    async def _handshake(self):
+        """Opens the websocket and agrees on a hub protocol; returns (ws, bytes received after the handshake)."""
+        while True:
+            negotiation = await self._negotiate()
+            self.connection_id = negotiation.get("connectionId")
+            ws = await ws_connect(self._websocket_url(negotiation), max_size=None, ping_interval=None)
+            await ws.send(json.dumps({"protocol": self.protocol.name, "version": self.protocol.version}) + RECORD_SEPARATOR)
+
+            handshake = await asyncio.wait_for(ws.recv(), self.server_timeout)
+            if isinstance(handshake, str):
+                handshake = handshake.encode("utf-8")
+            response, _, remainder = handshake.partition(RECORD_SEPARATOR.encode())
+            error = json.loads(response).get("error")
+            if not error:
+                return ws, remainder
+            await ws.close()
+            if len(self._protocols) == 1:
+                raise ConnectionError(f"Handshake rejected: {error}")
+            # The hub doesn't offer this protocol; remember that and try the next one
+            logger.info(f"Hub declined the {self.protocol.name} protocol ({error}), falling back")
+            self._protocols.pop(0)
+            self.protocol = self._protocols[0]
+
+    async def _connect(self):
+        ws, remainder = await self._handshake()
+        self._ws = ws
+        if remainder:
+            self._dispatch_frame(remainder)
+        if self.api_key:
+            await self._authenticate(ws)
+        if self._replay:
+            await self._replay_durable(ws)
+
+        self._writer_task = asyncio.create_task(self._write_loop(ws))
+        self.connected.set()
+        logger.info(f"Connected to {self.url} as {self.connection_id} ({self.protocol.name})")
+        for callback in self._open_callbacks:
+            self._call(callback)
+
+    async def _authenticate(self, ws):
+        """Authenticates before the writer starts, so it precedes anything still queued from before a reconnect."""
+        invocation_id = self._new_invocation_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[invocation_id] = future
+        await ws.send(self.protocol.encode({"type": INVOCATION, "invocationId": invocation_id,
+                                            "target": "Authenticate", "arguments": [self.api_key]}))
+        while not future.done():
+            self._dispatch_frame(await asyncio.wait_for(ws.recv(), self.server_timeout))
+        if future.result() is not True:
+            await ws.close()
+            raise PermissionError("Hub rejected the API key")
+
+    async def _replay_durable(self, ws):
+        """Rewrites durable messages the hub never completed, oldest first and ahead of the queue."""
+        replay, self._replay = self._replay, []
+        messages = [message for message in replay if not self._drop_if_expired(message)]
+        if messages:
+            logger.info(f"Replaying {len(messages)} journaled message(s)")
+            await ws.send(self.protocol.join([self.protocol.encode(message) for message in messages]))
+            self._written_durable.update(message["invocationId"] for message in messages)
+
+    async def _run(self):
+        """Reads messages until the connection drops, then reconnects with the configured backoff."""
+        while not self._stopping:
+            try:
+                while True:
+                    frame = await asyncio.wait_for(self._ws.recv(), self.server_timeout)
+                    self._dispatch_frame(frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stopping:
+                    return
+                logger.warning(f"Connection lost: {e!r}")
+
+            if self._writer_task:
+                self._writer_task.cancel()
+                # Lets the writer put back the batch it was sending before the queue is pruned
+                await asyncio.wait([self._writer_task])
+            failed = self._fail_pending(ConnectionError("Connection lost before the invocation completed"))
+            self._drop_unsent_invocations(failed)
+            self._timed_sends.clear()
+            self._requeue_written_durable()
+            self._mark_closed()
+            await self._reconnect()
+
+    async def _reconnect(self):
+        attempt = 0
+        while not self._stopping:
+            delay = self.reconnect_intervals[min(attempt, len(self.reconnect_intervals) - 1)]
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+                return
+            except Exception as e:
+                attempt += 1
+                logger.warning(f"Reconnect attempt {attempt} failed: {e!r}")
+
+    def _fail_pending(self, error):
+        """Fails every outstanding invocation; returns their invocation ids."""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+        return set(pending)
+
+    def _drop_unsent_invocations(self, failed):
+        """Removes calls whose callers were already failed from what the next connection sends.
+
+        Otherwise a caller that retries after the ConnectionError has its call run twice.
+        """
+        if not failed:
+            return
+        unsent, self._unsent = self._unsent, []
+        for message in unsent:
+            if message.get("invocationId") in failed:
+                self._send_queue.task_done()
+            else:
+                self._unsent.append(message)
+        queued = []
+        while not self._send_queue.empty():
+            queued.append(self._send_queue.get_nowait())
+        for message in queued:
+            # Put back in order; each get is finished and the kept ones counted again
+            if message.get("invocationId") not in failed:
+                self._send_queue.put_nowait(message)
+            self._send_queue.task_done()
+
+    def _requeue_written_durable(self):
+        # Anything still queued goes out after these, so order is kept
+        written = sorted((self._durable[i] for i in self._written_durable if i in self._durable),
+                         key=lambda entry: entry["seq"])
+        self._written_durable.clear()
+        self._replay = [self._durable_message(entry) for entry in written] + self._replay
+
+    def _mark_closed(self):
+        if not self.connected.is_set():
+            return
+        self.connected.clear()
+        for callback in self._close_callbacks:
+            self._call(callback)
+
+    # --- Sending ------------------------------------------------------------
+
+    async def send(self, target, *arguments, durable=False, ttl=None):
+        """Fire-and-forget invocation. Waits only while the outgoing queue is full.
+
+        With durable=True the message is journaled first and redelivered after reconnects
+        until the hub completes it or `ttl` seconds (the journal's default otherwise) pass.
+        """
+        if not durable:
+            message = {"type": INVOCATION, "target": target, "arguments": list(arguments)}
+            if self.latency:
+                # An invocation id makes the hub send a completion, which is what gets timed
+                message["invocationId"] = self._new_invocation_id()
+                self._timed_sends[message["invocationId"]] = (target, time.perf_counter())
+            await self._send_queue.put(message)
+            return
+        if not self.journal:
+            raise ValueError("durable sends need a journal")
+        message, _ = self._track_durable(self.journal.append(target, arguments, ttl))
+        await self._send_queue.put(message)
+
+    @staticmethod
+    def _durable_message(entry):
+        return {"type": INVOCATION, "invocationId": f"j{entry['seq']}", "target": entry["target"],
+                "arguments": entry["arguments"]}
+
+    def _track_durable(self, entry):
+        message = self._durable_message(entry)
+        self._durable[message["invocationId"]] = entry
+        return message, entry
+
+    def _drop_if_expired(self, message):
+        entry = self._durable.get(message.get("invocationId"))
+        if not entry or entry["expires"] >= time.time():
+            return False
+        logger.warning(f"Dropping expired journaled {entry['target']} from {time.ctime(entry['ts'])}")
+        self._settle_durable(message["invocationId"])
+        return True
+
+    def _settle_durable(self, invocation_id):
+        entry = self._durable.pop(invocation_id, None)
+        self._written_durable.discard(invocation_id)
+        if entry:
+            self.journal.ack(entry["seq"])
+
+    def _new_invocation_id(self):
+        self._next_invocation_id += 1
+        return str(self._next_invocation_id)
+
+    async def invoke(self, target, *arguments, timeout=30):
+        """Calls a hub method and returns its result once the completion message arrives."""
+        estimate = BULK_TARGETS.get(target)
+        if estimate and self.bulk_window:
+            cost = estimate(*arguments)
+            await self._acquire_bulk(cost)
+            try:
+                return await self._invoke(target, arguments, timeout)
+            finally:
+                await self._release_bulk(cost)
+        return await self._invoke(target, arguments, timeout)
+
+    async def _acquire_bulk(self, cost):
+        async with self._bulk_available:
+            # A single call larger than the window still goes out, just on its own
+            await self._bulk_available.wait_for(
+                lambda: not self._bulk_in_flight or self._bulk_in_flight + cost <= self.bulk_window)
+            self._bulk_in_flight += cost
+
+    async def _release_bulk(self, cost):
+        async with self._bulk_available:
+            self._bulk_in_flight -= cost
+            self._bulk_available.notify_all()
+
+    async def queue_invoke(self, target, *arguments):
+        """Queues a hub call behind everything sent before it; returns a future of its raw result.
+
+        For callers that want a completion without holding back what they send next.
+        """
+        invocation_id, future = self._new_pending()
+        try:
+            await self._queue_invocation(invocation_id, target, arguments)
+        except BaseException:
+            self._pending.pop(invocation_id, None)
+            raise
+        return future
+
+    def _new_pending(self):
+        invocation_id = self._new_invocation_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[invocation_id] = future
+        return invocation_id, future
+
+    async def _queue_invocation(self, invocation_id, target, arguments):
+        await self._send_queue.put({"type": INVOCATION, "invocationId": invocation_id,
+                                    "target": target, "arguments": list(arguments)})
+
+    async def _invoke(self, target, arguments, timeout):
+        invocation_id, future = self._new_pending()
+        queued = time.perf_counter()
+        try:
+            await self._queue_invocation(invocation_id, target, arguments)
+            result = await asyncio.wait_for(future, timeout)
+        except HubError:
+            if self.latency:
+                self.latency.record(target, time.perf_counter() - queued)
+            raise
+        finally:
+            self._pending.pop(invocation_id, None)
+        if self.latency:
+            self.latency.record(target, time.perf_counter() - queued)
+        return decode_result(target, result)
+
+    async def flush(self, timeout=None):
+        """Waits until everything queued so far has been written to the socket."""
+        try:
+            await asyncio.wait_for(self._send_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._send_queue.qsize()} queued message(s) not flushed")
+
+    async def _write_loop(self, ws):
+        while True:
+            batch, self._unsent = self._unsent, []
+            if not batch:
+                try:
+                    batch.append(await asyncio.wait_for(self._send_queue.get(), self.keep_alive_interval))
+                except asyncio.TimeoutError:
+                    await ws.send(self.protocol.encode({"type": PING}))
+                    continue
+            # Coalesce whatever else is already queued into the same websocket frame
+            while len(batch) < self.max_batch and not self._send_queue.empty():
+                batch.append(self._send_queue.get_nowait())
+            messages = [message for message in batch if not (self._durable and self._drop_if_expired(message))]
+            try:
+                if messages:
+                    await ws.send(self.protocol.join([self.protocol.encode(message) for message in messages]))
+            except (Exception, asyncio.CancelledError) as e:
+                # Kept for the next writer, still counted as unfinished by flush()/join(); only
+                # messages dropped as expired are done with
+                self._unsent = messages
+                for _ in range(len(batch) - len(messages)):
+                    self._send_queue.task_done()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                logger.warning(f"Send failed: {e!r}")
+                return
+            if self._durable:
+                self._written_durable.update(m["invocationId"] for m in messages if m.get("invocationId") in self._durable)
+            for _ in batch:
+                self._send_queue.task_done()
+
+    # --- Receiving ----------------------------------------------------------
+
+    def _dispatch_frame(self, frame):
+        for message in self.protocol.decode(frame):
+            message_type = message.get("type")
+            if message_type == INVOCATION:
+                handlers = self._handlers.get(message.get("target", "").lower())
+                if handlers:
+                    arguments = decode_event(message["target"], message.get("arguments", []))
+                    for handler in handlers:
+                        self._call(handler, *arguments)
+            elif message_type == COMPLETION:
+                if self._timed_sends:
+                    timed = self._timed_sends.pop(message.get("invocationId"), None)
+                    if timed:
+                        self.latency.record(timed[0], time.perf_counter() - timed[1])
+                        continue
+                if message.get("invocationId") in self._durable:
+                    if message.get("error") is not None:
+                        # The hub did process it; sending it again would fail the same way
+                        logger.error(f"Journaled {self._durable[message['invocationId']]['target']} failed: {message['error']}")
+                    self._settle_durable(message["invocationId"])
+                    continue
+                future = self._pending.pop(message.get("invocationId"), None)
+                if future and not future.done():
+                    if message.get("error") is not None:
+                        future.set_exception(HubError(message["error"]))
+                    else:
+                        future.set_result(message.get("result"))
+            elif message_type == CLOSE:
+                raise ConnectionError(f"Server closed the connection: {message.get('error')}")
+
+    def _call(self, callback, *arguments):
+        try:
+            result = callback(*arguments)
+            if asyncio.iscoroutine(result):
+                # Long-running handlers must not stall the reader
+                asyncio.create_task(result)
+        except Exception as e:
+            logger.error(f"Handler {getattr(callback, '__name__', callback)} failed: {e!r}")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Happy-eyeballs selection between the addresses the hub can be reached on.
+
+Depending on where a script runs, the hub is on loopback (the PC itself), on the LAN
+or only over Tailscale. HubClient accepts a list of hub URLs and races the negotiate
+request across them: attempts start STAGGER seconds apart in preference order, a
+failed attempt starts the next one right away, and the first successful negotiate
+wins (its connection is the one used). The winner is cached on disk for CACHE_TTL
+seconds and tried first next time, by this and every other script; every reconnect
+races again.
+
+The list comes from OMNI_HUB_URLS (comma-separated) when set, DEFAULT_HUB_URLS
+otherwise - add the PC's Tailscale address there or in the variable.
+
+Usage:
+    python omni_hub_endpoints.py [URL ...]     # race the endpoints and print the result
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import getpass
+import tempfile
+
+# --- CONFIGURATION ---
+DEFAULT_HUB_URLS = [
+    "http://127.0.0.1:5000/signalrhub",  # On the PC itself
+    "http://10.0.0.37:5000/signalrhub",  # LAN
+]
+# ---------------------
+
+STAGGER = 0.25
+CACHE_TTL = 600
+
+def hub_urls():
+    configured = os.environ.get("OMNI_HUB_URLS")
+    if configured:
+        return [url.strip() for url in configured.split(",") if url.strip()]
+    return list(DEFAULT_HUB_URLS)
+
+class EndpointCache:
+    """Last winning URL per endpoint list, shared by all scripts of this user."""
+
+    def __init__(self, path=None, ttl=CACHE_TTL):
+        self.path = path or os.path.join(tempfile.gettempdir(), f"omnisync-hub-endpoint-{getpass.getuser()}.json")
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(urls):
+        return "|".join(sorted(urls))
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, urls):
+        winner = self._read().get(self._key(urls))
+        if winner and winner["url"] in urls and time.time() - winner["ts"] < self.ttl:
+            return winner["url"]
+        return None
+
+    def put(self, urls, url):
+        data = self._read()
+        data[self._key(urls)] = {"url": url, "ts": time.time()}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass   # Only an optimisation
+
+async def race(urls, attempt, cache=None, stagger=STAGGER):
+    """Runs attempt(url) across urls, happy-eyeballs style; returns (url, result) of the first success."""
+    order = list(urls)
+    cached = cache.get(urls) if cache else None
+    if cached:
+        order.remove(cached)
+        order.insert(0, cached)
+
+    running = {}
+    errors = []
+    try:
+        while order or running:
+            if order:
+                url = order.pop(0)
+                running[asyncio.ensure_future(attempt(url))] = url
+            # Wait for an outcome, but give the next endpoint its turn after the stagger
+            done, _ = await asyncio.wait(running, timeout=stagger if order else None,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url = running.pop(task)
+                if task.exception() is None:
+                    # A repeat win keeps the original timestamp, so a faster path gets a fair race after the TTL
+                    if cache and url != cached:
+                        cache.put(urls, url)
+                    return url, task.result()
+                errors.append(f"{url}: {task.exception()!r}")
+    finally:
+        for task in running:
+            task.cancel()
+    raise ConnectionError("No hub endpoint reachable (" + "; ".join(errors) + ")")
+
+async def _main(urls):
+    from omni_hub_client import http_request
+
+    started = time.perf_counter()
+
+    async def attempt(url):
+        status, _, _ = await http_request(f"{url.rstrip('/')}/negotiate?negotiateVersion=1", method="POST")
+        if status != 200:
+            raise ConnectionError(f"HTTP {status}")
+        print(f"  {url} answered after {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    cache = EndpointCache()
+    print(f"Cached winner: {cache.get(urls) or 'none'}")
+    url, _ = await race(urls, attempt, cache)
+    print(f"Selected {url} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(sys.argv[1:] or hub_urls()))
+    except ConnectionError as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Compact, lazily decoded FileSystemEntry arrays.
+
+ListDirectory, SearchFiles and GetAvailableDrives results (and the matching
+ReceiveDirectoryContents / ReceiveAvailableDrives events) can hold tens of thousands
+of entries. HubClient hands them over as an EntryList instead of a list of dicts: the
+fields are kept as six parallel tuples (columns), built from whatever the protocol
+produced, and an entry object only exists while something holds it.
+Timestamps are parsed when first read. The single entry of GetFileInfo and
+CompleteUpload comes back as a FileSystemEntry the same way.
+
+The hub sends entries as positional arrays over MessagePack and as camelCase objects
+over JSON; older hubs send PascalCase maps over MessagePack. All three decode the
+same way, and entries answer to any casing:
+
+    entries = await hub.invoke("ListDirectory", "C:\\\\")
+    for entry in entries:
+        entry.name, entry.is_directory, entry.last_modified     # attributes
+        entry.get("name") == entry.get("Name") == entry["isDirectory"] or ...  # dict-style
+    entries.column("size")                                       # a whole field, no entry objects
+    entries.to_dicts()                                           # the JSON protocol's shape
+"""
+import datetime
+import operator
+from collections.abc import Sequence
+
+FIELDS = ("name", "path", "is_directory", "size", "last_modified", "entry_type")
+JSON_KEYS = ("name", "path", "isDirectory", "size", "lastModified", "entryType")
+PASCAL_KEYS = ("Name", "Path", "IsDirectory", "Size", "LastModified", "EntryType")
+
+# Any accepted spelling of a field (lowercased, without underscores) -> column index
+_FIELD_INDEX = {name.replace("_", ""): index for index, name in enumerate(FIELDS)}
+
+# Hub methods and events whose value (first event argument) is a FileSystemEntry array
+ENTRY_RESULTS = {"listdirectory", "getdirectorylisting", "searchfiles", "getavailabledrives"}
+ENTRY_ITEM_RESULTS = {"getfileinfo", "completeupload"}   # ... and whose value is a single FileSystemEntry
+ENTRY_EVENTS = {"receivedirectorycontents", "receiveavailabledrives"}
+
+def _parse_time(value):
+    if not isinstance(value, str):
+        return value   # Already a datetime (MessagePack timestamp) or None
+    # .NET writes up to 7 fractional digits; datetime accepts 6
+    head, dot, fraction = value.partition(".")
+    if dot:
+        digits = len(fraction) - len(fraction.lstrip("0123456789"))
+        value = f"{head}.{fraction[:min(digits, 6)]}{fraction[digits:]}"
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+class FileSystemEntry:
+    """One row of an EntryList, read through to its columns."""
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    name = property(lambda self: self._columns[0][self._index])
+    path = property(lambda self: self._columns[1][self._index])
+    is_directory = property(lambda self: self._columns[2][self._index])
+    size = property(lambda self: self._columns[3][self._index])
+    last_modified = property(lambda self: _parse_time(self._columns[4][self._index]))
+    entry_type = property(lambda self: self._columns[5][self._index])
+
+    def _field(self, key):
+        index = _FIELD_INDEX.get(key.replace("_", "").lower())
+        if index is None:
+            raise KeyError(key)
+        return self.last_modified if index == 4 else self._columns[index][self._index]
+
+    def __getitem__(self, key):
+        return self._field(key)
+
+    def get(self, key, default=None):
+        try:
+            return self._field(key)
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {key: self._columns[index][self._index] for index, key in enumerate(JSON_KEYS)}
+
+    def __eq__(self, other):
+        return isinstance(other, FileSystemEntry) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"FileSystemEntry({self.path!r}{', dir' if self.is_directory else f', {self.size} bytes'})"
+
+class EntryList(Sequence):
+    __slots__ = ("_columns",)
+
+    def __init__(self, columns):
+        self._columns = columns
+
+    @classmethod
+    def decode(cls, value):
+        """Builds an EntryList from a decoded FileSystemEntry array; anything else is returned unchanged."""
+        if not isinstance(value, list):
+            return value
+        if not value:
+            return cls(tuple(() for _ in FIELDS))
+        first = value[0]
+        if isinstance(first, (list, tuple)):
+            keys = range(len(FIELDS))                     # MessagePack positional layout
+        elif isinstance(first, dict):
+            keys = JSON_KEYS if "name" in first else PASCAL_KEYS
+        else:
+            return value
+        try:
+            # One pass per field straight into its column; no per-row intermediate objects
+            return cls(tuple(tuple(map(operator.itemgetter(key), value)) for key in keys))
+        except (KeyError, IndexError):
+            # Entries with fields missing (e.g. from another client); slower but tolerant
+            return cls(tuple(tuple(_get_any(item, index) for item in value) for index in range(len(FIELDS))))
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EntryList(tuple(column[index] for column in self._columns))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("entry index out of range")
+        return FileSystemEntry(self._columns, index)
+
+    def __iter__(self):
+        columns = self._columns
+        return (FileSystemEntry(columns, index) for index in range(len(columns[0])))
+
+    def column(self, field):
+        """All values of one field (any casing) as a tuple; timestamps stay unparsed."""
+        index = _FIELD_INDEX.get(field.replace("_", "").lower())
+        if index is None:
+            raise KeyError(field)
+        return self._columns[index]
+
+    def to_dicts(self):
+        return [dict(zip(JSON_KEYS, row)) for row in zip(*self._columns)]
+
+    def __repr__(self):
+        return f"EntryList({len(self)} entries)"
+
+def _get_any(item, index):
+    if not isinstance(item, dict):
+        return item[index] if index < len(item) else None
+    value = item.get(JSON_KEYS[index])
+    return item.get(PASCAL_KEYS[index]) if value is None else value
+
+def decode_result(target, value):
+    target = target.lower()
+    if target in ENTRY_RESULTS:
+        return EntryList.decode(value)
+    if target in ENTRY_ITEM_RESULTS and isinstance(value, (list, tuple, dict)):
+        entries = EntryList.decode([value])
+        return entries[0] if isinstance(entries, EntryList) else value
+    return value
+
+def decode_event(target, arguments):
+    if target.lower() in ENTRY_EVENTS and arguments:
+        return [EntryList.decode(arguments[0])] + list(arguments[1:])
+    return arguments
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Persistent outbound journal for HubClient's durable sends.
+
+A durable send is appended here (and fsynced) before it is queued, and acknowledged
+once the hub's completion for it arrives. Whatever is still unacknowledged when the
+connection drops - or when the process dies - is replayed in order after the next
+authentication, unless it has outlived its TTL by then.
+
+Delivery is at-least-once: a message the hub processed just before the connection
+died, but whose completion never arrived, is sent again.
+
+The file is a JSON-lines log of entries and acks:
+
+    {"seq": 7, "ts": 1700000000.0, "expires": 1700003600.0, "target": "SendAiResponse", "arguments": ["..."]}
+    {"ack": 7}
+
+It is truncated once nothing is pending and rewritten when it grows past a threshold.
+
+Usage:
+    python omni_hub_journal.py <journal file>     # list pending entries
+"""
+import os
+import sys
+import json
+import time
+import threading
+
+DEFAULT_TTL = 3600
+COMPACT_BYTES = 1 << 20
+
+class OutboundJournal:
+    def __init__(self, path, default_ttl=DEFAULT_TTL, fsync=True, compact_bytes=COMPACT_BYTES):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.next_seq = 1
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self.log = open(path, "ab")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # torn write from a crash; the entry was never acknowledged to the caller
+                record = json.loads(line)
+                if "ack" in record:
+                    self.entries.pop(record["ack"], None)
+                else:
+                    self.entries[record["seq"]] = record
+                    self.next_seq = max(self.next_seq, record["seq"] + 1)
+        self._rewrite()
+
+    def _rewrite(self):
+        """Atomically replaces the file with just the pending entries."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            for entry in self.pending():
+                f.write(self._line(entry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _line(record):
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _write(self, record, sync):
+        self.log.write(self._line(record))
+        self.log.flush()
+        if sync:
+            os.fsync(self.log.fileno())
+
+    def append(self, target, arguments, ttl=None):
+        """Durably records an outgoing message and returns its entry."""
+        with self.lock:
+            now = time.time()
+            entry = {"seq": self.next_seq, "ts": now, "expires": now + (ttl or self.default_ttl),
+                     "target": target, "arguments": list(arguments)}
+            self.next_seq += 1
+            self._write(entry, self.fsync)
+            self.entries[entry["seq"]] = entry
+            return entry
+
+    def ack(self, seq):
+        # Not fsynced: losing an ack only means a duplicate after a crash
+        with self.lock:
+            if self.entries.pop(seq, None) is None:
+                return
+            if not self.entries:
+                self.log.truncate(0)
+            elif os.fstat(self.log.fileno()).st_size > self.compact_bytes:
+                self.log.close()
+                self._rewrite()
+                self.log = open(self.path, "ab")
+            else:
+                self._write({"ack": seq}, False)
+
+    def pending(self):
+        return sorted(self.entries.values(), key=lambda entry: entry["seq"])
+
+    def close(self):
+        with self.lock:
+            self.log.close()
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1])
+        return 1
+    journal = OutboundJournal(sys.argv[1])
+    now = time.time()
+    for entry in journal.pending():
+        state = "expired" if entry["expires"] < now else f"expires in {int(entry['expires'] - now)}s"
+        preview = json.dumps(entry["arguments"], ensure_ascii=False)[:80]
+        print(f"#{entry['seq']:<6} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['ts']))}  "
+              f"{entry['target']:<24} {state:<20} {preview}")
+    print(f"{len(journal.entries)} pending")
+    journal.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Per-method round-trip latency histograms for HubClient.
+
+LatencyHistogram is a log-linear (HDR-style) histogram over microseconds: values
+below 2**SUB_BITS get exact buckets, and every power of two above that is split into
+2**(SUB_BITS-1) linear sub-buckets, so any recorded value is off by at most
+1/2**(SUB_BITS-1) (under 1% with the default) at constant memory and O(1) cost.
+
+Attach a LatencyRecorder to a HubClient (HubClient(..., latency=recorder)) and every
+call is timed from the moment it is queued until the hub's completion arrives; plain
+send()s are then sent with an invocation id so they get a completion too.
+
+Usage:
+    python omni_hub_latency.py show latency.json
+    python omni_hub_latency.py compare baseline.json latency.json [--threshold 0.2]
+    python omni_hub_latency.py live latency.json            # while a client autosaves to it
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+SUB_BITS = 8
+
+class LatencyHistogram:
+    def __init__(self, sub_bits=SUB_BITS):
+        self.sub_bits = sub_bits
+        self.counts = {}   # bucket index -> count (sparse; most latencies cluster in a few buckets)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        exponent = value.bit_length() - self.sub_bits
+        if exponent <= 0:
+            return value
+        # Top sub_bits bits of the value select the sub-bucket within its power of two
+        return (exponent << (self.sub_bits - 1)) + (value >> exponent)
+
+    def _value_at(self, index):
+        """Representative (midpoint) value of a bucket."""
+        exponent = (index >> (self.sub_bits - 1)) - 1
+        if exponent <= 0:
+            return index
+        return ((index - (exponent << (self.sub_bits - 1))) << exponent) + (1 << (exponent - 1))
+
+    def record(self, microseconds):
+        value = max(0, int(microseconds))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0
+        rank = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def minus(self, earlier):
+        """Histogram of what was recorded since `earlier` (a previous snapshot of this one)."""
+        delta = LatencyHistogram(self.sub_bits)
+        for index, count in self.counts.items():
+            remaining = count - earlier.counts.get(index, 0)
+            if remaining > 0:
+                delta.counts[index] = remaining
+        delta.count = self.count - earlier.count
+        delta.total = self.total - earlier.total
+        if delta.counts:
+            delta.min = self._value_at(min(delta.counts))
+            delta.max = min(self._value_at(max(delta.counts)), self.max)
+        return delta
+
+    def to_dict(self):
+        return {"sub_bits": self.sub_bits, "count": self.count, "total": self.total,
+                "min": self.min, "max": self.max, "counts": {str(i): c for i, c in sorted(self.counts.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["sub_bits"])
+        histogram.counts = {int(i): c for i, c in data["counts"].items()}
+        histogram.count, histogram.total = data["count"], data["total"]
+        histogram.min, histogram.max = data["min"], data["max"]
+        return histogram
+
+class LatencyRecorder:
+    """Histograms keyed by hub method, optionally saved to a JSON file every few seconds."""
+
+    def __init__(self, path=None, autosave_interval=None, label=None):
+        self.histograms = {}
+        self.path = path
+        self.autosave_interval = autosave_interval
+        self.label = label
+        self.started = time.time()
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def resume(cls, path, **options):
+        """Recorder that continues the histograms already saved in `path`, if any (for one-shot scripts)."""
+        recorder = cls(path, **options)
+        if os.path.exists(path):
+            data, recorder.histograms = load(path)
+            recorder.started = data["started"]
+        return recorder
+
+    def record(self, method, seconds):
+        histogram = self.histograms.get(method)
+        if histogram is None:
+            histogram = self.histograms[method] = LatencyHistogram()
+        histogram.record(seconds * 1e6)
+        if self.autosave_interval and time.monotonic() - self._last_save >= self.autosave_interval:
+            self.save()
+
+    def to_dict(self):
+        return {"label": self.label, "started": self.started, "saved": time.time(),
+                "methods": {method: h.to_dict() for method, h in sorted(self.histograms.items())}}
+
+    def save(self, path=None):
+        path = path or self.path
+        self._last_save = time.monotonic()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temp_path, path)
+
+    def summary(self):
+        return format_table(self.histograms)
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data, {method: LatencyHistogram.from_dict(h) for method, h in data["methods"].items()}
+
+def _ms(microseconds):
+    return f"{microseconds / 1000:9.2f}"
+
+def format_table(histograms, title=None):
+    lines = [title] if title else []
+    lines.append(f"{'method':<28} {'count':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'p99.9 ms':>9} {'max ms':>9}")
+    for method, h in sorted(histograms.items()):
+        if h.count:
+            lines.append(f"{method:<28} {h.count:>8} {_ms(h.percentile(0.5))} {_ms(h.percentile(0.9))} "
+                         f"{_ms(h.percentile(0.99))} {_ms(h.percentile(0.999))} {_ms(h.max)}")
+    return "\n".join(lines)
+
+def compare(baseline, current, threshold):
+    """Prints per-method percentile changes; returns the methods whose p50 or p99 regressed past threshold."""
+    regressions = []
+    print(f"{'method':<28} {'':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for method in sorted(set(baseline) | set(current)):
+        old, new = baseline.get(method), current.get(method)
+        if not old or not new or not old.count or not new.count:
+            print(f"{method:<28} only in {'current' if new else 'baseline'}")
+            continue
+        print(f"{method:<28} {'base':>4} {_ms(old.percentile(0.5))} {_ms(old.percentile(0.9))} "
+              f"{_ms(old.percentile(0.99))} {_ms(old.max)}")
+        changes = []
+        for fraction in (0.5, 0.9, 0.99):
+            before, after = old.percentile(fraction), new.percentile(fraction)
+            changes.append((after - before) / before if before else 0.0)
+        print(f"{'':<28} {'now':>4} {_ms(new.percentile(0.5))} {_ms(new.percentile(0.9))} "
+              f"{_ms(new.percentile(0.99))} {_ms(new.max)}   "
+              + "  ".join(f"{label} {change:+.0%}" for label, change in zip(("p50", "p90", "p99"), changes)))
+        if changes[0] > threshold or changes[2] > threshold:
+            regressions.append(method)
+    return regressions
+
+def live(path, interval):
+    """Redraws the file's histograms every interval, with stats for the last interval alongside the totals."""
+    previous = {}
+    while True:
+        try:
+            data, histograms = load(path)
+        except (OSError, ValueError):
+            print(f"Waiting for {path}...")
+            time.sleep(interval)
+            continue
+        recent = {method: h.minus(previous[method]) if method in previous else h for method, h in histograms.items()}
+        previous = histograms
+        sys.stdout.write("\x1b[2J\x1b[H")
+        print(format_table(recent, f"Last {interval:g}s ({data.get('label') or path})"))
+        print()
+        print(format_table(histograms, f"Since {time.strftime('%H:%M:%S', time.localtime(data['started']))}"))
+        sys.stdout.flush()
+        time.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect hub round-trip latency histograms.")
+    sub = parser.add_subparsers(dest="action", required=True)
+    show = sub.add_parser("show", help="Print percentiles per method")
+    show.add_argument("file")
+    cmp_parser = sub.add_parser("compare", help="Compare against a baseline; exits 1 on regressions")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--threshold", type=float, default=0.2, help="Relative p50/p99 increase counted as a regression")
+    live_parser = sub.add_parser("live", help="Live view of a file a running client autosaves to")
+    live_parser.add_argument("file")
+    live_parser.add_argument("--interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.action == "show":
+        data, histograms = load(args.file)
+        print(format_table(histograms, f"{data.get('label') or args.file} "
+                                       f"({time.strftime('%Y-%m-%d %H:%M', time.localtime(data['started']))})"))
+    elif args.action == "compare":
+        _, baseline = load(args.baseline)
+        _, current = load(args.current)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\nRegressed past {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    elif args.action == "live":
+        try:
+            live(args.file, args.interval)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
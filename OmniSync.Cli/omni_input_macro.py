@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Batched input macros: a key/text/mouse/delay sequence sent to the hub as one message.
+
+The hub's RunInputMacro replays the steps itself, scheduling every wait against the
+macro start with a coarse delay plus a short spin, so typing and shortcut sequences
+neither pay a round-trip per key nor depend on network timing. It returns how late
+each wait actually finished, which InputMacro.run() turns into a jitter report.
+
+    macro = InputMacro().chord(VK_CONTROL, 0x4C).wait(300).text("example.com").press(VK_RETURN)
+    report = await macro.run(hub)
+    print(report)
+
+Steps compile to compact arrays (["kd", vk], ["w", ms], ...); adjacent waits, moves and
+text runs are merged.
+"""
+VK_RETURN = 0x0D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_LWIN = 0x5B
+
+INVOKE_MARGIN = 30
+
+class InputMacro:
+    def __init__(self):
+        self.steps = []
+
+    def _add(self, *step):
+        self.steps.append(list(step))
+        return self
+
+    def key_down(self, key_code):
+        return self._add("kd", key_code)
+
+    def key_up(self, key_code):
+        return self._add("ku", key_code)
+
+    def press(self, key_code):
+        return self._add("kp", key_code)
+
+    def chord(self, *key_codes):
+        """Holds the keys down in order and releases them in reverse, e.g. chord(VK_CONTROL, 0x43)."""
+        for key_code in key_codes:
+            self.key_down(key_code)
+        for key_code in reversed(key_codes):
+            self.key_up(key_code)
+        return self
+
+    def text(self, text):
+        return self._add("t", text)
+
+    def move(self, dx, dy):
+        return self._add("m", int(dx), int(dy))
+
+    def mouse_down(self, button="Left"):
+        return self._add("md", button)
+
+    def mouse_up(self, button="Left"):
+        return self._add("mu", button)
+
+    def click(self, button="Left"):
+        return self._add("c", button)
+
+    def scroll(self, delta):
+        return self._add("s", int(delta))
+
+    def wait(self, milliseconds):
+        return self._add("w", milliseconds)
+
+    def compile(self):
+        compiled = []
+        for step in self.steps:
+            kind = step[0]
+            previous = compiled[-1] if compiled else None
+            if kind == "w" and step[1] <= 0:
+                continue
+            if previous and previous[0] == kind and kind in ("w", "t", "m"):
+                if kind == "m":
+                    previous[1] += step[1]
+                    previous[2] += step[2]
+                else:
+                    previous[1] += step[1]
+                continue
+            compiled.append(list(step))
+        return compiled
+
+    @property
+    def duration_ms(self):
+        return sum(step[1] for step in self.steps if step[0] == "w")
+
+    async def run(self, hub):
+        """Sends the macro as one invocation and returns a MacroReport once the hub has replayed it."""
+        steps = self.compile()
+        result = await hub.invoke("RunInputMacro", steps, timeout=self.duration_ms / 1000 + INVOKE_MARGIN)
+        # JSON camel-cases the result's properties, MessagePack keeps the .NET names
+        result = {key[0].lower() + key[1:]: value for key, value in result.items()}
+        requested = [step[1] for step in steps if step[0] == "w"]
+        return MacroReport(result["steps"], result["durationMs"], requested, result["latenessMs"])
+
+class MacroReport:
+    def __init__(self, steps, duration_ms, requested_ms, lateness_ms):
+        self.steps = steps
+        self.duration_ms = duration_ms
+        self.requested_ms = requested_ms   # per wait, as sent
+        self.lateness_ms = lateness_ms     # per wait, actual minus requested since macro start
+
+    def percentile(self, fraction):
+        ordered = sorted(self.lateness_ms)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def __str__(self):
+        if not self.lateness_ms:
+            return f"{self.steps} steps in {self.duration_ms:.2f} ms (no waits)"
+        mean = sum(self.lateness_ms) / len(self.lateness_ms)
+        return (f"{self.steps} steps in {self.duration_ms:.2f} ms (requested {sum(self.requested_ms):.2f} ms); "
+                f"wait jitter over {len(self.lateness_ms)} waits: mean {mean:.3f} ms, p50 {self.percentile(0.5):.3f} ms, "
+                f"p99 {self.percentile(0.99):.3f} ms, max {max(self.lateness_ms):.3f} ms")
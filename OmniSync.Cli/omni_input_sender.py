@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Frame-paced remote input for HubClient users (trackpad emulators, input scripts).
+
+Mouse and scroll deltas are accumulated and sent at most once per frame instead of
+once per event, so a 500 Hz event source doesn't queue stale deltas behind each
+other. The first movement after an idle period goes out immediately; movement that
+follows within the same frame waits for the frame boundary. Fractional deltas are
+carried over rather than rounded away.
+
+Clicks, keys and text are never coalesced or reordered: they first flush whatever
+motion is pending (so a click lands where the cursor was sent), then go out in call
+order.
+
+    sender = InputSender(hub)
+    sender.move(3.5, -1)          # from the event callback, as often as events arrive
+    sender.scroll(-120)
+    await sender.click("Left")
+    await sender.key_press(0x41)
+"""
+import asyncio
+
+DEFAULT_FRAME_RATE = 120
+
+class InputSender:
+    def __init__(self, hub, frame_rate=DEFAULT_FRAME_RATE, latency=None):
+        self.hub = hub
+        self.frame_interval = 1.0 / frame_rate if frame_rate else 0.0
+        self.latency = latency      # LatencyRecorder: time from the oldest coalesced event to the hub's completion
+        self.events = 0             # move/scroll calls received
+        self.messages = 0           # hub messages sent for them
+        self._dx = self._dy = 0.0
+        self._scroll = 0
+        self._pending_since = None  # loop time of the oldest event not yet sent
+        self._last_flush = float("-inf")
+        self._frame_handle = None
+        self._order = asyncio.Lock()
+        self._timing_tasks = set()
+
+    # --- Coalesced motion ---------------------------------------------------
+
+    def move(self, dx, dy):
+        self._dx += dx
+        self._dy += dy
+        self._note_event()
+
+    def scroll(self, delta):
+        self._scroll += delta
+        self._note_event()
+
+    def _note_event(self):
+        self.events += 1
+        loop = asyncio.get_running_loop()
+        if self._pending_since is None:
+            self._pending_since = loop.time()
+        if self._frame_handle is None:
+            # Leading edge when idle, otherwise the next frame boundary
+            due = max(loop.time(), self._last_flush + self.frame_interval)
+            self._frame_handle = loop.call_at(due, self._on_frame)
+
+    def _on_frame(self):
+        self._frame_handle = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """Sends accumulated motion now."""
+        async with self._order:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        dx, dy = int(self._dx), int(self._dy)
+        scroll, since = self._scroll, self._pending_since
+        self._dx -= dx
+        self._dy -= dy
+        self._scroll = 0
+        self._pending_since = None
+        self._last_flush = asyncio.get_running_loop().time()
+        if dx or dy:
+            await self._send_motion(since, "MouseMove", {"X": dx, "Y": dy})
+        if scroll:
+            await self._send_motion(since, "SendPayload", "MOUSE_SCROLL", {"Delta": scroll})
+        if self._dx or self._dy:
+            # Sub-pixel remainder: it still needs a pending timestamp for the next frame
+            self._pending_since = since
+
+    async def _send_motion(self, since, target, *arguments):
+        self.messages += 1
+        if not self.latency:
+            await self.hub.send(target, *arguments)
+            return
+        # Queued here, so whatever is sent next can't overtake it; only the wait runs in the background
+        completion = await self.hub.queue_invoke(target, *arguments)
+        task = asyncio.create_task(asyncio.wait_for(completion, 30))
+        self._timing_tasks.add(task)
+        label = "MouseMove (cursor)" if target == "MouseMove" else "MouseScroll (cursor)"
+        loop = asyncio.get_running_loop()
+
+        def done(finished):
+            self._timing_tasks.discard(finished)
+            if not finished.cancelled() and not finished.exception():
+                self.latency.record(label, loop.time() - since)
+        task.add_done_callback(done)
+
+    # --- Ordered events -----------------------------------------------------
+
+    async def send(self, target, *arguments):
+        """Sends any hub call in order, after the motion that preceded it."""
+        async with self._order:
+            if self._frame_handle:
+                self._frame_handle.cancel()
+                self._frame_handle = None
+            await self._flush_locked()
+            await self.hub.send(target, *arguments)
+
+    async def payload(self, command, payload=None):
+        await self.send("SendPayload", command, payload if payload is not None else {})
+
+    async def click(self, button="Left"):
+        await self.payload("LEFT_CLICK" if button.lower() == "left" else "RIGHT_CLICK")
+
+    async def mouse_down(self, button="Left"):
+        await self.payload("MOUSE_CLICK_DOWN", {"Button": button})
+
+    async def mouse_up(self, button="Left"):
+        await self.payload("MOUSE_CLICK_UP", {"Button": button})
+
+    async def key_press(self, key_code):
+        await self.payload("INPUT_KEY_PRESS", {"KeyCode": key_code})
+
+    async def key_down(self, key_code):
+        await self.payload("INPUT_KEY_DOWN", {"KeyCode": key_code})
+
+    async def key_up(self, key_code):
+        await self.payload("INPUT_KEY_UP", {"KeyCode": key_code})
+
+    async def text(self, text):
+        await self.payload("INPUT_TEXT", {"Text": text})
+
+    async def close(self):
+        """Flushes pending motion and waits for any timed sends to complete."""
+        if self._frame_handle:
+            self._frame_handle.cancel()
+            self._frame_handle = None
+        await self.flush()
+        if self._timing_tasks:
+            await asyncio.gather(*self._timing_tasks, return_exceptions=True)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Incremental one-way mirror of a hub directory into a local folder.
+
+Each run walks the remote tree (omni_tree_walker), `walk_window` directories in flight,
+and diffs the listing against a manifest kept in the local folder
+(MANIFEST_NAME). For every file the manifest records the remote size and modification
+time, the local file's size and mtime when it was written, and the SHA-256 of each
+BLOCK_SIZE block. A file is up to date when the remote size/time and the local
+size/mtime still match the manifest. Checking an unchanged tree therefore costs one
+listing per directory plus one local stat per file, and nothing is read or hashed.
+
+Changed files are fetched `window` at a time:
+  - small files in a single GetFileChunk;
+  - files that already exist locally get the hub's block hashes (GetFileBlockHashes),
+    and only the blocks whose hashes differ are fetched into a copy of the local file;
+  - everything else, and any file whose patched copy doesn't match the hub's block
+    hashes, through ChunkedDownload (omni_file_download).
+Finished files replace the local copy in one move. Local files that the manifest
+recorded and that are gone from the hub are deleted, unless delete=False. The manifest
+is saved every few seconds while files transfer, so an interrupted sync only redoes the
+files that were in flight.
+
+Usage:
+    python omni_mirror_sync.py <remote directory> <local folder> [--window 4] [--walk-window 8] [--no-delete]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import asyncio
+import hashlib
+import logging
+import argparse
+import collections
+
+from omni_hub_client import HubClient, HubError, is_unknown_method
+from omni_hub_endpoints import hub_urls
+from omni_file_download import ChunkedDownload, DownloadError
+from omni_tree_walker import TreeWalker
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+MANIFEST_NAME = ".omnisync-manifest.json"
+MANIFEST_VERSION = 1
+BLOCK_SIZE = 1 << 20
+SMALL_FILE = 4 << 20            # Fetched in one GetFileChunk call
+DEFAULT_WINDOW = 4              # Files transferring at once
+DEFAULT_WALK_WINDOW = 8         # Listing calls in flight
+MANIFEST_INTERVAL = 5.0
+
+logger = logging.getLogger(__name__)
+
+def _timestamp(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def block_hashes(path, block_size=BLOCK_SIZE):
+    hashes = []
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            hashes.append(hashlib.sha256(block).hexdigest())
+    return hashes
+
+async def walk_remote(hub, root, window=DEFAULT_WALK_WINDOW):
+    """{relative path ('/'-separated): FileSystemEntry} of every file below root, and the set of directories."""
+    files, directories = {}, set()
+    # A directory that can't be listed must fail the sync, or its files would look deleted
+    async for relative, entry in TreeWalker(hub, window=window, skip_errors=False).walk(root):
+        if entry.is_directory:
+            directories.add(relative)
+        else:
+            files[relative] = entry
+    return files, directories
+
+class Manifest:
+    """What the last sync wrote: {relative path: {size, modified, local_size, local_mtime_ns, blocks}}."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+
+    def load(self, remote_root):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        # A manifest of another remote directory, or another block size, says nothing about this one
+        if (data.get("version"), data.get("remote_root"), data.get("block_size")) == (MANIFEST_VERSION, remote_root, BLOCK_SIZE):
+            self.files = data.get("files") or {}
+        return self
+
+    def save(self, remote_root):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "remote_root": remote_root, "block_size": BLOCK_SIZE,
+                       "files": self.files}, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+class MirrorSync:
+    def __init__(self, hub, remote_root, local_root, window=DEFAULT_WINDOW, walk_window=DEFAULT_WALK_WINDOW, delete=True):
+        self.hub = hub
+        trimmed = remote_root.rstrip("\\")
+        self.remote_root = trimmed + "\\" if trimmed.endswith(":") else trimmed    # "C:\\", not "C:"
+        self.local_root = local_root
+        self.window = window
+        self.walk_window = walk_window
+        self.delete = delete
+        self.manifest = Manifest(os.path.join(local_root, MANIFEST_NAME))
+        self.counts = collections.Counter()   # unchanged, fetched, patched, rebuilt, deleted, failed
+        self.bytes_fetched = 0
+        self.blocks_fetched = 0
+        self.walk_seconds = 0.0
+        self.seconds = 0.0
+        self._block_hashes_supported = True
+        self._last_save = 0.0
+
+    def _local_path(self, relative):
+        return os.path.join(self.local_root, *relative.split("/"))
+
+    def _is_current(self, relative, entry):
+        recorded = self.manifest.files.get(relative)
+        if not recorded or recorded["size"] != entry.size or recorded["modified"] != _timestamp(entry.last_modified):
+            return False
+        try:
+            stat = os.stat(self._local_path(relative))
+        except OSError:
+            return False
+        return stat.st_size == recorded["local_size"] and stat.st_mtime_ns == recorded["local_mtime_ns"]
+
+    async def run(self):
+        started = time.perf_counter()
+        os.makedirs(self.local_root, exist_ok=True)
+        self.manifest.load(self.remote_root)
+        remote, directories = await walk_remote(self.hub, self.remote_root, self.walk_window)
+        self.walk_seconds = time.perf_counter() - started
+
+        for relative in sorted(directories):
+            os.makedirs(self._local_path(relative), exist_ok=True)
+        changed = []
+        for relative, entry in remote.items():
+            if self._is_current(relative, entry):
+                self.counts["unchanged"] += 1
+            else:
+                changed.append((relative, entry))
+        logger.info(f"{len(remote)} remote files in {len(directories)} directories listed in {self.walk_seconds:.2f} s; "
+                    f"{len(changed)} to transfer.")
+
+        queue = collections.deque(changed)
+
+        async def worker():
+            while queue:
+                relative, entry = queue.popleft()
+                try:
+                    await self._sync_file(relative, entry)
+                except (HubError, DownloadError, OSError, asyncio.TimeoutError) as e:
+                    self.counts["failed"] += 1
+                    logger.warning(f"Failed to sync {relative}: {e}")
+                if time.monotonic() - self._last_save >= MANIFEST_INTERVAL:
+                    self._last_save = time.monotonic()
+                    self.manifest.save(self.remote_root)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.window)))
+            if self.delete:
+                self._delete_missing(remote)
+        finally:
+            self.manifest.save(self.remote_root)
+        self.seconds = time.perf_counter() - started
+        return self
+
+    async def _sync_file(self, relative, entry):
+        local_path = self._local_path(relative)
+        part_path = local_path + ".part"
+        size = entry.size
+        recorded = self.manifest.files.get(relative)
+        blocks = None
+        if size <= SMALL_FILE:
+            data = await self.hub.invoke("GetFileChunk", entry.path, 0, size + 1, timeout=120) if size else b""
+            if isinstance(data, str):
+                data = base64.b64decode(data)   # JSON hub protocol
+            if len(data) != size:
+                raise DownloadError(f"{entry.path} changed during the sync")
+            with open(part_path, "wb") as f:
+                f.write(data)
+            self.bytes_fetched += size
+            blocks = [hashlib.sha256(data[i:i + BLOCK_SIZE]).hexdigest() for i in range(0, size, BLOCK_SIZE)]
+            self.counts["fetched"] += 1
+        elif os.path.exists(local_path) and self._block_hashes_supported:
+            blocks = await self._patch(entry, local_path, part_path, recorded)
+        if blocks is None:
+            download = ChunkedDownload(self.hub, entry.path, part_path, window=2)
+            await download.run()
+            # ChunkedDownload finished into part_path itself; its own .part file is gone by now
+            self.bytes_fetched += download.received
+            blocks = await asyncio.to_thread(block_hashes, part_path)
+            self.counts["fetched"] += 1
+
+        os.replace(part_path, local_path)
+        stat = os.stat(local_path)
+        self.manifest.files[relative] = {"size": size, "modified": _timestamp(entry.last_modified),
+                                         "local_size": stat.st_size, "local_mtime_ns": stat.st_mtime_ns, "blocks": blocks}
+
+    async def _patch(self, entry, local_path, part_path, recorded):
+        """Fetches only the changed blocks into a copy of the local file; None when a full download is needed."""
+        try:
+            remote_blocks = await self.hub.invoke("GetFileBlockHashes", entry.path, BLOCK_SIZE,
+                                                  timeout=max(60, entry.size / (20 << 20)))
+        except HubError as e:
+            if is_unknown_method(e):
+                logger.info("Hub cannot hash blocks; syncing whole files.")
+                self._block_hashes_supported = False
+            else:
+                # Locked or vanished: a full download of this one file settles it
+                logger.info(f"Cannot hash the blocks of {entry.path} ({e}); downloading it whole.")
+            return None
+        stat = os.stat(local_path)
+        if recorded and (stat.st_size, stat.st_mtime_ns) == (recorded["local_size"], recorded["local_mtime_ns"]):
+            local_blocks = recorded["blocks"]
+        else:
+            local_blocks = await asyncio.to_thread(block_hashes, local_path)
+        changed = [i for i, digest in enumerate(remote_blocks) if i >= len(local_blocks) or local_blocks[i] != digest]
+        if len(changed) > len(remote_blocks) // 2:
+            return None   # Mostly new content; a plain download pipelines better
+
+        await asyncio.to_thread(shutil.copyfile, local_path, part_path)
+        with open(part_path, "r+b") as f:
+            f.truncate(entry.size)
+            queue = collections.deque(changed)
+
+            async def worker():
+                while queue:
+                    index = queue.popleft()
+                    offset = index * BLOCK_SIZE
+                    length = min(BLOCK_SIZE, entry.size - offset)
+                    data = await self.hub.invoke("GetFileChunk", entry.path, offset, length, timeout=120)
+                    if isinstance(data, str):
+                        data = base64.b64decode(data)
+                    f.seek(offset)
+                    f.write(data)
+                    self.bytes_fetched += len(data)
+                    self.blocks_fetched += 1
+
+            await asyncio.gather(*(worker() for _ in range(4)))
+        if await asyncio.to_thread(block_hashes, part_path) != remote_blocks:
+            logger.info(f"{entry.path} changed while patching; downloading it whole.")
+            self.counts["rebuilt"] += 1
+            return None
+        self.counts["patched"] += 1
+        return remote_blocks
+
+    def _delete_missing(self, remote):
+        for relative in [r for r in self.manifest.files if r not in remote]:
+            recorded = self.manifest.files.pop(relative)
+            local_path = self._local_path(relative)
+            try:
+                stat = os.stat(local_path)
+            except FileNotFoundError:
+                continue
+            # Only what this mirror wrote; a file changed locally since is left alone
+            if (stat.st_size, stat.st_mtime_ns) == (recorded["local_size"], recorded["local_mtime_ns"]):
+                os.remove(local_path)
+                self.counts["deleted"] += 1
+
+    def summary(self):
+        counts = ", ".join(f"{count} {name}" for name, count in sorted(self.counts.items()))
+        blocks = f" ({self.blocks_fetched} blocks patched)" if self.blocks_fetched else ""
+        return (f"{self.remote_root} -> {self.local_root}: {counts}; fetched {self.bytes_fetched / (1 << 20):.1f} MB{blocks}; "
+                f"listing {self.walk_seconds:.2f} s, total {self.seconds:.2f} s")
+
+async def sync(args):
+    # A connection of its own, so transfers aren't capped by bulk_window
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return 1
+    try:
+        mirror = MirrorSync(hub, args.remote, args.local, window=args.window, walk_window=args.walk_window,
+                            delete=not args.no_delete)
+        await mirror.run()
+        print(mirror.summary())
+        return 1 if mirror.counts["failed"] else 0
+    except HubError as e:
+        print(f"Sync failed: {e}")
+        return 1
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror a directory on the hub's PC into a local folder, incrementally.")
+    parser.add_argument("remote", help="Directory on the hub's PC")
+    parser.add_argument("local", help="Local folder (created if missing; holds the manifest)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Files transferring at once")
+    parser.add_argument("--walk-window", type=int, default=DEFAULT_WALK_WINDOW, help="Directory listings in flight")
+    parser.add_argument("--no-delete", action="store_true", help="Keep local files that are gone from the hub")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(sync(args)))
+
+if __name__ == "__main__":
+    main()
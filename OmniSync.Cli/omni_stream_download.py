@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Multi-connection downloads over the hub's HTTP /api/stream endpoint.
+
+StreamController.GetVideo (/api/stream?path=...) serves any file on the hub's PC with
+HTTP range support, for video players to seek with. RangeDownload uses it for bulk
+pulls. The file is split into ranges of `range_size` bytes, which `connections`
+worker threads fetch, each over its own keep-alive HTTP connection. One TCP
+connection over a long or lossy path stays well below the line rate; several
+together fill it. Each response body is read straight into its place in a
+preallocated, memory-mapped "<local>.part" file (HTTPResponse.readinto on a slice of
+the map), so the bytes are never copied through Python objects.
+
+Every range request carries If-Range with the ETag of the first response (the hub
+derives it from the file's size and last write time; hubs that predate that only send
+Last-Modified, which misses a same-size rewrite within the same second). If the
+file changes mid-download, the hub answers with the whole new file (200) instead of
+the range, and the download stops rather than mixing two versions. A range that
+fails (reset, timeout, short body) goes back to the queue from its first missing byte
+and is retried on a fresh connection; the other ranges carry on. The ranges on disk
+are journaled like ChunkedDownload's ("<local>.part.json"), so an interrupted run
+resumes as long as the ETag is unchanged. Each range's Content-Range and length are
+checked against the request, and the whole file's against the size, before the .part
+file is renamed into place.
+
+The endpoint needs no SignalR connection or API key. The hub URLs only provide the
+address, raced like HubClient's (see omni_hub_endpoints).
+
+    download = RangeDownload(stream_url("http://10.0.0.37:5000/signalrhub"),
+                             "D:\\\\Recordings\\\\match.mkv", "match.mkv", connections=6)
+    download.run()       # Blocking; await asyncio.to_thread(download.run) from async code
+    print(download.summary())
+
+Usage:
+    python omni_stream_download.py <remote path> [local path] [--connections 4] [--range-mb 8]
+"""
+import os
+import sys
+import mmap
+import time
+import ntpath
+import asyncio
+import logging
+import argparse
+import threading
+import collections
+import http.client
+import urllib.parse
+
+from omni_hub_client import http_request
+from omni_hub_endpoints import EndpointCache, hub_urls, race
+from omni_file_download import DownloadError, DownloadJournal, merge_ranges, missing_ranges
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+# ---------------------
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RANGE = 8 << 20
+READ_SIZE = 1 << 20             # Bytes per readinto() call; progress is counted per read
+JOURNAL_INTERVAL = 1.0
+MAX_RETRIES = 5                 # Consecutive failed range requests before giving up
+TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+def stream_url(hub_url):
+    """The /api/stream URL of the hub behind a SignalR hub URL."""
+    parts = urllib.parse.urlsplit(hub_url)
+    scheme = {"ws": "http", "wss": "https"}.get(parts.scheme, parts.scheme)
+    return urllib.parse.urlunsplit((scheme, parts.netloc, "/api/stream", "", ""))
+
+def _content_range(response):
+    # "bytes 0-1023/4096" or, for 416, "bytes */4096" -> (first, last, total)
+    spec, _, total = (response.getheader("Content-Range") or "").partition(" ")[2].partition("/")
+    first, _, last = spec.partition("-")
+    try:
+        return (int(first) if first != "*" else None, int(last) if last else None, int(total))
+    except ValueError:
+        raise http.client.HTTPException(f"bad Content-Range {response.getheader('Content-Range')!r}")
+
+class RangeDownload:
+    def __init__(self, base_url, remote_path, local_path, connections=DEFAULT_CONNECTIONS,
+                 range_size=DEFAULT_RANGE, on_progress=None):
+        self.base_url = base_url
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.part_path = local_path + ".part"
+        self.journal = DownloadJournal(self.part_path + ".json")
+        self.connections = connections
+        self.range_size = range_size
+        self.on_progress = on_progress
+        self.size = None
+        self.etag = None
+        self.resumed = 0          # Bytes already on disk from an earlier, interrupted run
+        self.received = 0         # Bytes fetched by this run
+        self.requests = 0
+        self.retries = 0          # Range requests that failed and were requeued
+        self.seconds = 0.0
+        parts = urllib.parse.urlsplit(base_url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._netloc = parts.netloc
+        self._target = f"{parts.path}?{urllib.parse.urlencode({'path': remote_path})}"
+        self._lock = threading.Lock()
+        self._done = []
+        self._failures = 0
+        self._fatal = None
+        self._changed = False
+        self._last_checkpoint = 0.0
+
+    def _connect(self):
+        return self._connection_class(self._netloc, timeout=TIMEOUT)
+
+    def _request(self, connection, headers):
+        connection.request("GET", self._target, headers=headers)
+        return connection.getresponse()
+
+    def probe(self):
+        """(size, validator) of the remote file from a one-byte range request."""
+        connection = self._connect()
+        try:
+            response = self._request(connection, {"Range": "bytes=0-0"})
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise DownloadError(f"cannot reach {self.base_url}: {e!r}") from e
+        finally:
+            connection.close()
+        if response.status == 404:
+            raise DownloadError(f"{self.remote_path} not found on the hub")
+        if response.status not in (206, 416):   # 416: an empty file has no byte 0
+            raise DownloadError(f"{self.base_url} answered a range request with HTTP {response.status}")
+        validator = response.getheader("ETag") or response.getheader("Last-Modified")
+        return _content_range(response)[2], validator
+
+    def run(self):
+        """Downloads (or resumes) the file; raises DownloadError, leaving the journal behind to resume from."""
+        started = time.perf_counter()
+        self.size, self.etag = self.probe()
+        state = self.journal.load()
+        if (state and self.etag and (state.get("remote"), state.get("size"), state.get("modified")) == (self.remote_path, self.size, self.etag)
+                and os.path.exists(self.part_path) and os.path.getsize(self.part_path) == self.size):
+            self._done = merge_ranges(state.get("done") or [])
+            self.resumed = sum(end - start for start, end in self._done)
+            logger.info(f"Resuming {self.remote_path}: {self.resumed} of {self.size} bytes already on disk.")
+
+        with open(self.part_path, "r+b" if self._done else "w+b") as f:
+            f.truncate(self.size)   # Preallocates; sparse where the filesystem allows
+            view = mmap.mmap(f.fileno(), self.size) if self.size else None
+            try:
+                self._fetch(view)
+            finally:
+                self._checkpoint(view)
+                if view:
+                    view.close()
+        if self._fatal:
+            if self._changed:
+                self.journal.delete()    # What is on disk belongs to the old version
+            raise self._fatal
+
+        done = merge_ranges(self._done)
+        if self.size and done != [[0, self.size]] or os.path.getsize(self.part_path) != self.size:
+            raise DownloadError(f"{self.remote_path}: have {sum(e - s for s, e in done)} of {self.size} bytes")
+        os.replace(self.part_path, self.local_path)
+        self.journal.delete()
+        self.seconds = time.perf_counter() - started
+        return self
+
+    def _fetch(self, view):
+        if not self.size:
+            return
+        pending = collections.deque()      # [start, end) ranges not yet requested, lowest first
+        for start, end in missing_ranges(self.size, self._done):
+            for offset in range(start, end, self.range_size):
+                pending.append([offset, min(end, offset + self.range_size)])
+        workers = [threading.Thread(target=self._worker, args=(view, pending), daemon=True)
+                   for _ in range(min(self.connections, len(pending)))]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except BaseException:
+            # Ctrl-C: stop the workers (they hold views of the map) and keep what they got
+            with self._lock:
+                self._fatal = self._fatal or DownloadError("interrupted")
+            for worker in workers:
+                while worker.is_alive():   # Each stops within one read
+                    try:
+                        worker.join()
+                    except KeyboardInterrupt:
+                        pass
+            raise
+
+    def _worker(self, view, pending):
+        connection = None
+        with memoryview(view) as whole:
+            while True:
+                with self._lock:
+                    if not pending or self._fatal:
+                        break
+                    start, end = pending.popleft()
+                cursor = [start]
+                try:
+                    connection = connection or self._connect()
+                    self._get(connection, whole, cursor, end)
+                except DownloadError as e:
+                    with self._lock:
+                        self._done.append([start, cursor[0]])
+                        self._fatal = self._fatal or e
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    if connection:
+                        connection.close()
+                        connection = None
+                    with self._lock:
+                        self._done.append([start, cursor[0]])
+                        pending.appendleft([cursor[0], end])   # Only what is still missing
+                        self.retries += 1
+                        # Any byte received since the last failure resets the count
+                        self._failures = 0 if cursor[0] > start else self._failures + 1
+                        failures = self._failures
+                        if failures > MAX_RETRIES:
+                            self._fatal = DownloadError(f"{self.remote_path}: {failures} range requests failed in a row: {e!r}")
+                            break
+                    logger.warning(f"Range {cursor[0]}-{end} failed ({e!r}); retrying.")
+                    time.sleep(min(0.25 * 2 ** failures, 5))
+                    continue
+                with self._lock:
+                    self._done.append([start, end])
+                    self._failures = 0
+                if time.monotonic() - self._last_checkpoint >= JOURNAL_INTERVAL:
+                    self._checkpoint(view)
+        if connection:
+            connection.close()
+
+    def _get(self, connection, whole, cursor, end):
+        """Fetches [cursor[0], end) into the map, advancing cursor[0] as bytes land."""
+        headers = {"Range": f"bytes={cursor[0]}-{end - 1}"}
+        if self.etag:
+            headers["If-Range"] = self.etag
+        response = self._request(connection, headers)
+        with self._lock:
+            self.requests += 1
+        if response.status == 200:
+            self._changed = True
+            raise DownloadError(f"{self.remote_path} changed during the download")
+        if response.status != 206:
+            response.read()
+            raise http.client.HTTPException(f"HTTP {response.status} for range {cursor[0]}-{end - 1}")
+        if _content_range(response) != (cursor[0], end - 1, self.size) or response.length != end - cursor[0]:
+            raise DownloadError(f"{self.remote_path}: hub sent {response.getheader('Content-Range')} "
+                                f"for bytes {cursor[0]}-{end - 1}/{self.size}")
+        while cursor[0] < end:
+            with whole[cursor[0]:min(end, cursor[0] + READ_SIZE)] as target:
+                n = response.readinto(target)
+            if not n:
+                raise http.client.IncompleteRead(b"", end - cursor[0])
+            cursor[0] += n
+            with self._lock:
+                self.received += n
+            if self.on_progress:
+                self.on_progress(self)
+            if self._fatal:
+                raise DownloadError("stopped")   # Another range failed for good
+
+    def _checkpoint(self, view):
+        if self.size is None:
+            return
+        with self._lock:
+            self._last_checkpoint = time.monotonic()
+            if view:
+                view.flush()
+            self._done = merge_ranges(self._done)
+            self.journal.save(self.remote_path, self.size, self.etag, self._done)
+
+    def summary(self):
+        mb = self.received / (1 << 20)
+        rate = mb / self.seconds if self.seconds else 0.0
+        resumed = f", {self.resumed / (1 << 20):.1f} MB resumed" if self.resumed else ""
+        retried = f", {self.retries} ranges retried" if self.retries else ""
+        return (f"{self.remote_path}: {self.size} bytes; fetched {mb:.1f} MB in {self.seconds:.2f} s ({rate:.1f} MB/s) "
+                f"over {self.connections} connections, {self.requests} range requests{resumed}{retried}; length verified")
+
+async def select_stream_url(urls, path):
+    """The /api/stream URL of whichever hub URL answers first."""
+    async def attempt(url):
+        status, _, _ = await http_request(f"{stream_url(url)}?{urllib.parse.urlencode({'path': path})}",
+                                          headers={"Range": "bytes=0-0"}, timeout=5)
+        if status >= 500:
+            raise ConnectionError(f"HTTP {status}")
+    url, _ = await race(urls, attempt, EndpointCache())
+    return stream_url(url)
+
+def main():
+    parser = argparse.ArgumentParser(description="Download a file from the OmniSync hub's PC over parallel HTTP ranges.")
+    parser.add_argument("remote", help="Path on the hub's PC")
+    parser.add_argument("local", nargs="?", help="Local path (default: the file name, in the current directory)")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="Parallel HTTP connections")
+    parser.add_argument("--range-mb", type=int, default=DEFAULT_RANGE >> 20, help="Bytes per range request, in MB")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    local = args.local or ntpath.basename(args.remote)
+    try:
+        base_url = asyncio.run(select_stream_url(args.hub_url, args.remote))
+    except ConnectionError as e:
+        print(f"Failed to establish connection: {e}")
+        sys.exit(1)
+
+    last_progress = 0.0
+
+    def print_progress(download):
+        nonlocal last_progress
+        if time.monotonic() - last_progress < 0.5:
+            return
+        last_progress = time.monotonic()
+        have = download.resumed + download.received
+        print(f"\r{have / (1 << 20):8.1f} / {download.size / (1 << 20):.1f} MB   ", end="", flush=True)
+
+    download = RangeDownload(base_url, args.remote, local, connections=args.connections,
+                             range_size=args.range_mb << 20, on_progress=print_progress)
+    try:
+        download.run()
+    except (DownloadError, OSError) as e:
+        print(f"\nDownload failed: {e}")
+        if os.path.exists(download.journal.path):
+            print("Run the same command again to resume.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.")
+        sys.exit(130)
+    print()
+    print(download.summary())
+    print(f"Saved to {local}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""Local caching proxy in front of the hub's /api/stream endpoint.
+
+Every seek or replay through /api/stream?path=... reads the file again from the PC's
+disk and sends it over the network again. StreamProxy serves the same URL from a
+local block cache instead. Players (VLC, mpv, ExoPlayer on the phone) only need the
+proxy's address in place of the hub's:
+
+    http://127.0.0.1:5081/api/stream?path=D%3A%5CVideos%5Ctalk.mkv
+
+Files are cached in blocks of BLOCK_SIZE bytes, one cache file per block, so the
+cache of a file is sparse: only the parts that were played are kept. A request is
+answered block by block. Cached blocks come off the local disk. On a miss, the
+proxy fetches up to `readahead` consecutive missing blocks in one range request
+over a pooled keep-alive connection to the hub, and streams each block to the player
+as it arrives. Concurrent requests for a block share one fetch. Once the cache
+exceeds its cap, the least recently used blocks are deleted. The cache and its LRU
+order (file modification times) survive restarts.
+
+The proxy keeps a SignalR connection for FileChanged events. The hub watches the
+directory of every file it streams, so a changed, replaced or deleted file is
+reported. Its cached blocks are then distrusted until the next request revalidates
+them with a one-byte range request. If the ETag or size differs, the blocks are
+dropped. (Hubs old enough to send only Last-Modified miss a same-size rewrite within
+the same second.) The same revalidation happens for every file after a reconnect
+(events may have been missed), on every request while the SignalR connection is
+down, and once REVALIDATE_AFTER seconds have passed (the hub only keeps watchers for
+recently used directories). If the hub can't be reached at all, whatever is cached
+is still served.
+
+Usage:
+    python omni_stream_proxy.py [--port 5081] [--host 0.0.0.0] [--cache-dir DIR] [--cache-gb 4]
+"""
+import os
+import ssl
+import sys
+import json
+import time
+import shutil
+import asyncio
+import getpass
+import hashlib
+import logging
+import argparse
+import tempfile
+import collections
+import urllib.parse
+
+from omni_hub_client import HubClient
+from omni_hub_endpoints import hub_urls
+from omni_stream_download import stream_url
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+BLOCK_SIZE = 1 << 20
+READAHEAD = 8                   # Blocks fetched per upstream request on a miss
+DEFAULT_PORT = 5081
+DEFAULT_CAPACITY = 4 << 30
+UPSTREAM_TIMEOUT = 30
+REVALIDATE_AFTER = 60           # Seconds a validation is trusted without a FileChanged to the contrary
+
+logger = logging.getLogger(__name__)
+
+def default_cache_dir():
+    return os.path.join(tempfile.gettempdir(), f"omnisync-stream-cache-{getpass.getuser()}")
+
+def _key(path):
+    # Windows paths: case-insensitive, with or without a trailing separator
+    return path.rstrip("\\/").lower()
+
+class UpstreamError(Exception):
+    pass
+
+class CachedFile:
+    def __init__(self, path, directory):
+        self.path = path
+        self.key = _key(path)
+        self.directory = directory
+        self.size = None
+        self.etag = None
+        self.content_type = "application/octet-stream"
+        self.blocks = set()           # Indexes of the blocks on disk
+        self.validated = None         # Monotonic time of the last check against the hub, None once distrusted
+        self.generation = 0           # Bumped when the blocks are dropped; fetches of an older one aren't stored
+
+    def block_length(self, index):
+        return min(BLOCK_SIZE, self.size - index * BLOCK_SIZE)
+
+    def block_path(self, index):
+        return os.path.join(self.directory, f"{index}.blk")
+
+def _read_block(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    os.utime(path)        # Keeps the LRU order across restarts
+    return data
+
+def _write_block(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+class BlockCache:
+    """Blocks of remote files on disk, evicted least recently used first once over capacity."""
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY):
+        self.directory = directory
+        self.capacity = capacity
+        self.files = {}               # key -> CachedFile
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru = collections.OrderedDict()   # (CachedFile, index) -> bytes, oldest first
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        blocks = []
+        for name in os.listdir(self.directory):
+            directory = os.path.join(self.directory, name)
+            try:
+                with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            cached = CachedFile(meta["path"], directory)
+            cached.size, cached.etag, cached.content_type = meta["size"], meta["etag"], meta["contentType"]
+            self.files[cached.key] = cached
+            for block in os.listdir(directory):
+                if block.endswith(".blk"):
+                    stat = os.stat(os.path.join(directory, block))
+                    blocks.append((stat.st_mtime, cached, int(block[:-4]), stat.st_size))
+        for _, cached, index, size in sorted(blocks, key=lambda block: block[0]):
+            cached.blocks.add(index)
+            self._lru[cached, index] = size
+            self.used += size
+        self._evict()
+
+    def file(self, path):
+        key = _key(path)
+        cached = self.files.get(key)
+        if cached is None:
+            directory = os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest()[:20])
+            cached = self.files[key] = CachedFile(path, directory)
+        return cached
+
+    def reset(self, cached, size, etag, content_type):
+        """Records what the hub now serves for this file, dropping blocks of any other version."""
+        if (cached.size, cached.etag) != (size, etag):
+            self.drop_blocks(cached)
+        cached.size, cached.etag, cached.content_type = size, etag, content_type
+        os.makedirs(cached.directory, exist_ok=True)
+        with open(os.path.join(cached.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"path": cached.path, "size": size, "etag": etag, "contentType": content_type}, f)
+
+    def drop_blocks(self, cached):
+        cached.generation += 1
+        for index in cached.blocks:
+            self.used -= self._lru.pop((cached, index), 0)
+            try:
+                os.remove(cached.block_path(index))
+            except FileNotFoundError:
+                pass
+        cached.blocks.clear()
+
+    async def read(self, cached, index):
+        if index not in cached.blocks:
+            self.misses += 1
+            return None
+        try:
+            data = await asyncio.to_thread(_read_block, cached.block_path(index))
+        except FileNotFoundError:
+            return None       # Evicted meanwhile
+        self.hits += 1
+        if (cached, index) in self._lru:
+            self._lru.move_to_end((cached, index))
+        return data
+
+    async def write(self, cached, index, data):
+        generation = cached.generation
+        await asyncio.to_thread(_write_block, cached.block_path(index), data)
+        if generation != cached.generation or index in cached.blocks:
+            return            # Dropped meanwhile (the file changed), or stored by another fetch
+        cached.blocks.add(index)
+        self._lru[cached, index] = len(data)
+        self.used += len(data)
+        self._evict()
+
+    def _evict(self):
+        while self.used > self.capacity and self._lru:
+            (cached, index), size = self._lru.popitem(last=False)
+            cached.blocks.discard(index)
+            self.used -= size
+            self.evictions += 1
+            try:
+                os.remove(cached.block_path(index))
+            except FileNotFoundError:
+                pass
+
+def _parse_head(head):
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+def _parse_range(value, size):
+    """(first, last) byte of a single "bytes=" range, None for no (usable) range, or "unsatisfiable"."""
+    if not value or not value.startswith("bytes=") or "," in value:
+        return None           # Multiple ranges: answered with the whole file, as RFC 9110 allows
+    first, _, last = value[6:].strip().partition("-")
+    try:
+        if not first:
+            first, last = max(0, size - int(last)), size - 1
+        else:
+            first, last = int(first), min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if first >= size or first > last:
+        return "unsatisfiable"
+    return first, last
+
+class StreamProxy:
+    def __init__(self, hub, cache, readahead=READAHEAD):
+        self.hub = hub
+        self.cache = cache
+        self.readahead = readahead
+        self.upstream = urllib.parse.urlsplit(stream_url(hub.url))
+        self.requests = 0
+        self.upstream_requests = 0
+        self.invalidations = 0
+        self._pool = []               # Idle keep-alive (reader, writer) pairs to the hub
+        self._filling = {}            # (CachedFile, index) -> future of the block's bytes
+        hub.on("FileChanged", self._file_changed)
+        hub.on_open(self._reconnected)
+
+    async def serve(self, host, port):
+        return await asyncio.start_server(self._client, host, port)
+
+    # --- Events ---
+
+    def _file_changed(self, full_path, unix_ms=None):
+        key = _key(full_path)
+        for cached in list(self.cache.files.values()):
+            # The file itself, or a directory above it (renamed, deleted)
+            if cached.key == key or cached.key.startswith((key + "\\", key + "/")):
+                self._distrust(cached)
+                self.invalidations += 1
+
+    def _reconnected(self):
+        # The winning hub URL may have changed, and events may have been missed meanwhile
+        upstream = urllib.parse.urlsplit(stream_url(self.hub.url))
+        if upstream.netloc != self.upstream.netloc:
+            self.upstream = upstream
+            for _, writer in self._pool:
+                writer.close()
+            self._pool.clear()
+        for cached in self.cache.files.values():
+            self._distrust(cached)
+
+    def _distrust(self, cached):
+        cached.validated = None
+        # New requests start their own fetches; ones in flight still answer their own waiters
+        for key in [key for key in self._filling if key[0] is cached]:
+            del self._filling[key]
+
+    # --- Upstream ---
+
+    async def _upstream(self, path, first, last, etag=None):
+        """Sends a range request to the hub; returns (status, headers, reader, writer) with the body unread."""
+        target = f"{self.upstream.path}?{urllib.parse.urlencode({'path': path})}"
+        lines = [f"GET {target} HTTP/1.1", f"Host: {self.upstream.netloc}", f"Range: bytes={first}-{last}"]
+        if etag:
+            lines.append(f"If-Range: {etag}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        self.upstream_requests += 1
+        while True:
+            reused = bool(self._pool)
+            if reused:
+                reader, writer = self._pool.pop()
+            else:
+                secure = self.upstream.scheme == "https"
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                    self.upstream.hostname, self.upstream.port or (443 if secure else 80),
+                    ssl=ssl.create_default_context() if secure else None), UPSTREAM_TIMEOUT)
+            try:
+                writer.write(request)
+                await writer.drain()
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), UPSTREAM_TIMEOUT)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    continue      # The hub closed an idle connection
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            status_line, headers = _parse_head(head)
+            return int(status_line.split()[1]), headers, reader, writer
+
+    def _release(self, reader, writer):
+        if reader.at_eof() or writer.is_closing():
+            writer.close()
+        else:
+            self._pool.append((reader, writer))
+
+    async def _validate(self, cached):
+        """Makes sure the cached blocks belong to the version the hub serves now."""
+        if (cached.validated is not None and self.hub.connected.is_set()
+                and time.monotonic() - cached.validated < REVALIDATE_AFTER):
+            return
+        try:
+            status, headers, reader, writer = await self._upstream(cached.path, 0, 0)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            if cached.size is None:
+                raise UpstreamError(f"hub unreachable: {e!r}") from e
+            logger.warning(f"Hub unreachable ({e!r}); serving {cached.path} from the cache as is.")
+            return
+        try:
+            if status == 404:
+                self.cache.drop_blocks(cached)
+                raise FileNotFoundError(cached.path)
+            if status not in (206, 416):
+                raise UpstreamError(f"hub answered a range request with HTTP {status}")
+            size = int(headers.get("content-range", "").rpartition("/")[2])
+            if status == 206:
+                await asyncio.wait_for(reader.readexactly(int(headers.get("content-length", 0))), UPSTREAM_TIMEOUT)
+        except BaseException:
+            writer.close()
+            raise
+        if status == 206:
+            self._release(reader, writer)
+        else:
+            writer.close()
+        etag = headers.get("etag") or headers.get("last-modified")
+        self.cache.reset(cached, size, etag, headers.get("content-type", "application/octet-stream"))
+        cached.validated = time.monotonic()
+
+    async def _block(self, cached, index):
+        data = await self.cache.read(cached, index)
+        if data is not None:
+            return data
+        future = self._filling.get((cached, index))
+        if future is None:
+            last_block = (cached.size - 1) // BLOCK_SIZE
+            count = 1
+            while (count < self.readahead and index + count <= last_block
+                   and index + count not in cached.blocks and (cached, index + count) not in self._filling):
+                count += 1
+            futures = []
+            for i in range(index, index + count):
+                future = self._filling[cached, i] = asyncio.get_running_loop().create_future()
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())   # Readahead nobody waits for
+                futures.append(future)
+            asyncio.ensure_future(self._fill(cached, index, futures))
+            future = futures[0]
+        # Shielded: a player hanging up must not cancel a fetch other requests share
+        return await asyncio.shield(future)
+
+    async def _fill(self, cached, first, futures):
+        """Fetches len(futures) blocks from first on in one range request, resolving each as it arrives."""
+        generation = cached.generation
+        start = first * BLOCK_SIZE
+        last = min(cached.size, (first + len(futures)) * BLOCK_SIZE) - 1
+        writer = None
+        try:
+            status, headers, reader, writer = await self._upstream(cached.path, start, last, cached.etag)
+            if status == 200:
+                self._distrust(cached)
+                raise UpstreamError(f"{cached.path} changed on the hub")
+            if status != 206 or headers.get("content-range", "").split("/")[0] != f"bytes {start}-{last}":
+                raise UpstreamError(f"hub answered bytes {start}-{last} with HTTP {status} {headers.get('content-range')}")
+            for i, future in enumerate(futures):
+                data = await asyncio.wait_for(reader.readexactly(cached.block_length(first + i)), UPSTREAM_TIMEOUT)
+                if generation == cached.generation:
+                    await self.cache.write(cached, first + i, data)
+                self._resolve(cached, first + i, future, data)
+            self._release(reader, writer)
+        except BaseException as e:
+            if writer:
+                writer.close()
+            error = e if isinstance(e, Exception) else UpstreamError("cancelled")
+            for i, future in enumerate(futures):
+                if not future.done():
+                    self._resolve(cached, first + i, future, error=error)
+            if not isinstance(e, Exception):
+                raise
+
+    def _resolve(self, cached, index, future, data=None, error=None):
+        if self._filling.get((cached, index)) is future:
+            del self._filling[cached, index]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(data)
+
+    # --- Players ---
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                request_line, headers = _parse_head(head)
+                method, target, version = (request_line.split(" ", 2) + ["", ""])[:3]
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if not await self._handle(method, target, headers, writer):
+                    break
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass                      # The player went away (seeks often do that)
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, reason, headers=(), body=b""):
+        lines = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}"] + [f"{k}: {v}" for k, v in headers]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        return True
+
+    async def _handle(self, method, target, headers, writer):
+        """Answers one request; returns False when the connection can't be reused."""
+        parts = urllib.parse.urlsplit(target)
+        if parts.path != "/api/stream":
+            return await self._respond(writer, 404, "Not Found")
+        if method not in ("GET", "HEAD"):
+            return await self._respond(writer, 405, "Method Not Allowed", [("Allow", "GET, HEAD")])
+        path = urllib.parse.parse_qs(parts.query).get("path", [""])[0]
+        if not path:
+            return await self._respond(writer, 404, "Not Found")
+        self.requests += 1
+        cached = self.cache.file(path)
+        try:
+            await self._validate(cached)
+        except FileNotFoundError:
+            return await self._respond(writer, 404, "Not Found")
+        except (UpstreamError, ValueError) as e:
+            logger.warning(f"{path}: {e}")
+            return await self._respond(writer, 502, "Bad Gateway")
+
+        size = cached.size
+        byte_range = _parse_range(headers.get("range"), size) if size else None
+        if byte_range == "unsatisfiable" or (size == 0 and headers.get("range")):
+            return await self._respond(writer, 416, "Range Not Satisfiable", [("Content-Range", f"bytes */{size}")])
+        first, last = byte_range or (0, size - 1)
+        response = [("Content-Type", cached.content_type), ("Accept-Ranges", "bytes")]
+        if cached.etag:
+            response.append(("ETag", cached.etag))
+        if byte_range:
+            status_line = "HTTP/1.1 206 Partial Content"
+            response.append(("Content-Range", f"bytes {first}-{last}/{size}"))
+        else:
+            status_line = "HTTP/1.1 200 OK"
+        lines = [status_line, f"Content-Length: {last - first + 1}"] + [f"{k}: {v}" for k, v in response]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if method == "HEAD" or not size:
+            await writer.drain()
+            return True
+
+        hits = self.cache.hits
+        started = time.perf_counter()
+        for index in range(first // BLOCK_SIZE, last // BLOCK_SIZE + 1):
+            try:
+                data = await self._block(cached, index)
+            except (UpstreamError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                # Headers are out; all that can be done is cutting the response short
+                logger.warning(f"{path}: block {index}: {e!r}")
+                return False
+            offset = index * BLOCK_SIZE
+            writer.write(memoryview(data)[max(first - offset, 0):last - offset + 1])
+            await writer.drain()
+        blocks = last // BLOCK_SIZE - first // BLOCK_SIZE + 1
+        logger.info(f"{path} [{first}-{last}]: {min(self.cache.hits - hits, blocks)}/{blocks} blocks from the cache, "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+async def run_proxy(args):
+    hub = HubClient(args.hub_url, api_key=API_KEY)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return 1
+    try:
+        cache = BlockCache(args.cache_dir, int(args.cache_gb * (1 << 30)))
+        proxy = StreamProxy(hub, cache, readahead=args.readahead)
+        server = await proxy.serve(args.host, args.port)
+        print(f"Serving http://{args.host}:{args.port}/api/stream?path=... from {proxy.upstream.netloc}; cache "
+              f"{cache.used / (1 << 30):.2f} of {cache.capacity / (1 << 30):.1f} GB used at {args.cache_dir}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching range proxy for the hub's /api/stream (video playback).")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 for players on the LAN)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Where cached blocks are kept")
+    parser.add_argument("--cache-gb", type=float, default=DEFAULT_CAPACITY / (1 << 30), help="Cache size cap")
+    parser.add_argument("--readahead", type=int, default=READAHEAD, help=f"{BLOCK_SIZE >> 20} MB blocks fetched per miss")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        sys.exit(asyncio.run(run_proxy(args)))
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == "__main__":
+    main()
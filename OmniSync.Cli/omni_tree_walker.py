@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Concurrent walks over the hub PC's file system, with a shared listing cache.
+
+TreeWalker lists directories with up to `window` listing calls in flight and
+yields (relative path, FileSystemEntry) pairs as each listing arrives. The walk never
+waits for one directory before asking for the next. Relative paths join entry names
+with '/' below the root, so their depth is relative.count("/").
+
+    walker = TreeWalker(hub, window=8, cache=ListingCache(hub))
+    async for relative, entry in walker.walk("C:\\\\Projects", max_depth=3,
+                                             include=lambda rel, e: e.name.endswith(".py"),
+                                             descend=lambda rel, e: e.name != "node_modules"):
+        print(relative, entry.size)
+
+`include` decides what is yielded and `descend` which directories are entered. Both are
+given the relative path and the entry. Directories that can't be listed (access
+denied, vanished) are skipped and recorded in walker.errors, unless skip_errors=False.
+
+ListingCache keeps listings for `ttl` seconds and coalesces concurrent requests for
+the same directory. The hub watches every directory it lists and broadcasts
+FileChanged(fullPath, unixMs) when something in it changes; the cache drops the
+listings of that path and its parent. Everything is dropped after a reconnect, since
+events may have been missed meanwhile. Repeated walks over an unchanged tree are then
+served locally.
+
+Listings use GetDirectoryListing, which answers the caller only; ListDirectory would
+also broadcast every listing of a crawl to all connected clients. Hubs that predate
+it fall back to ListDirectory.
+
+Usage:
+    python omni_tree_walker.py <remote directory> [--max-depth N] [--window 8] [--pattern *.log]
+"""
+import sys
+import time
+import ntpath
+import asyncio
+import fnmatch
+import logging
+import weakref
+import argparse
+import collections
+
+from omni_hub_client import HubClient, HubError, is_unknown_method
+from omni_hub_endpoints import hub_urls
+
+# --- CONFIGURATION ---
+HUB_URL = hub_urls()                         # Loopback/LAN/Tailscale, raced; see omni_hub_endpoints
+API_KEY = "test_api_key"                     # Your Hub Secret
+# ---------------------
+
+DEFAULT_WINDOW = 8              # Listing calls in flight
+DEFAULT_TTL = 30.0
+LIST_TIMEOUT = 120
+
+logger = logging.getLogger(__name__)
+
+_broadcasting_hubs = weakref.WeakSet()     # Hubs without GetDirectoryListing
+
+async def list_directory(hub, path, timeout=LIST_TIMEOUT):
+    """Lists a directory for this caller only, or with ListDirectory on hubs that predate GetDirectoryListing."""
+    if hub not in _broadcasting_hubs:
+        try:
+            return await hub.invoke("GetDirectoryListing", path, timeout=timeout)
+        except HubError as e:
+            if not is_unknown_method(e):
+                raise
+            logger.info("Hub has no GetDirectoryListing; falling back to ListDirectory, which broadcasts each listing.")
+            _broadcasting_hubs.add(hub)
+    return await hub.invoke("ListDirectory", path, timeout=timeout)
+
+def _key(path):
+    # Windows paths: case-insensitive, with or without a trailing separator
+    return path.rstrip("\\/").lower()
+
+class ListingCache:
+    def __init__(self, hub, ttl=DEFAULT_TTL):
+        self.hub = hub
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listings = {}        # key -> (expires at, entries)
+        self._in_flight = {}       # key -> future of the listing call
+        self._stale = set()        # keys invalidated while their listing was in flight
+        hub.on("FileChanged", self._file_changed)
+        hub.on_open(self.clear)
+
+    async def list(self, path):
+        key = _key(path)
+        cached = self._listings.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.hits += 1
+            return cached[1]
+        future = self._in_flight.get(key)
+        if future is None:
+            self.misses += 1
+            future = self._in_flight[key] = asyncio.ensure_future(self._fetch(key, path))
+        # Shielded: one caller giving up must not cancel the listing for the others
+        return await asyncio.shield(future)
+
+    async def _fetch(self, key, path):
+        try:
+            entries = await list_directory(self.hub, path)
+        finally:
+            del self._in_flight[key]
+        if key in self._stale:
+            self._stale.discard(key)   # Changed while being listed; good for this caller only
+        else:
+            self._listings[key] = (time.monotonic() + self.ttl, entries)
+        return entries
+
+    def invalidate(self, path):
+        key = _key(path)
+        if self._listings.pop(key, None) is not None:
+            self.invalidations += 1
+        if key in self._in_flight:
+            self._stale.add(key)
+
+    def clear(self):
+        self._listings.clear()
+        self._stale.update(self._in_flight)
+
+    def _file_changed(self, full_path, unix_ms=None):
+        # The path itself, if it is a listed directory, and the directory that lists it
+        self.invalidate(full_path)
+        self.invalidate(ntpath.dirname(full_path.rstrip("\\/")))
+
+class TreeWalker:
+    def __init__(self, hub, window=DEFAULT_WINDOW, cache=None, skip_errors=True):
+        self.hub = hub
+        self.window = window
+        self.cache = cache
+        self.skip_errors = skip_errors
+        self.listed = 0
+        self.errors = []           # (path, exception) of directories that couldn't be listed
+
+    async def _list(self, path):
+        if self.cache:
+            return await self.cache.list(path)
+        return await list_directory(self.hub, path)
+
+    async def walk(self, root, max_depth=None, include=None, descend=None):
+        """Yields (relative path, entry) below root; max_depth=0 lists root only."""
+        pending = collections.deque([(root, "", 0)])   # (path, relative path, depth of its entries)
+        listing = {}                                    # task -> its pending tuple
+        try:
+            while pending or listing:
+                while pending and len(listing) < self.window:
+                    item = pending.popleft()
+                    listing[asyncio.ensure_future(self._list(item[0]))] = item
+                done, _ = await asyncio.wait(listing, return_when=asyncio.FIRST_COMPLETED)
+                ready = []
+                for task in done:
+                    path, relative_dir, depth = listing.pop(task)
+                    try:
+                        entries = task.result()
+                    except (HubError, ConnectionError, asyncio.TimeoutError) as e:
+                        if not self.skip_errors:
+                            raise
+                        self.errors.append((path, e))
+                        logger.warning(f"Skipping {path}: {e}")
+                        continue
+                    self.listed += 1
+                    for entry in entries:
+                        if entry.name == "..":
+                            continue
+                        relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                        if (entry.is_directory and (max_depth is None or depth < max_depth)
+                                and (descend is None or descend(relative, entry))):
+                            pending.append((entry.path, relative, depth + 1))
+                        if include is None or include(relative, entry):
+                            ready.append((relative, entry))
+                # Subdirectories go out before the caller gets to look at these entries
+                while pending and len(listing) < self.window:
+                    item = pending.popleft()
+                    listing[asyncio.ensure_future(self._list(item[0]))] = item
+                for item in ready:
+                    yield item
+        finally:
+            for task in listing:
+                task.cancel()
+
+async def walk_tree(args):
+    hub = HubClient(args.hub_url, api_key=API_KEY)
+    try:
+        await asyncio.wait_for(hub.start(), timeout=15)
+    except (asyncio.TimeoutError, OSError, PermissionError) as e:
+        print(f"Failed to establish connection: {e or 'timed out'}")
+        return 1
+    try:
+        walker = TreeWalker(hub, window=args.window)
+        include = (lambda rel, e: fnmatch.fnmatch(e.name.lower(), args.pattern.lower())) if args.pattern else None
+        started = time.perf_counter()
+        count = 0
+        async for relative, entry in walker.walk(args.root, max_depth=args.max_depth, include=include):
+            count += 1
+            print(f"{relative}{'/' if entry.is_directory else ''}")
+        print(f"{count} entries from {walker.listed} directories in {time.perf_counter() - started:.2f} s"
+              + (f"; {len(walker.errors)} skipped" if walker.errors else ""), file=sys.stderr)
+        return 0
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="List a directory tree on the hub's PC.")
+    parser.add_argument("root", help="Directory on the hub's PC")
+    parser.add_argument("--max-depth", type=int, default=None, help="Levels below root to descend into (0: root only)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Directory listings in flight")
+    parser.add_argument("--pattern", help="Only print names matching this glob, e.g. *.log")
+    parser.add_argument("--hub-url", nargs="+", default=HUB_URL, help="One or more hub URLs to race")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(walk_tree(args)))
+
+if __name__ == "__main__":
+    main()
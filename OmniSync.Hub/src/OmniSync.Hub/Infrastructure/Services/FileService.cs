@@ -3,6 +3,9 @@ using System.Collections.Generic;
 using System.IO;
 using System.Linq;
 using System.Security;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.Json;
 using OmniSync.Hub.Models; // Add using statement for the new DTO
 using OmniSync.Hub.Logic.Services; // Added for HubEventSender
 
@@ -14,10 +17,21 @@ namespace OmniSync.Hub.Infrastructure.Services
             private readonly string _browseRootPath; // New field for the configurable browse root
 
             // File change watching (Hub -> Android invalidation)
-            private readonly Dictionary<string, FileSystemWatcher> _watchers = new();
+            // Least recently requested watchers are disposed beyond MaxWatchers, so streaming
+            // clients and full-drive crawls don't pile up watcher handles and buffers
+            private const int MaxWatchers = 256;
+            private const int MaxTrackedEvents = 1024;
+            private readonly Dictionary<string, LinkedListNode<(string Directory, FileSystemWatcher Watcher)>> _watchers = new();
+            private readonly LinkedList<(string Directory, FileSystemWatcher Watcher)> _watcherOrder = new(); // Oldest request first
             private readonly Dictionary<string, DateTime> _lastEventTimes = new();
             private readonly object _watcherLock = new();
             private static readonly TimeSpan EventDebounce = TimeSpan.FromMilliseconds(300);
+
+            // Chunked uploads in progress, by upload id
+            public const int MaxUploadChunkSize = 1 << 20;
+            private static readonly TimeSpan UploadRetention = TimeSpan.FromDays(7); // Abandoned staging files are removed after this
+            private readonly Dictionary<string, UploadSession> _uploads = new();
+            private readonly object _uploadLock = new();
     
             // Events to notify about file write operations
             public event EventHandler<string>? FileWritten;
@@ -295,6 +309,309 @@ namespace OmniSync.Hub.Infrastructure.Services
             }
         }
 
+        public FileSystemEntry GetFileInfo(string filePath)
+        {
+            var fullPath = SanitizeAndGetBrowseFullPath(filePath);
+
+            if (Directory.Exists(fullPath))
+            {
+                var dirInfo = new DirectoryInfo(fullPath);
+                return new FileSystemEntry
+                {
+                    Name = dirInfo.Name,
+                    Path = dirInfo.FullName,
+                    IsDirectory = true,
+                    EntryType = "Directory",
+                    Size = 0,
+                    LastModified = dirInfo.LastWriteTime
+                };
+            }
+            if (!File.Exists(fullPath))
+            {
+                throw new FileNotFoundException($"File not found: {fullPath}");
+            }
+
+            var fileInfo = new FileInfo(fullPath);
+            return new FileSystemEntry
+            {
+                Name = fileInfo.Name,
+                Path = fileInfo.FullName,
+                IsDirectory = false,
+                EntryType = "File",
+                Size = fileInfo.Length,
+                LastModified = fileInfo.LastWriteTime
+            };
+        }
+
+        // Lowercase hex SHA-256 of the whole file, for clients verifying a chunked download
+        public string GetFileHash(string filePath)
+        {
+            var fullPath = SanitizeAndGetBrowseFullPath(filePath);
+
+            if (!File.Exists(fullPath))
+            {
+                throw new FileNotFoundException($"File not found: {fullPath}");
+            }
+
+            using (var stream = new FileStream(fullPath, FileMode.Open, FileAccess.Read, FileShare.Read, 1 << 20))
+            {
+                return Convert.ToHexString(SHA256.HashData(stream)).ToLowerInvariant();
+            }
+        }
+
+        // Lowercase hex SHA-256 of each blockSize-byte block, so a mirror can fetch only the blocks that changed
+        public List<string> GetFileBlockHashes(string filePath, int blockSize)
+        {
+            var fullPath = SanitizeAndGetBrowseFullPath(filePath);
+
+            if (blockSize < 4096) throw new ArgumentOutOfRangeException(nameof(blockSize), "Blocks must be at least 4096 bytes.");
+            if (!File.Exists(fullPath))
+            {
+                throw new FileNotFoundException($"File not found: {fullPath}");
+            }
+
+            var hashes = new List<string>();
+            var buffer = new byte[blockSize];
+            using (var stream = new FileStream(fullPath, FileMode.Open, FileAccess.Read, FileShare.Read, 1 << 20))
+            {
+                while (true)
+                {
+                    int filled = 0;
+                    int read;
+                    while (filled < blockSize && (read = stream.Read(buffer, filled, blockSize - filled)) > 0)
+                    {
+                        filled += read;
+                    }
+                    if (filled == 0) break;
+                    hashes.Add(Convert.ToHexString(SHA256.HashData(buffer.AsSpan(0, filled))).ToLowerInvariant());
+                    if (filled < blockSize) break;
+                }
+            }
+            return hashes;
+        }
+
+        // Chunked, resumable uploads into the browse root. Chunks land at their offsets in a hidden
+        // staging file next to the destination, and the received ranges are kept in a sidecar, so an
+        // upload survives reconnects and hub restarts. CompleteUpload checks the SHA-256 and then
+        // replaces the destination in one move.
+        private class UploadSession
+        {
+            public string Id = "";
+            public string FilePath = "";
+            public string FullPath = "";
+            public string StagingPath = "";
+            public long Size;
+            public string Sha256 = "";
+            public List<long[]> Received = new();
+            public readonly object Lock = new();
+
+            public string SidecarPath => StagingPath + ".json";
+        }
+
+        public UploadStatus BeginUpload(string filePath, long size, string sha256)
+        {
+            var fullPath = SanitizeAndGetBrowseFullPath(filePath);
+            if (size < 0) throw new ArgumentOutOfRangeException(nameof(size));
+            if (string.IsNullOrWhiteSpace(sha256) || sha256.Length != 64) throw new ArgumentException("Expected a hex SHA-256.", nameof(sha256));
+            if (Directory.Exists(fullPath)) throw new IOException($"{fullPath} is a directory");
+
+            sha256 = sha256.ToLowerInvariant();
+            // The same file to the same place always gets the same id, which is what lets a client resume
+            var id = Convert.ToHexString(SHA256.HashData(Encoding.UTF8.GetBytes($"{fullPath.ToLowerInvariant()}|{size}|{sha256}")))[..16].ToLowerInvariant();
+
+            UploadSession? session;
+            lock (_uploadLock)
+            {
+                if (!_uploads.TryGetValue(id, out session))
+                {
+                    var directory = Path.GetDirectoryName(fullPath) ?? throw new IOException($"No directory for {fullPath}");
+                    Directory.CreateDirectory(directory);
+                    PruneStaleUploads(directory);
+                    session = new UploadSession
+                    {
+                        Id = id,
+                        FilePath = filePath,
+                        FullPath = fullPath,
+                        StagingPath = Path.Combine(directory, $".{Path.GetFileName(fullPath)}.omniupload-{id}"),
+                        Size = size,
+                        Sha256 = sha256
+                    };
+                    if (!TryLoadUploadSidecar(session))
+                    {
+                        using (var stream = new FileStream(session.StagingPath, FileMode.Create, FileAccess.Write, FileShare.ReadWrite))
+                        {
+                            stream.SetLength(size);
+                        }
+                        File.SetAttributes(session.StagingPath, File.GetAttributes(session.StagingPath) | FileAttributes.Hidden);
+                        session.Received.Clear();
+                        SaveUploadSidecar(session);
+                    }
+                    _uploads[id] = session;
+                }
+            }
+            lock (session.Lock)
+            {
+                return GetUploadStatus(session);
+            }
+        }
+
+        public long WriteUploadChunk(string uploadId, long offset, byte[] data)
+        {
+            var session = GetUploadSession(uploadId);
+            if (data.Length > MaxUploadChunkSize) throw new ArgumentException($"Chunks are limited to {MaxUploadChunkSize} bytes.");
+            if (offset < 0 || offset + data.Length > session.Size) throw new ArgumentOutOfRangeException(nameof(offset), "Chunk lies outside the file.");
+
+            lock (session.Lock)
+            {
+                using (var stream = new FileStream(session.StagingPath, FileMode.Open, FileAccess.Write, FileShare.ReadWrite))
+                {
+                    stream.Seek(offset, SeekOrigin.Begin);
+                    stream.Write(data, 0, data.Length);
+                    stream.Flush(true); // On disk before it is acknowledged
+                }
+                session.Received = MergeRanges(session.Received.Append(new[] { offset, offset + data.Length }));
+                SaveUploadSidecar(session);
+                return session.Received.Sum(r => r[1] - r[0]);
+            }
+        }
+
+        public FileSystemEntry CompleteUpload(string uploadId)
+        {
+            var session = GetUploadSession(uploadId);
+            lock (session.Lock)
+            {
+                var received = session.Received.Sum(r => r[1] - r[0]);
+                if (received != session.Size)
+                {
+                    throw new InvalidOperationException($"Upload incomplete: {received} of {session.Size} bytes received.");
+                }
+
+                string hash;
+                using (var stream = new FileStream(session.StagingPath, FileMode.Open, FileAccess.Read, FileShare.Read, 1 << 20))
+                {
+                    hash = Convert.ToHexString(SHA256.HashData(stream)).ToLowerInvariant();
+                }
+                if (hash != session.Sha256)
+                {
+                    DiscardUpload(session);
+                    throw new InvalidDataException($"SHA-256 mismatch (expected {session.Sha256}, got {hash}); the upload was discarded.");
+                }
+
+                File.SetAttributes(session.StagingPath, File.GetAttributes(session.StagingPath) & ~FileAttributes.Hidden);
+                File.Move(session.StagingPath, session.FullPath, true);
+                File.Delete(session.SidecarPath);
+                lock (_uploadLock)
+                {
+                    _uploads.Remove(session.Id);
+                }
+            }
+            BrowseFileWritten?.Invoke(this, session.FilePath);
+            return GetFileInfo(session.FilePath);
+        }
+
+        public void AbortUpload(string uploadId)
+        {
+            var session = GetUploadSession(uploadId);
+            lock (session.Lock)
+            {
+                DiscardUpload(session);
+            }
+        }
+
+        private UploadSession GetUploadSession(string uploadId)
+        {
+            lock (_uploadLock)
+            {
+                if (_uploads.TryGetValue(uploadId, out var session)) return session;
+            }
+            throw new KeyNotFoundException($"Unknown upload '{uploadId}'; call BeginUpload again.");
+        }
+
+        private void DiscardUpload(UploadSession session)
+        {
+            File.Delete(session.StagingPath);
+            File.Delete(session.SidecarPath);
+            lock (_uploadLock)
+            {
+                _uploads.Remove(session.Id);
+            }
+        }
+
+        // Staging files and sidecars of uploads nobody resumed or aborted within UploadRetention.
+        // Called with _uploadLock held, so uploads in progress are skipped.
+        private void PruneStaleUploads(string directory)
+        {
+            var cutoff = DateTime.UtcNow - UploadRetention;
+            foreach (var path in Directory.EnumerateFiles(directory, ".*.omniupload-*"))
+            {
+                var marker = path.LastIndexOf(".omniupload-", StringComparison.Ordinal);
+                var id = path[(marker + ".omniupload-".Length)..].Split('.')[0];
+                if (_uploads.ContainsKey(id)) continue;
+                try
+                {
+                    if (File.GetLastWriteTimeUtc(path) < cutoff) File.Delete(path);
+                }
+                catch (IOException) { }                  // Retried on the next upload into this directory
+                catch (UnauthorizedAccessException) { }
+            }
+        }
+
+        private static UploadStatus GetUploadStatus(UploadSession session)
+        {
+            return new UploadStatus
+            {
+                UploadId = session.Id,
+                Size = session.Size,
+                ReceivedBytes = session.Received.Sum(r => r[1] - r[0]),
+                Received = session.Received.Select(r => new[] { r[0], r[1] }).ToList()
+            };
+        }
+
+        private static List<long[]> MergeRanges(IEnumerable<long[]> ranges)
+        {
+            var merged = new List<long[]>();
+            foreach (var range in ranges.OrderBy(r => r[0]))
+            {
+                if (merged.Count > 0 && range[0] <= merged[^1][1])
+                {
+                    merged[^1][1] = Math.Max(merged[^1][1], range[1]);
+                }
+                else
+                {
+                    merged.Add(new[] { range[0], range[1] });
+                }
+            }
+            return merged;
+        }
+
+        // The sidecar is only ever written after the chunks it lists are flushed
+        private static void SaveUploadSidecar(UploadSession session)
+        {
+            var tempPath = session.SidecarPath + ".tmp";
+            File.WriteAllText(tempPath, JsonSerializer.Serialize(new { session.Size, session.Sha256, session.Received }));
+            File.Move(tempPath, session.SidecarPath, true);
+            File.SetAttributes(session.SidecarPath, File.GetAttributes(session.SidecarPath) | FileAttributes.Hidden);
+        }
+
+        private static bool TryLoadUploadSidecar(UploadSession session)
+        {
+            try
+            {
+                if (!File.Exists(session.StagingPath) || !File.Exists(session.SidecarPath)) return false;
+                using var document = JsonDocument.Parse(File.ReadAllText(session.SidecarPath));
+                var root = document.RootElement;
+                if (root.GetProperty("Size").GetInt64() != session.Size || root.GetProperty("Sha256").GetString() != session.Sha256) return false;
+                if (new FileInfo(session.StagingPath).Length != session.Size) return false;
+                session.Received = MergeRanges(root.GetProperty("Received").EnumerateArray()
+                    .Select(r => new[] { r[0].GetInt64(), r[1].GetInt64() }));
+                return true;
+            }
+            catch (Exception ex) when (ex is IOException || ex is JsonException || ex is KeyNotFoundException || ex is InvalidOperationException)
+            {
+                return false;
+            }
+        }
+
         // Sanitizes paths for the specific note root (Obsidian directory)
         private string SanitizeAndGetNoteFullPath(string filePath)
         {
@@ -327,7 +644,12 @@ namespace OmniSync.Hub.Infrastructure.Services
 
             lock (_watcherLock)
             {
-                if (_watchers.ContainsKey(absoluteDirectory)) return;
+                if (_watchers.TryGetValue(absoluteDirectory, out var existing))
+                {
+                    _watcherOrder.Remove(existing);
+                    _watcherOrder.AddLast(existing);
+                    return;
+                }
 
                 var fsw = new FileSystemWatcher(absoluteDirectory)
                 {
@@ -348,7 +670,15 @@ namespace OmniSync.Hub.Infrastructure.Services
                 fsw.Renamed += onRenamed;
                 fsw.EnableRaisingEvents = true;
 
-                _watchers[absoluteDirectory] = fsw;
+                _watchers[absoluteDirectory] = _watcherOrder.AddLast((absoluteDirectory, fsw));
+
+                while (_watchers.Count > MaxWatchers)
+                {
+                    var oldest = _watcherOrder.First!;
+                    _watcherOrder.RemoveFirst();
+                    _watchers.Remove(oldest.Value.Directory);
+                    oldest.Value.Watcher.Dispose();
+                }
             }
         }
 
@@ -364,6 +694,15 @@ namespace OmniSync.Hub.Infrastructure.Services
                         return; // debounce
                     }
                     _lastEventTimes[fullPath] = now;
+
+                    if (_lastEventTimes.Count > MaxTrackedEvents)
+                    {
+                        // Entries past the debounce window no longer suppress anything
+                        foreach (var path in _lastEventTimes.Where(e => now - e.Value >= EventDebounce).Select(e => e.Key).ToList())
+                        {
+                            _lastEventTimes.Remove(path);
+                        }
+                    }
                 }
 
                 // Emit event with relative or absolute? We send absolute so Android can match its entries
@@ -13,7 +13,16 @@ namespace OmniSync.Hub.Infrastructure.Services
 
         public async Task ExecuteCommand(string command)
         {
-            await Task.Run(() =>
+            await ExecuteCommand(command, output => CommandOutputReceived?.Invoke(this, output));
+        }
+
+        /// <summary>
+        /// Runs the command with its output lines passed to <paramref name="onOutput"/> instead of the
+        /// CommandOutputReceived broadcast, and returns its exit code.
+        /// </summary>
+        public Task<int> ExecuteCommand(string command, Action<string> onOutput)
+        {
+            return Task.Run(() =>
             {
                 var processStartInfo = new ProcessStartInfo
                 {
@@ -31,14 +40,14 @@ namespace OmniSync.Hub.Infrastructure.Services
                     {
                         if (!string.IsNullOrEmpty(args.Data))
                         {
-                            CommandOutputReceived?.Invoke(this, args.Data + Environment.NewLine);
+                            onOutput(args.Data + Environment.NewLine);
                         }
                     };
                     process.ErrorDataReceived += (sender, args) =>
                     {
                         if (!string.IsNullOrEmpty(args.Data))
                         {
-                            CommandOutputReceived?.Invoke(this, "[ERROR] " + args.Data + Environment.NewLine);
+                            onOutput("[ERROR] " + args.Data + Environment.NewLine);
                         }
                     };
 
@@ -46,6 +55,7 @@ namespace OmniSync.Hub.Infrastructure.Services
                     process.BeginOutputReadLine();
                     process.BeginErrorReadLine();
                     process.WaitForExit();
+                    return process.ExitCode;
                 }
             });
         }
@@ -65,7 +65,7 @@ namespace OmniSync.Hub.Logic.Monitoring
                 _ = _hubEventSender.BroadcastCommandUpdate(command);
                 
                 // Filter out verbose commands from the persistent log
-                if (command == "MouseMove" || command.Contains("GetVolume") || command.Contains("GetFileChunk"))
+                if (command == "MouseMove" || command.Contains("GetVolume") || command.Contains("GetFileChunk") || command.Contains("UploadChunk"))
                 {
                     return;
                 }
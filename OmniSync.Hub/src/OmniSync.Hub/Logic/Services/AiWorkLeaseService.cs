@@ -0,0 +1,127 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace OmniSync.Hub.Logic.Services
+{
+    /// <summary>
+    /// Arbitrates which ai_listener instance handles a broadcast AI message.
+    /// Every message gets a work item id; listeners claim it with a time-limited lease,
+    /// renew the lease while the model turn runs and complete it when the reply was sent.
+    /// Leases held by a disconnected listener are released immediately, leases held by a
+    /// hung listener simply expire so another instance can take over.
+    /// </summary>
+    public class AiWorkLeaseService
+    {
+        private class WorkLease
+        {
+            public string? OwnerConnectionId { get; set; }
+            public DateTime ExpiresAt { get; set; } = DateTime.MinValue;
+            public bool Completed { get; set; }
+            public DateTime CreatedAt { get; } = DateTime.UtcNow;
+        }
+
+        // Completed or abandoned work items are forgotten after this long
+        private static readonly TimeSpan WorkItemRetention = TimeSpan.FromMinutes(10);
+
+        private readonly Dictionary<string, WorkLease> _leases = new Dictionary<string, WorkLease>();
+        private readonly object _lock = new object();
+
+        /// <summary>The Gemini PID last selected via SwitchAiSession, used to pick the owning listener.</summary>
+        public int? SelectedPid { get; set; }
+
+        public string CreateWorkItem()
+        {
+            var messageId = Guid.NewGuid().ToString("N");
+            lock (_lock)
+            {
+                PruneExpired();
+                _leases[messageId] = new WorkLease();
+            }
+            return messageId;
+        }
+
+        public bool TryClaim(string messageId, string connectionId, TimeSpan leaseDuration)
+        {
+            lock (_lock)
+            {
+                var now = DateTime.UtcNow;
+                if (!_leases.TryGetValue(messageId, out var lease))
+                {
+                    // Unknown id (hub restarted or item pruned): first claimer wins
+                    lease = new WorkLease();
+                    _leases[messageId] = lease;
+                }
+
+                if (lease.Completed)
+                {
+                    return false;
+                }
+
+                if (lease.OwnerConnectionId != null && lease.OwnerConnectionId != connectionId && lease.ExpiresAt > now)
+                {
+                    return false;
+                }
+
+                lease.OwnerConnectionId = connectionId;
+                lease.ExpiresAt = now + leaseDuration;
+                return true;
+            }
+        }
+
+        public bool Renew(string messageId, string connectionId, TimeSpan leaseDuration)
+        {
+            lock (_lock)
+            {
+                if (_leases.TryGetValue(messageId, out var lease) && !lease.Completed && lease.OwnerConnectionId == connectionId)
+                {
+                    lease.ExpiresAt = DateTime.UtcNow + leaseDuration;
+                    return true;
+                }
+                return false;
+            }
+        }
+
+        public bool Complete(string messageId, string connectionId)
+        {
+            lock (_lock)
+            {
+                if (_leases.TryGetValue(messageId, out var lease) && lease.OwnerConnectionId == connectionId)
+                {
+                    lease.Completed = true;
+                    return true;
+                }
+                return false;
+            }
+        }
+
+        /// <summary>Drops all unfinished leases held by a connection and returns the affected work item ids.</summary>
+        public List<string> ReleaseAll(string connectionId)
+        {
+            lock (_lock)
+            {
+                var released = _leases
+                    .Where(kv => !kv.Value.Completed && kv.Value.OwnerConnectionId == connectionId)
+                    .Select(kv => kv.Key)
+                    .ToList();
+
+                foreach (var messageId in released)
+                {
+                    _leases[messageId].OwnerConnectionId = null;
+                    _leases[messageId].ExpiresAt = DateTime.MinValue;
+                }
+                return released;
+            }
+        }
+
+        private void PruneExpired()
+        {
+            var cutoff = DateTime.UtcNow - WorkItemRetention;
+            var stale = _leases.Where(kv => kv.Value.CreatedAt < cutoff).Select(kv => kv.Key).ToList();
+            foreach (var messageId in stale)
+            {
+                _leases.Remove(messageId);
+            }
+        }
+    }
+}
@@ -4,6 +4,7 @@ using OmniSync.Hub.Infrastructure.Services;
 using System;
 using System.Collections.Generic;
 using System.Linq;
+using System.Threading.Channels;
 using System.Threading.Tasks;
 
 namespace OmniSync.Hub.Logic.Services
@@ -111,6 +112,58 @@ namespace OmniSync.Hub.Logic.Services
             }
         }
 
+        /// <summary>
+        /// Runs a command in the background for one connection: its output goes to that connection only, as
+        /// ReceiveTaggedCommandOutput(commandId, text) in order, followed by CommandFinished(commandId, exitCode).
+        /// </summary>
+        public void StartTaggedCommand(string connectionId, string commandId, string command)
+        {
+            _ = RunTaggedCommandAsync(connectionId, commandId, command);
+        }
+
+        private async Task RunTaggedCommandAsync(string connectionId, string commandId, string command)
+        {
+            var client = _hubContext.Clients.Client(connectionId);
+            // Output callbacks arrive on arbitrary threads; a single forwarder keeps the lines in order
+            var output = Channel.CreateUnbounded<string>(new UnboundedChannelOptions { SingleReader = true });
+            var forwarder = Task.Run(async () =>
+            {
+                await foreach (var text in output.Reader.ReadAllAsync())
+                {
+                    try
+                    {
+                        await client.SendAsync("ReceiveTaggedCommandOutput", commandId, text);
+                    }
+                    catch (Exception ex)
+                    {
+                        Console.WriteLine($"Error sending output of command {commandId} to client {connectionId}: {ex.Message}");
+                    }
+                }
+            });
+
+            int exitCode;
+            try
+            {
+                exitCode = await _processService.ExecuteCommand(command, text => output.Writer.TryWrite(text));
+            }
+            catch (Exception ex)
+            {
+                output.Writer.TryWrite($"Error: {ex.Message}{Environment.NewLine}");
+                exitCode = -1;
+            }
+            output.Writer.Complete();
+            await forwarder;
+
+            try
+            {
+                await client.SendAsync("CommandFinished", commandId, exitCode);
+            }
+            catch (Exception ex)
+            {
+                Console.WriteLine($"Error reporting completion of command {commandId} to client {connectionId}: {ex.Message}");
+            }
+        }
+
         private async void OnCommandOutputReceived(object sender, string output)
         {
             // Iterate over all subscribed clients and send the output
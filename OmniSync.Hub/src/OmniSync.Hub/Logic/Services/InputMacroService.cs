@@ -0,0 +1,182 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Runtime.InteropServices;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+using OmniSync.Hub.Infrastructure.Services;
+using OmniSync.Hub.Models;
+
+namespace OmniSync.Hub.Logic.Services
+{
+    /// <summary>
+    /// Replays a compiled input macro sent in a single hub message. Steps are compact arrays:
+    /// ["kd", vk] / ["ku", vk] / ["kp", vk] key down/up/press, ["t", text], ["m", dx, dy],
+    /// ["md", button] / ["mu", button] / ["c", button] mouse down/up/click, ["s", delta] scroll
+    /// and ["w", ms] wait. Waits are scheduled against the macro start rather than the previous
+    /// step, so lateness doesn't accumulate; each is timed with a coarse delay plus a short spin.
+    /// </summary>
+    public class InputMacroService
+    {
+        [DllImport("winmm.dll")]
+        private static extern uint timeBeginPeriod(uint uPeriod);
+
+        [DllImport("winmm.dll")]
+        private static extern uint timeEndPeriod(uint uPeriod);
+
+        private const int MaxSteps = 10000;
+        private static readonly TimeSpan MaxDuration = TimeSpan.FromMinutes(1);
+        private static readonly TimeSpan SpinWindow = TimeSpan.FromMilliseconds(2);
+        private static readonly HashSet<string> StepKinds = new HashSet<string> { "kd", "ku", "kp", "t", "m", "md", "mu", "c", "s", "w" };
+
+        private readonly InputService _inputService;
+        private readonly SemaphoreSlim _runLock = new SemaphoreSlim(1, 1); // Macros never interleave their keystrokes
+
+        public InputMacroService(InputService inputService)
+        {
+            _inputService = inputService;
+        }
+
+        public async Task<InputMacroResult> RunAsync(JsonElement steps, CancellationToken cancellationToken)
+        {
+            if (steps.ValueKind != JsonValueKind.Array || steps.GetArrayLength() > MaxSteps)
+            {
+                throw new ArgumentException($"A macro is an array of at most {MaxSteps} steps.");
+            }
+
+            // Validate everything up front so a bad step can't stop the macro halfway through
+            double totalWaitMs = 0;
+            foreach (var step in steps.EnumerateArray())
+            {
+                if (!IsValidStep(step))
+                {
+                    throw new ArgumentException($"Invalid macro step {step.GetRawText()}.");
+                }
+                if (step[0].GetString() == "w") totalWaitMs += step[1].GetDouble();
+            }
+            if (totalWaitMs > MaxDuration.TotalMilliseconds)
+            {
+                throw new ArgumentException($"Macro waits add up to more than {MaxDuration.TotalSeconds} seconds.");
+            }
+
+            var result = new InputMacroResult { Steps = steps.GetArrayLength() };
+            var heldKeys = new HashSet<ushort>();
+            var heldButtons = new HashSet<string>(StringComparer.OrdinalIgnoreCase);
+            await _runLock.WaitAsync(cancellationToken);
+            timeBeginPeriod(1);
+            try
+            {
+                var clock = Stopwatch.StartNew();
+                double dueMs = 0;
+                foreach (var step in steps.EnumerateArray())
+                {
+                    if (step[0].GetString() == "w")
+                    {
+                        dueMs += step[1].GetDouble();
+                        await WaitUntilAsync(clock, TimeSpan.FromMilliseconds(dueMs), cancellationToken);
+                        result.LatenessMs.Add(clock.Elapsed.TotalMilliseconds - dueMs);
+                    }
+                    else
+                    {
+                        Execute(step, heldKeys, heldButtons);
+                    }
+                }
+                result.DurationMs = clock.Elapsed.TotalMilliseconds;
+            }
+            finally
+            {
+                try
+                {
+                    // A failed or cancelled (ConnectionAborted) run must not leave keys or buttons held
+                    foreach (var key in heldKeys) _inputService.KeyUp(key);
+                    foreach (var button in heldButtons) _inputService.MouseUp(button);
+                }
+                finally
+                {
+                    timeEndPeriod(1);
+                    _runLock.Release();
+                }
+            }
+            return result;
+        }
+
+        private static async Task WaitUntilAsync(Stopwatch clock, TimeSpan due, CancellationToken cancellationToken)
+        {
+            var remaining = due - clock.Elapsed;
+            if (remaining > SpinWindow)
+            {
+                await Task.Delay(remaining - SpinWindow, cancellationToken);
+            }
+            var spinner = new SpinWait();
+            while (clock.Elapsed < due)
+            {
+                spinner.SpinOnce(-1); // Never escalates to Sleep(1), which would overshoot
+            }
+        }
+
+        private static bool IsValidStep(JsonElement step)
+        {
+            if (step.ValueKind != JsonValueKind.Array || step.GetArrayLength() == 0 || step[0].ValueKind != JsonValueKind.String)
+            {
+                return false;
+            }
+            var kind = step[0].GetString();
+            if (!StepKinds.Contains(kind!)) return false;
+            int arity = kind == "m" ? 3 : 2;
+            if (step.GetArrayLength() != arity) return false;
+            var argument = step[1];
+            switch (kind)
+            {
+                case "kd": case "ku": case "kp":
+                    return argument.ValueKind == JsonValueKind.Number && argument.TryGetUInt16(out _);
+                case "t":
+                    return argument.ValueKind == JsonValueKind.String;
+                case "m":
+                    return argument.ValueKind == JsonValueKind.Number && argument.TryGetInt32(out _)
+                        && step[2].ValueKind == JsonValueKind.Number && step[2].TryGetInt32(out _);
+                case "md": case "mu": case "c":
+                    return argument.ValueKind == JsonValueKind.String || argument.ValueKind == JsonValueKind.Null;
+                case "s":
+                    return argument.ValueKind == JsonValueKind.Number && argument.TryGetInt32(out _);
+                case "w":
+                    return argument.ValueKind == JsonValueKind.Number && argument.TryGetDouble(out var ms)
+                        && double.IsFinite(ms) && ms >= 0;
+                default:
+                    return false;
+            }
+        }
+
+        private void Execute(JsonElement step, HashSet<ushort> heldKeys, HashSet<string> heldButtons)
+        {
+            switch (step[0].GetString())
+            {
+                case "kd":
+                    _inputService.KeyDown(step[1].GetUInt16());
+                    heldKeys.Add(step[1].GetUInt16());
+                    break;
+                case "ku":
+                    _inputService.KeyUp(step[1].GetUInt16());
+                    heldKeys.Remove(step[1].GetUInt16());
+                    break;
+                case "kp": _inputService.SendKeyPress(step[1].GetUInt16()); break;
+                case "t": _inputService.SendText(step[1].GetString()); break;
+                case "m": _inputService.MoveMouse(step[1].GetInt32(), step[2].GetInt32()); break;
+                case "md":
+                    _inputService.MouseDown(step[1].GetString() ?? "Left");
+                    heldButtons.Add(step[1].GetString() ?? "Left");
+                    break;
+                case "mu":
+                    _inputService.MouseUp(step[1].GetString() ?? "Left");
+                    heldButtons.Remove(step[1].GetString() ?? "Left");
+                    break;
+                case "c":
+                    if (string.Equals(step[1].GetString(), "Right", StringComparison.OrdinalIgnoreCase)) _inputService.RightClick();
+                    else _inputService.LeftClick();
+                    break;
+                case "s": _inputService.MouseScroll(step[1].GetInt32()); break;
+                default: throw new ArgumentException($"Unknown macro step '{step[0].GetString()}'.");
+            }
+        }
+    }
+}
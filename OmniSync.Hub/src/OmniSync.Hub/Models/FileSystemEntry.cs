@@ -1,12 +1,17 @@
+using MessagePack;
+
 namespace OmniSync.Hub.Models
 {
+    // Sent as a positional array over MessagePack (the Python tools decode listings column-wise);
+    // JSON serialization is unaffected by the attributes.
+    [MessagePackObject]
     public class FileSystemEntry
     {
-        public string Name { get; set; }
-        public string Path { get; set; } // Can be absolute path or relative, depending on context
-        public bool IsDirectory { get; set; }
-        public long Size { get; set; } // For files
-        public System.DateTime LastModified { get; set; }
-        public string EntryType { get; set; } // "Drive", "Directory", "File"
+        [Key(0)] public string Name { get; set; }
+        [Key(1)] public string Path { get; set; } // Can be absolute path or relative, depending on context
+        [Key(2)] public bool IsDirectory { get; set; }
+        [Key(3)] public long Size { get; set; } // For files
+        [Key(4)] public System.DateTime LastModified { get; set; }
+        [Key(5)] public string EntryType { get; set; } // "Drive", "Directory", "File"
     }
 }
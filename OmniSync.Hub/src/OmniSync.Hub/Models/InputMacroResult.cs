@@ -0,0 +1,11 @@
+using System.Collections.Generic;
+
+namespace OmniSync.Hub.Models
+{
+    public class InputMacroResult
+    {
+        public int Steps { get; set; }
+        public double DurationMs { get; set; }
+        public List<double> LatenessMs { get; set; } = new List<double>(); // Per wait step: actual minus requested time since macro start
+    }
+}
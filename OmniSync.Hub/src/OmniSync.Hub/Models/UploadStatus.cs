@@ -0,0 +1,12 @@
+using System.Collections.Generic;
+
+namespace OmniSync.Hub.Models
+{
+    public class UploadStatus
+    {
+        public string UploadId { get; set; }
+        public long Size { get; set; }
+        public long ReceivedBytes { get; set; }
+        public List<long[]> Received { get; set; } = new List<long[]>(); // [start, end) byte ranges already on disk
+    }
+}
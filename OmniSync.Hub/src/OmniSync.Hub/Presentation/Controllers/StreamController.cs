@@ -1,6 +1,8 @@
 using Microsoft.AspNetCore.Mvc;
 using Microsoft.AspNetCore.StaticFiles;
+using Microsoft.Net.Http.Headers;
 using System.IO;
+using OmniSync.Hub.Infrastructure.Services;
 
 namespace OmniSync.Hub.Presentation.Controllers
 {
@@ -8,6 +10,13 @@ namespace OmniSync.Hub.Presentation.Controllers
     [ApiController]
     public class StreamController : ControllerBase
     {
+        private readonly FileService _fileService;
+
+        public StreamController(FileService fileService)
+        {
+            _fileService = fileService;
+        }
+
         [HttpGet("stream")]
         public IActionResult GetVideo([FromQuery] string path)
         {
@@ -25,8 +34,17 @@ namespace OmniSync.Hub.Presentation.Controllers
                 contentType = "application/octet-stream";
             }
 
+            // Clients that cache what they stream (omni_stream_proxy) rely on FileChanged for this file
+            _fileService.EnsureWatcherForDirectory(Path.GetDirectoryName(path) ?? string.Empty);
+
+            // Last-Modified alone is only good to a second; the ETag changes with any rewrite, so
+            // If-Range requests (omni_stream_download, omni_stream_proxy) never mix two versions
+            var info = new FileInfo(path);
+            var lastModified = new DateTimeOffset(info.LastWriteTimeUtc);
+            var entityTag = new EntityTagHeaderValue($"\"{info.Length:x}-{info.LastWriteTimeUtc.Ticks:x}\"");
+
             // "enableRangeProcessing: true" allows ExoPlayer to seek (jump forward/backward)
-            return PhysicalFile(path, contentType, enableRangeProcessing: true);
+            return PhysicalFile(path, contentType, lastModified, entityTag, enableRangeProcessing: true);
         }
     }
 }
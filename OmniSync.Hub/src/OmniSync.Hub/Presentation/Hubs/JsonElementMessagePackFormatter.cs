@@ -0,0 +1,39 @@
+using MessagePack;
+using MessagePack.Formatters;
+using MessagePack.Resolvers;
+using System.IO;
+using System.Text.Json;
+
+namespace OmniSync.Hub.Presentation.Hubs
+{
+    /// <summary>
+    /// Lets hub methods that take free-form JsonElement payloads (SendPayload, MouseMove, SendAiHubCommand, ...)
+    /// be called over the MessagePack protocol: the MessagePack value is converted to its JSON equivalent.
+    /// </summary>
+    public class JsonElementMessagePackFormatter : IMessagePackFormatter<JsonElement>
+    {
+        public static MessagePackSerializerOptions CreateSerializerOptions()
+        {
+            // Same resolvers SignalR uses by default, with JsonElement support in front
+            var resolver = CompositeResolver.Create(
+                new IMessagePackFormatter[] { new JsonElementMessagePackFormatter() },
+                new IFormatterResolver[] { DynamicEnumAsStringResolver.Instance, ContractlessStandardResolver.Instance });
+            return MessagePackSerializerOptions.Standard
+                .WithResolver(resolver)
+                .WithSecurity(MessagePackSecurity.UntrustedData);
+        }
+
+        public void Serialize(ref MessagePackWriter writer, JsonElement value, MessagePackSerializerOptions options)
+        {
+            writer.WriteRaw(MessagePackSerializer.ConvertFromJson(value.GetRawText(), options));
+        }
+
+        public JsonElement Deserialize(ref MessagePackReader reader, MessagePackSerializerOptions options)
+        {
+            using var json = new StringWriter();
+            MessagePackSerializer.ConvertToJson(ref reader, json, options);
+            using var document = JsonDocument.Parse(json.ToString());
+            return document.RootElement.Clone();
+        }
+    }
+}
@@ -32,9 +32,11 @@ namespace OmniSync.Hub.Presentation.Hubs
         private readonly ShutdownService _shutdownService;
         private readonly RegistryService _registryService;
         private readonly HubMonitorService _hubMonitorService;
+        private readonly AiWorkLeaseService _aiWorkLeaseService;
+        private readonly InputMacroService _inputMacroService;
         private readonly ILogger<RpcApiHub> _logger; // Added for logging
 
-        public RpcApiHub(AuthService authService, FileService fileService, ClipboardService clipboardService, CommandDispatcher commandDispatcher, ProcessService processService, HubEventSender hubEventSender, InputService inputService, AudioService audioService, ShutdownService shutdownService, RegistryService registryService, HubMonitorService hubMonitorService, ILogger<RpcApiHub> logger)
+        public RpcApiHub(AuthService authService, FileService fileService, ClipboardService clipboardService, CommandDispatcher commandDispatcher, ProcessService processService, HubEventSender hubEventSender, InputService inputService, AudioService audioService, ShutdownService shutdownService, RegistryService registryService, HubMonitorService hubMonitorService, AiWorkLeaseService aiWorkLeaseService, InputMacroService inputMacroService, ILogger<RpcApiHub> logger)
         {
             _authService = authService;
             _fileService = fileService;
@@ -47,6 +49,8 @@ namespace OmniSync.Hub.Presentation.Hubs
             _shutdownService = shutdownService;
             _registryService = registryService;
             _hubMonitorService = hubMonitorService;
+            _aiWorkLeaseService = aiWorkLeaseService;
+            _inputMacroService = inputMacroService;
             _logger = logger;
         }
 
@@ -69,6 +73,13 @@ namespace OmniSync.Hub.Presentation.Hubs
             _logger.LogInformation($"Client disconnected: {Context.ConnectionId}");
             ClientDisconnectedEvent?.Invoke(this, Context.ConnectionId);
             _hubEventSender.UnsubscribeFromCommandOutput(Context.UserIdentifier ?? Context.ConnectionId);
+
+            // Hand AI work held by a dead listener back to the remaining listeners
+            foreach (var messageId in _aiWorkLeaseService.ReleaseAll(Context.ConnectionId))
+            {
+                await Clients.All.SendAsync("AiWorkReleased", messageId);
+            }
+
             await base.OnDisconnectedAsync(exception);
         }
 
@@ -199,7 +210,28 @@ namespace OmniSync.Hub.Presentation.Hubs
                     Console.WriteLine($"Error moving mouse: {ex.Message}");
                 }
             }
-        }        public void UpdateClipboard(string text)
+        }
+
+        public async Task<InputMacroResult> RunInputMacro(JsonElement steps)
+        {
+            if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+            {
+                throw new HubException("Unauthorized");
+            }
+
+            AnyCommandReceived?.Invoke(this, $"RunInputMacro: {(steps.ValueKind == JsonValueKind.Array ? steps.GetArrayLength() : 0)} steps");
+
+            try
+            {
+                return await _inputMacroService.RunAsync(steps, Context.ConnectionAborted);
+            }
+            catch (Exception ex) when (ex is ArgumentException || ex is InvalidOperationException)
+            {
+                throw new HubException($"Invalid input macro: {ex.Message}");
+            }
+        }
+
+        public void UpdateClipboard(string text)
         {
             if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
             {
@@ -236,6 +268,21 @@ namespace OmniSync.Hub.Presentation.Hubs
             }
         }
 
+        /// <summary>
+        /// Starts a command and returns at once, so several can run on one connection. Output is tagged with
+        /// commandId and sent to the caller only (ReceiveTaggedCommandOutput), then CommandFinished(commandId, exitCode).
+        /// </summary>
+        public void StartCommand(string commandId, string command)
+        {
+            if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+            {
+                throw new HubException("Unauthorized");
+            }
+
+            AnyCommandReceived?.Invoke(this, command);
+            _hubEventSender.StartTaggedCommand(Context.ConnectionId, commandId, command);
+        }
+
         public async Task ExecuteCommand(string command)
         {
             try
@@ -340,27 +387,29 @@ namespace OmniSync.Hub.Presentation.Hubs
             }
         }
 
-        public async Task GetAvailableDrives()
+        public async Task<IEnumerable<FileSystemEntry>> GetAvailableDrives()
         {
             try
             {
                 if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
                 {
                     await Clients.Caller.SendAsync("ReceiveError", "Unauthorized: Please authenticate first.");
-                    return;
+                    return Enumerable.Empty<FileSystemEntry>();
                 }
 
                 AnyCommandReceived?.Invoke(this, "GetAvailableDrives");
                 
-                var drives = _fileService.GetDrives();
+                var drives = _fileService.GetDrives().ToList();
                 
-                // Python script expects "ReceiveAvailableDrives" event
+                // Returned for awaited invocations; the event is kept for clients that only listen
                 await Clients.Caller.SendAsync("ReceiveAvailableDrives", drives);
+                return drives;
             }
             catch (Exception ex)
             {
                 Console.WriteLine($"Error getting drives: {ex.Message}");
                 await Clients.Caller.SendAsync("ReceiveError", $"Error: {ex.Message}");
+                return Enumerable.Empty<FileSystemEntry>();
             }
         }
 
@@ -390,6 +439,29 @@ namespace OmniSync.Hub.Presentation.Hubs
             }
         }
 
+        /// <summary>
+        /// ListDirectory without the ReceiveDirectoryContents broadcast: the listing goes to the
+        /// caller only. For crawlers and mirrors, whose listings no other client asked for.
+        /// </summary>
+        public IEnumerable<FileSystemEntry> GetDirectoryListing(string path)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"GetDirectoryListing: {path}");
+                return _fileService.ListDirectoryContents(path);
+            }
+            catch (Exception ex)
+            {
+                _logger.LogError(ex, $"Error listing directory '{path}'");
+                throw new HubException($"Error listing directory: {ex.Message}");
+            }
+        }
+
         public async Task<IEnumerable<FileSystemEntry>> SearchFiles(string path, string query)
         {
             try
@@ -436,6 +508,147 @@ namespace OmniSync.Hub.Presentation.Hubs
             }
         }
 
+        public FileSystemEntry GetFileInfo(string filePath)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"GetFileInfo: {filePath}");
+
+                return _fileService.GetFileInfo(filePath);
+            }
+            catch (Exception ex)
+            {
+                _logger.LogError(ex, $"Error getting file info for '{filePath}'");
+                throw new HubException($"Error getting file info: {ex.Message}");
+            }
+        }
+
+        public async Task<string> GetFileHash(string filePath)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"GetFileHash: {filePath}");
+
+                // Reading a large file takes a while; keep it off the hub's invocation thread
+                return await Task.Run(() => _fileService.GetFileHash(filePath));
+            }
+            catch (Exception ex)
+            {
+                _logger.LogError(ex, $"Error hashing '{filePath}'");
+                throw new HubException($"Error hashing file: {ex.Message}");
+            }
+        }
+
+        public async Task<List<string>> GetFileBlockHashes(string filePath, int blockSize)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"GetFileBlockHashes: {filePath} Block: {blockSize}");
+
+                return await Task.Run(() => _fileService.GetFileBlockHashes(filePath, blockSize));
+            }
+            catch (Exception ex) when (ex is not HubException)
+            {
+                _logger.LogError(ex, $"Error hashing blocks of '{filePath}'");
+                throw new HubException($"Error hashing file blocks: {ex.Message}");
+            }
+        }
+
+        public UploadStatus BeginUpload(string filePath, long size, string sha256)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"BeginUpload: {filePath} Size: {size}");
+
+                return _fileService.BeginUpload(filePath, size, sha256);
+            }
+            catch (Exception ex) when (ex is not HubException)
+            {
+                _logger.LogError(ex, $"Error starting upload of '{filePath}'");
+                throw new HubException($"Error starting upload: {ex.Message}");
+            }
+        }
+
+        public long UploadChunk(string uploadId, long offset, byte[] data)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"UploadChunk: {uploadId} Offset: {offset} Size: {data?.Length ?? 0}");
+
+                return _fileService.WriteUploadChunk(uploadId, offset, data);
+            }
+            catch (Exception ex) when (ex is not HubException)
+            {
+                _logger.LogError(ex, $"Error writing upload chunk for '{uploadId}'");
+                throw new HubException($"Error writing upload chunk: {ex.Message}");
+            }
+        }
+
+        public FileSystemEntry CompleteUpload(string uploadId)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"CompleteUpload: {uploadId}");
+
+                return _fileService.CompleteUpload(uploadId);
+            }
+            catch (Exception ex) when (ex is not HubException)
+            {
+                _logger.LogError(ex, $"Error completing upload '{uploadId}'");
+                throw new HubException($"Error completing upload: {ex.Message}");
+            }
+        }
+
+        public void AbortUpload(string uploadId)
+        {
+            try
+            {
+                if (!Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) || !(bool)isAuthenticated)
+                {
+                    throw new HubException("Unauthorized");
+                }
+
+                AnyCommandReceived?.Invoke(this, $"AbortUpload: {uploadId}");
+
+                _fileService.AbortUpload(uploadId);
+            }
+            catch (Exception ex) when (ex is not HubException)
+            {
+                _logger.LogError(ex, $"Error aborting upload '{uploadId}'");
+                throw new HubException($"Error aborting upload: {ex.Message}");
+            }
+        }
+
         public async Task SendBrowserCommand(string command, string url, bool newTab)
         {
             if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
@@ -502,6 +715,44 @@ namespace OmniSync.Hub.Presentation.Hubs
                 AnyCommandReceived?.Invoke(this, $"AI Message Sent: {preview}");
                 // Broadcast the user message so other clients (like a CLI listener) can see it
                 await Clients.All.SendAsync("ReceiveAiMessage", Context.ConnectionId, message);
+
+                // Listeners compete for the work item via ClaimAiWork so only one of them runs the turn
+                var messageId = _aiWorkLeaseService.CreateWorkItem();
+                await Clients.All.SendAsync("ReceiveAiWorkItem", messageId, Context.ConnectionId, message, _aiWorkLeaseService.SelectedPid ?? 0);
+            }
+        }
+
+        public bool ClaimAiWork(string messageId, int leaseSeconds)
+        {
+            if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
+            {
+                var claimed = _aiWorkLeaseService.TryClaim(messageId, Context.ConnectionId, TimeSpan.FromSeconds(leaseSeconds));
+                if (claimed)
+                {
+                    _logger.LogInformation($"AI work {messageId} claimed by {Context.ConnectionId}");
+                }
+                return claimed;
+            }
+            return false;
+        }
+
+        public bool RenewAiWork(string messageId, int leaseSeconds)
+        {
+            if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
+            {
+                return _aiWorkLeaseService.Renew(messageId, Context.ConnectionId, TimeSpan.FromSeconds(leaseSeconds));
+            }
+            return false;
+        }
+
+        public async Task CompleteAiWork(string messageId)
+        {
+            if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
+            {
+                if (_aiWorkLeaseService.Complete(messageId, Context.ConnectionId))
+                {
+                    await Clients.All.SendAsync("AiWorkCompleted", messageId);
+                }
             }
         }
 
@@ -514,6 +765,23 @@ namespace OmniSync.Hub.Presentation.Hubs
             }
         }
 
+        public async Task SendAiResponseBlocks(string blocksJson)
+        {
+            if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
+            {
+                // Pre-parsed layout of the last AI response (see ai_response_blocks.py)
+                await Clients.All.SendAsync("ReceiveAiResponseBlocks", blocksJson);
+            }
+        }
+
+        public async Task SendAiHistoryBlocks(string blocksJson)
+        {
+            if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
+            {
+                await Clients.All.SendAsync("ReceiveAiHistoryBlocks", blocksJson);
+            }
+        }
+
         public async Task SendAiStatus(string status)
         {
             if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
@@ -576,6 +844,7 @@ namespace OmniSync.Hub.Presentation.Hubs
             if (Context.Items.TryGetValue("IsAuthenticated", out var isAuthenticated) && (bool)isAuthenticated)
             {
                 AnyCommandReceived?.Invoke(this, $"SwitchAiSession: {pid}");
+                _aiWorkLeaseService.SelectedPid = pid;
                 await Clients.All.SendAsync("SwitchAiSession", pid);
             }
         }
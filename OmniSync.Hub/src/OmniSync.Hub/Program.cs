@@ -90,6 +90,8 @@ builder.Services.AddSingleton<HubEventSender>(provider =>
     return new HubEventSender(hubContext, processService, inputService, shutdownService, commandDispatcher, fileService);
 });
 builder.Services.AddSingleton<HubMonitorService>(); // Register the new monitoring service
+builder.Services.AddSingleton<AiWorkLeaseService>(); // Arbitrates AI messages between multiple listeners
+builder.Services.AddSingleton<InputMacroService>(); // Replays batched input macros with precise timing
 builder.Services.AddHostedService<TrayIconManager>();
 builder.Services.AddHostedService<HubStartupService>(); // Auto-launch AI components
 builder.Services.AddSingleton<KeyboardHook>(); // Register KeyboardHook
@@ -106,7 +108,15 @@ builder.Services.AddCors(options =>
         });
 });
 
-builder.Services.AddSignalR();
+builder.Services.AddSignalR(options =>
+    {
+        // Room for one UploadChunk (FileService.MaxUploadChunkSize, base64 over JSON) plus framing
+        options.MaximumReceiveMessageSize = 2 * 1024 * 1024;
+    })
+    .AddMessagePackProtocol(options => // Binary protocol for Python clients; JSON stays available for the app and extension
+    {
+        options.SerializerOptions = JsonElementMessagePackFormatter.CreateSerializerOptions();
+    });
 builder.Services.AddControllers();
 
 var app = builder.Build();
@@ -0,0 +1,113 @@
+"""
+Benchmark: decoding large FileSystemEntry listings into dicts vs EntryList.
+
+Builds a synthetic ListDirectory completion with --entries entries in each wire shape
+the client can receive:
+  - json:              camelCase objects (JSON hub protocol)
+  - messagepack maps:  PascalCase maps (MessagePack, hubs before the positional layout)
+  - messagepack array: positional arrays (MessagePack, current hub)
+
+and for each measures, over --repeat runs, the time to decode the frame into a list
+of dicts (what the client returned before) and into an EntryList, plus the memory
+still held by the result afterwards and the peak while decoding (tracemalloc). Also
+times a typical pass over the result: collecting the names of all directories.
+
+Runs offline; no hub needed.
+
+Usage:
+    python bench_entry_decoding.py [--entries 100000] [--repeat 5]
+"""
+import os
+import sys
+import gc
+import json
+import time
+import datetime
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import JsonHubProtocol, MessagePackHubProtocol, RECORD_SEPARATOR, msgpack
+from omni_hub_entries import EntryList, PASCAL_KEYS
+
+def make_entries(count):
+    base = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    for i in range(count):
+        is_directory = i % 10 == 0
+        name = f"folder_{i:06d}" if is_directory else f"document_{i:06d}.txt"
+        yield {"name": name, "path": f"C:\\Users\\Public\\Documents\\{name}", "isDirectory": is_directory,
+               "size": 0 if is_directory else i * 37 % 1000000, "lastModified": base + datetime.timedelta(seconds=i),
+               "entryType": "Directory" if is_directory else "File"}
+
+def json_frame(entries):
+    rows = [dict(entry, lastModified=entry["lastModified"].strftime("%Y-%m-%dT%H:%M:%S.%f0Z")) for entry in entries]
+    return json.dumps({"type": 3, "invocationId": "1", "result": rows}) + RECORD_SEPARATOR
+
+def messagepack_frame(result):
+    body = msgpack.packb([3, {}, "1", 3, result], use_bin_type=True, datetime=True)
+    prefix = bytearray()
+    length = len(body)
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        prefix.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(prefix) + body
+
+def directory_names(result):
+    if isinstance(result, EntryList):
+        return [name for name, is_directory in zip(result.column("name"), result.column("is_directory")) if is_directory]
+    return [item.get("name") or item.get("Name") for item in result
+            if item.get("isDirectory", item.get("IsDirectory"))]
+
+def measure(decode, frame, repeat):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = decode(frame)
+        timings.append(time.perf_counter() - started)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = decode(frame)
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    directories = directory_names(result)
+    scan = time.perf_counter() - started
+    return min(timings), held, peak, scan, len(directories)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-of-dict and EntryList decoding of large listings.")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    entries = list(make_entries(args.entries))
+    shapes = [("json", JsonHubProtocol(), json_frame(entries))]
+    if msgpack:
+        pascal = [{key: entry[key[0].lower() + key[1:]] for key in PASCAL_KEYS} for entry in entries]
+        shapes.append(("messagepack maps", MessagePackHubProtocol(), messagepack_frame(pascal)))
+        shapes.append(("messagepack arrays", MessagePackHubProtocol(),
+                       messagepack_frame([[entry[key] for key in PASCAL_KEYS] for entry in pascal])))
+    else:
+        print("msgpack is not installed; only JSON is measured.")
+    del entries
+
+    print(f"{args.entries:,} entries, best of {args.repeat}")
+    print(f"{'shape':<20} {'result':<10} {'decode ms':>10} {'held MB':>9} {'peak MB':>9} {'dir scan ms':>12}")
+    for name, protocol, frame in shapes:
+        plain = lambda data: protocol.decode(data)[0]["result"]
+        compact = lambda data: EntryList.decode(protocol.decode(data)[0]["result"])
+        # The old client handed positional rows over as they came; only map-shaped listings make sense as dicts
+        variants = [("dicts", plain)] if name != "messagepack arrays" else []
+        variants.append(("EntryList", compact))
+        for label, decode in variants:
+            seconds, held, peak, scan, directories = measure(decode, frame, args.repeat)
+            print(f"{name:<20} {label:<10} {seconds * 1000:10.1f} {held / (1 << 20):9.1f} {peak / (1 << 20):9.1f} "
+                  f"{scan * 1000:12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: FilenameIndex (omni_filename_index) build time, size and query latency.
+
+Crawls the given roots on a running hub (or loads an existing index with --index)
+and reports:
+  - build:   crawl time (ListDirectory round trips) and indexing time
+  - size:    the index file next to the raw UTF-8 size of its paths, and load time
+  - queries: median / p95 latency and average matches for substring queries of
+             2, 3, 5 and 8 characters, and fuzzy queries with two adjacent letters
+             swapped, all cut from names sampled out of the index itself
+  - SearchFiles on the hub for 20 5-character queries, for comparison
+             (skipped with --index or --no-search-files; on a big drive every call
+             walks the disk)
+
+Usage:
+    python bench_filename_index.py [root ...] [--hub-url URL] [--queries 200] [--index FILE]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient, HubError
+from omni_filename_index import FilenameIndex
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def cut(name, length, rng):
+    start = rng.randrange(len(name) - length + 1)
+    return name[start:start + length]
+
+def swap(text, rng):
+    i = rng.randrange(len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+def report(label, timings, matches):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"  {label:<32} median {statistics.median(timings) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms   "
+          f"{sum(matches) / len(matches):9.1f} matches")
+
+def time_queries(queries, run):
+    timings, matches = [], []
+    for query in queries:
+        started = time.perf_counter()
+        matches.append(len(run(query)))
+        timings.append(time.perf_counter() - started)
+    return timings, matches
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure FilenameIndex build time, size and query latency.")
+    parser.add_argument("roots", nargs="*", help="Directories to index (default: the hub's browse root, or all drives)")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--window", type=int, default=16, help="Directory listings in flight while crawling")
+    parser.add_argument("--index", help="Benchmark this saved index instead of crawling")
+    parser.add_argument("--no-search-files", action="store_true", help="Skip the SearchFiles comparison")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.index or os.path.join(directory, "index.bin")
+        if not args.index:
+            hub = HubClient(args.hub_url, api_key=API_KEY)
+            await hub.start()
+            try:
+                await build(args, hub, path)
+            finally:
+                await hub.stop()
+        started = time.perf_counter()
+        index = FilenameIndex.load(path)
+        loaded = time.perf_counter() - started
+        raw = sum(len(p.encode("utf-8")) + 1 for p in index.paths)
+        print(f"  index file: {os.path.getsize(path) / (1 << 20):7.2f} MB ({raw / (1 << 20):.2f} MB of paths alone); "
+              f"loaded in {loaded * 1000:.0f} ms")
+
+    names = sample_names(index, args.queries * 4)
+    rng = random.Random(2)
+    print(f"Queries ({args.queries} of each kind; the first query of a trigram decodes its posting list):")
+    for length in (2, 3, 5, 8):
+        queries = [cut(name, length, rng) for name in names if len(name) >= length][:args.queries]
+        timings, matches = time_queries(queries, lambda q: list(index.search(q)))
+        report(f"substring, {length} chars", timings, matches)
+    queries = [swap(cut(name, 8, rng), rng) for name in names if len(name) >= 8][:args.queries]
+    timings, matches = time_queries(queries, lambda q: index.fuzzy(q))
+    report("fuzzy, 8 chars, 1 swap", timings, matches)
+    timings, matches = time_queries(queries, lambda q: index.fuzzy(q, limit=20))
+    report("fuzzy, 8 chars, top 20", timings, matches)
+
+def sample_names(index, count):
+    rng = random.Random(1)
+    return [index.name(i) for i in rng.sample(range(len(index.paths)), min(len(index.paths), count))]
+
+async def build(args, hub, path):
+    index = await FilenameIndex.build(hub, args.roots or [""], window=args.window)
+    print(f"{len(index)} paths under {', '.join(repr(root) for root in index.roots)}")
+    print(f"  crawl:    {index.crawl_seconds:7.2f} s")
+    print(f"  indexing: {index.index_seconds:7.2f} s")
+    index.save(path)
+    if args.no_search_files:
+        return
+    # Before the local queries, which keep the event loop busy
+    rng = random.Random(3)
+    queries = [cut(name, 5, rng) for name in sample_names(index, 40) if len(name) >= 5][:20]
+    root = args.roots[0] if args.roots else ""
+    timings, matches = [], []
+    for query in queries:
+        started = time.perf_counter()
+        try:
+            matches.append(len(await hub.invoke("SearchFiles", root, query, timeout=600) or []))
+        except HubError as e:
+            print(f"  SearchFiles: skipped ({e})")
+            return
+        timings.append(time.perf_counter() - started)
+    report("SearchFiles, 5 chars (max 100)", timings, matches)
+
+if __name__ == "__main__":
+    asyncio.run(main())
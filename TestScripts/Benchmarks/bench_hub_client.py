@@ -0,0 +1,146 @@
+"""
+Benchmark: asyncio-native HubClient vs signalrcore.
+
+Measures, for each client against a running hub:
+  - connect time (start -> authenticated connection usable)
+  - round-trip latency of SendAiStatus -> ReceiveAiStatus echoes (sequential)
+  - burst throughput (N sends in flight, time until all echoes arrived)
+  - Python thread count while connected
+
+The echo goes through the hub's AI status broadcast, so a connected phone briefly
+shows the benchmark status; it is cleared at the end.
+
+Usage:
+    python bench_hub_client.py [--hub-url URL] [--count 200] [--skip-signalrcore]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def report(name, connect_s, latencies, burst_s, count, threads):
+    print(f"\n[{name}]")
+    print(f"  connect:     {connect_s * 1000:8.1f} ms")
+    print(f"  round trip:  p50 {percentile(latencies, 0.5) * 1000:6.2f} ms   p99 {percentile(latencies, 0.99) * 1000:6.2f} ms")
+    print(f"  burst:       {count} msgs in {burst_s * 1000:.1f} ms ({count / burst_s:,.0f} msg/s)")
+    print(f"  threads:     {threads}")
+
+async def bench_hub_client(url, count):
+    loop = asyncio.get_running_loop()
+    waiters = {}
+
+    def on_status(status):
+        future = waiters.pop(status, None)
+        if future and not future.done():
+            future.set_result(time.perf_counter())
+
+    hub = HubClient(url, api_key=API_KEY)
+    hub.on("ReceiveAiStatus", on_status)
+
+    start = time.perf_counter()
+    await hub.start()
+    connect_s = time.perf_counter() - start
+    threads = threading.active_count()
+
+    latencies = []
+    for i in range(count):
+        tag = f"bench-seq-{i}"
+        waiters[tag] = loop.create_future()
+        sent = time.perf_counter()
+        await hub.send("SendAiStatus", tag)
+        latencies.append(await asyncio.wait_for(waiters[tag], 10) - sent)
+
+    futures = []
+    start = time.perf_counter()
+    for i in range(count):
+        tag = f"bench-burst-{i}"
+        waiters[tag] = loop.create_future()
+        futures.append(waiters[tag])
+        await hub.send("SendAiStatus", tag)
+    await asyncio.wait_for(asyncio.gather(*futures), 30)
+    burst_s = time.perf_counter() - start
+
+    await hub.send("SendAiStatus", None)
+    await hub.stop()
+    report("HubClient (asyncio)", connect_s, latencies, burst_s, count, threads)
+
+async def bench_signalrcore(url, count):
+    from signalrcore.hub_connection_builder import HubConnectionBuilder
+
+    loop = asyncio.get_running_loop()
+    waiters = {}
+    opened = asyncio.Event()
+
+    def resolve(tag, received):
+        future = waiters.pop(tag, None)
+        if future and not future.done():
+            future.set_result(received)
+
+    def on_status(args):
+        # Runs on signalrcore's socket thread; timestamp here, resolve on the loop
+        loop.call_soon_threadsafe(resolve, args[0], time.perf_counter())
+
+    hub = HubConnectionBuilder().with_url(url).configure_logging(logging.WARNING).build()
+    hub.on("ReceiveAiStatus", on_status)
+    hub.on_open(lambda: loop.call_soon_threadsafe(opened.set))
+
+    start = time.perf_counter()
+    hub.start()
+    await asyncio.wait_for(opened.wait(), 15)
+    hub.send("Authenticate", [API_KEY])
+    connect_s = time.perf_counter() - start
+    threads = threading.active_count()
+
+    latencies = []
+    for i in range(count):
+        tag = f"bench-seq-{i}"
+        waiters[tag] = loop.create_future()
+        sent = time.perf_counter()
+        hub.send("SendAiStatus", [tag])
+        latencies.append(await asyncio.wait_for(waiters[tag], 10) - sent)
+
+    futures = []
+    start = time.perf_counter()
+    for i in range(count):
+        tag = f"bench-burst-{i}"
+        waiters[tag] = loop.create_future()
+        futures.append(waiters[tag])
+        hub.send("SendAiStatus", [tag])
+    await asyncio.wait_for(asyncio.gather(*futures), 30)
+    burst_s = time.perf_counter() - start
+
+    hub.send("SendAiStatus", [None])
+    hub.stop()
+    report("signalrcore", connect_s, latencies, burst_s, count, threads)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare HubClient and signalrcore latency and thread usage.")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--skip-signalrcore", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Hub: {args.hub_url}, {args.count} messages per phase, baseline threads: {threading.active_count()}")
+    await bench_hub_client(args.hub_url, args.count)
+    if not args.skip_signalrcore:
+        await bench_signalrcore(args.hub_url, args.count)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark: JSON vs MessagePack hub protocol.
+
+For each protocol, against a running hub:
+  - chunk download: reads a remote file through GetFileChunk with a window of
+    concurrent requests and reports MB/s and client CPU time per MB (base64 decoding
+    included for JSON, so both sides end up with the same bytes)
+  - directory listing: repeated ListDirectory calls, entries/s and CPU time per entry
+
+CPU time is the client process's (time.process_time), which is what the protocol
+choice mostly moves; the hub's own serialization cost shows up in wall time only.
+
+Usage:
+    python bench_hub_protocol.py [--hub-url URL] [--file PATH] [--megabytes 32]
+                                 [--chunk-kb 256] [--window 8] [--list-path PATH] [--list-repeat 20]
+"""
+import os
+import sys
+import time
+import base64
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient, JsonHubProtocol, MessagePackHubProtocol, msgpack
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+async def bench_download(hub, path, total, chunk_size, window):
+    offsets = iter(range(0, total, chunk_size))
+    received = 0
+    at_eof = False
+
+    async def worker():
+        nonlocal received, at_eof
+        for offset in offsets:
+            if at_eof:
+                return
+            chunk = await hub.invoke("GetFileChunk", path, offset, chunk_size)
+            if isinstance(chunk, str):
+                chunk = base64.b64decode(chunk)
+            received += len(chunk)
+            at_eof = at_eof or len(chunk) < chunk_size
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(window)))
+    return received, time.perf_counter() - wall, time.process_time() - cpu
+
+async def bench_listing(hub, path, repeat):
+    entries = 0
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(repeat):
+        entries += len(await hub.invoke("ListDirectory", path))
+    return entries, time.perf_counter() - wall, time.process_time() - cpu
+
+async def bench_protocol(protocol, args):
+    hub = HubClient(args.hub_url, api_key=API_KEY, protocol=protocol)
+    await hub.start()
+    try:
+        received, wall, cpu = await bench_download(hub, args.file, args.megabytes << 20, args.chunk_kb << 10, args.window)
+        mb = received / (1 << 20)
+        print(f"\n[{protocol.name}]")
+        print(f"  download:  {mb:6.1f} MB in {wall:6.2f} s  {mb / wall:7.1f} MB/s   CPU {cpu * 1000 / max(mb, 1e-9):6.1f} ms/MB")
+
+        entries, wall, cpu = await bench_listing(hub, args.list_path, args.list_repeat)
+        print(f"  listing:   {entries:6} entries in {wall:6.2f} s  {entries / wall:9,.0f} entries/s   "
+              f"CPU {cpu * 1e6 / max(entries, 1):6.1f} us/entry")
+    finally:
+        await hub.stop()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and MessagePack hub protocol throughput and CPU cost.")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--file", default=r"C:\Windows\System32\shell32.dll", help="Remote file to read (stops early at EOF)")
+    parser.add_argument("--megabytes", type=int, default=32)
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--window", type=int, default=8, help="Concurrent GetFileChunk calls")
+    parser.add_argument("--list-path", default=r"C:\Windows\System32")
+    parser.add_argument("--list-repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    protocols = [JsonHubProtocol()]
+    if msgpack:
+        protocols.append(MessagePackHubProtocol())
+    else:
+        print("msgpack is not installed; only the JSON protocol will be measured.")
+
+    print(f"Hub: {args.hub_url}, {args.megabytes} MB of {args.file} in {args.chunk_kb} KB chunks (window {args.window}), "
+          f"listing {args.list_path} x{args.list_repeat}")
+    for protocol in protocols:
+        await bench_protocol(protocol, args)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark: per-event mouse moves vs frame-paced coalescing (InputSender).
+
+Drives a synthetic 500 Hz trackpad stream (small deltas, a click every half second)
+against a running hub twice:
+  - naive:     one MouseMove call per event, as the test scripts do today
+  - coalesced: the same events through InputSender at --frame-rate
+
+and reports hub messages sent and cursor latency - the time from an event being
+generated until the hub completes the MouseMove that carried it (for coalesced
+moves, measured from the oldest event in the frame).
+
+The hub really moves the cursor on every MouseMove, so run it against a machine
+where that is acceptable.
+
+Usage:
+    python bench_input_sender.py [--hub-url URL] [--rate 500] [--seconds 5] [--frame-rate 120]
+"""
+import os
+import sys
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_hub_latency import LatencyRecorder
+from omni_input_sender import InputSender
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CLICK_EVERY = 0.5
+
+async def event_stream(rate, seconds):
+    """Yields (dx, dy, click) at `rate` events/s on an absolute schedule, catching up if the loop falls behind."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    next_click = CLICK_EVERY
+    for i in range(int(rate * seconds)):
+        due = start + i / rate
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        click = i / rate >= next_click
+        if click:
+            next_click += CLICK_EVERY
+        # Slow circle-ish motion with sub-pixel steps, like a trackpad at high report rate
+        yield (1.5 if (i // 250) % 2 == 0 else -1.5), 0.5, click
+
+async def run_naive(hub, recorder, rate, seconds):
+    loop = asyncio.get_running_loop()
+    tasks = set()
+    messages = 0
+    residual_x = residual_y = 0.0
+
+    async def timed_move(dx, dy, since):
+        await hub.invoke("MouseMove", {"X": dx, "Y": dy})
+        recorder.record("MouseMove (cursor)", loop.time() - since)
+
+    async for dx, dy, click in event_stream(rate, seconds):
+        residual_x += dx
+        residual_y += dy
+        step_x, step_y = int(residual_x), int(residual_y)
+        residual_x -= step_x
+        residual_y -= step_y
+        if step_x or step_y:
+            task = asyncio.create_task(timed_move(step_x, step_y, loop.time()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            messages += 1
+        if click:
+            await hub.send("SendPayload", "LEFT_CLICK", {})
+    await asyncio.gather(*tasks)
+    return messages
+
+async def run_coalesced(hub, recorder, rate, seconds, frame_rate):
+    sender = InputSender(hub, frame_rate=frame_rate, latency=recorder)
+    async for dx, dy, click in event_stream(rate, seconds):
+        sender.move(dx, dy)
+        if click:
+            await sender.click("Left")
+    await sender.close()
+    return sender.messages
+
+async def bench(name, args, run):
+    recorder = LatencyRecorder()
+    hub = HubClient(args.hub_url, api_key=API_KEY)
+    await hub.start()
+    try:
+        messages = await run(hub, recorder)
+    finally:
+        await hub.stop()
+    events = int(args.rate * args.seconds)
+    histogram = recorder.histograms.get("MouseMove (cursor)")
+    print(f"\n[{name}]")
+    print(f"  events {events}, MouseMove messages {messages} ({messages / args.seconds:,.0f}/s)")
+    if histogram and histogram.count:
+        print(f"  cursor latency ms: p50 {histogram.percentile(0.5) / 1000:.2f}  p90 {histogram.percentile(0.9) / 1000:.2f}  "
+              f"p99 {histogram.percentile(0.99) / 1000:.2f}  max {histogram.max / 1000:.2f}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare per-event and frame-paced mouse move sending.")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--rate", type=float, default=500, help="Synthetic input events per second")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--frame-rate", type=float, default=120, help="InputSender flushes per second")
+    args = parser.parse_args()
+
+    print(f"Hub: {args.hub_url}, {args.rate:g} Hz for {args.seconds:g} s")
+    await bench("naive", args, lambda hub, recorder: run_naive(hub, recorder, args.rate, args.seconds))
+    await bench(f"coalesced @ {args.frame_rate:g} fps", args,
+                lambda hub, recorder: run_coalesced(hub, recorder, args.rate, args.seconds, args.frame_rate))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Benchmark: single-stream GetFileChunk vs RangeDownload over /api/stream (omni_stream_download).
+
+Against a running hub, downloads the same remote file into a temporary directory:
+  - GetFileChunk: one chunk request at a time over the SignalR connection, the loop
+                  every caller used to write (bench_file_download.serial_download)
+  - RangeDownload with each of --connections parallel keep-alive HTTP connections,
+                  reading ranges straight into a memory-mapped file
+
+and reports wall time and MB/s for each. A single stream is capped by round trips
+and by what one TCP connection gets over the path; over loopback all of them are
+mostly bound by the hub reading the file.
+
+Usage:
+    python bench_stream_download.py <remote file> [--hub-url URL] [--connections 1 4 8] [--range-mb 8]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_stream_download import RangeDownload, stream_url
+from bench_file_download import serial_download
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare single-stream GetFileChunk with parallel HTTP range downloads.")
+    parser.add_argument("remote", help="Remote file to download")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--chunk-kb", type=int, default=256, help="Chunk size of the GetFileChunk loop")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8], help="RangeDownload connection counts to try")
+    parser.add_argument("--range-mb", type=int, default=8, help="Bytes per range request, in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+        await hub.start()
+        try:
+            started = time.perf_counter()
+            size = await serial_download(hub, args.remote, os.path.join(directory, "serial"), args.chunk_kb << 10)
+            serial = time.perf_counter() - started
+        finally:
+            await hub.stop()
+        os.remove(os.path.join(directory, "serial"))
+
+        mb = size / (1 << 20)
+        print(f"{mb:.1f} MB from {args.remote}")
+        label = f"GetFileChunk ({args.chunk_kb} KB chunks, 1 stream):"
+        print(f"  {label:<42}{serial:6.2f} s  {mb / serial:7.1f} MB/s")
+        for connections in args.connections:
+            local = os.path.join(directory, f"ranges{connections}")
+            download = RangeDownload(stream_url(args.hub_url), args.remote, local,
+                                     connections=connections, range_size=args.range_mb << 20)
+            await asyncio.to_thread(download.run)
+            if os.path.getsize(local) != size:
+                print(f"  RangeDownload x{connections}: got {os.path.getsize(local)} bytes, expected {size}")
+                return
+            os.remove(local)
+            label = f"RangeDownload ({connections} connection{'s' if connections > 1 else ''}):"
+            print(f"  {label:<42}{download.seconds:6.2f} s  {mb / download.seconds:7.1f} MB/s  ({download.requests} range requests)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark: interactive input latency during a bulk download on the same connection.
+
+Measures MouseMove round-trips (zero-distance moves, so the cursor stays put) at a
+fixed rate:
+  - idle:       no other traffic
+  - unlimited:  while a windowed GetFileChunk download runs, bulk_window=None
+  - limited:    the same download with HubClient's bulk window (--bulk-window-kb)
+
+and reports input p50/p99/max alongside download throughput. Without the limit every
+outstanding chunk is ahead of the move in the hub's per-connection invocation queue;
+with it, at most a window's worth is.
+
+Usage:
+    python bench_traffic_classes.py [--hub-url URL] [--file PATH] [--megabytes 64]
+                                    [--chunk-kb 256] [--window 16] [--bulk-window-kb 1024] [--input-hz 100]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_hub_latency import LatencyHistogram
+
+# --- CONFIGURATION ---
+HUB_URL = "http://127.0.0.1:5000/signalrhub"
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+async def download(hub, path, total, chunk_size, window):
+    offsets = iter(range(0, total, chunk_size))
+    received = 0
+    at_eof = False
+
+    async def worker():
+        nonlocal received, at_eof
+        for offset in offsets:
+            if at_eof:
+                return
+            chunk = await hub.invoke("GetFileChunk", path, offset, chunk_size, timeout=120)
+            received += len(chunk)
+            at_eof = at_eof or len(chunk) < chunk_size
+
+    await asyncio.gather(*(worker() for _ in range(window)))
+    return received
+
+async def probe_input(hub, rate, stop):
+    histogram = LatencyHistogram()
+    loop = asyncio.get_running_loop()
+    next_due = loop.time()
+    while not stop.is_set():
+        started = time.perf_counter()
+        await hub.invoke("MouseMove", {"X": 0, "Y": 0}, timeout=120)
+        histogram.record((time.perf_counter() - started) * 1e6)
+        next_due += 1 / rate
+        await asyncio.sleep(max(0, next_due - loop.time()))
+    return histogram
+
+async def run(name, args, bulk_window, with_download=True):
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=bulk_window)
+    await hub.start()
+    try:
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_input(hub, args.input_hz, stop))
+        started = time.perf_counter()
+        if with_download:
+            received = await download(hub, args.file, args.megabytes << 20, args.chunk_kb << 10, args.window)
+        else:
+            await asyncio.sleep(args.idle_seconds)
+            received = 0
+        elapsed = time.perf_counter() - started
+        stop.set()
+        histogram = await probe
+    finally:
+        await hub.stop()
+
+    line = (f"  {name:<22} input ms p50 {histogram.percentile(0.5) / 1000:8.2f}  p99 {histogram.percentile(0.99) / 1000:8.2f}"
+            f"  max {histogram.max / 1000:8.2f}  ({histogram.count} moves)")
+    if received:
+        line += f"   download {received / (1 << 20) / elapsed:7.1f} MB/s"
+    print(line)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure input latency while a download shares the hub connection.")
+    parser.add_argument("--hub-url", default=HUB_URL)
+    parser.add_argument("--file", default=r"C:\Windows\System32\shell32.dll", help="Remote file to read (stops early at EOF)")
+    parser.add_argument("--megabytes", type=int, default=64)
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--window", type=int, default=16, help="Concurrent GetFileChunk calls")
+    parser.add_argument("--bulk-window-kb", type=int, default=1024)
+    parser.add_argument("--input-hz", type=float, default=100)
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"Hub: {args.hub_url}, {args.megabytes} MB of {args.file} in {args.chunk_kb} KB chunks (window {args.window}), "
+          f"input probe at {args.input_hz:g} Hz")
+    await run("idle", args, None, with_download=False)
+    await run("unlimited", args, None)
+    await run(f"bulk window {args.bulk_window_kb} KB", args, args.bulk_window_kb << 10)
+
+if __name__ == "__main__":
+    asyncio.run(main())
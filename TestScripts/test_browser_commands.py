@@ -1,8 +1,12 @@
+import os
+import sys
 import asyncio
-from signalrcore.hub_connection_builder import HubConnectionBuilder
-import logging
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_hub_endpoints import hub_urls
+
 """
 Test script for the Browser Control functionality in OmniSync.
 This script validates that the SendBrowserCommand Hub method works correctly
@@ -21,35 +25,24 @@ Test Cases:
 5. Go forward
 """
 
-hub_url = "http://10.0.0.37:5000/signalrhub"
+hub_url = hub_urls() # Raced; see omni_hub_endpoints
 api_key = "test_api_key"
 
+# Pause after each command so Chrome has time to act before the next one
+async def browser_command(hub, command, url, new_tab, settle):
+    await hub.invoke("SendBrowserCommand", command, url, new_tab)
+    await asyncio.sleep(settle)
+
 async def main():
-    hub_connection = HubConnectionBuilder() \
-        .with_url(hub_url) \
-        .configure_logging(logging.INFO) \
-        .with_automatic_reconnect({
-            "type": "raw",
-            "keep_alive_interval": 10,
-            "intervals": [1, 2, 5, 10]
-        }) \
-        .build()
+    hub_connection = HubClient(hub_url, api_key=api_key, keep_alive_interval=10, reconnect_intervals=(1, 2, 5, 10))
 
     hub_connection.on_open(lambda: print("✓ Connection opened."))
     hub_connection.on_close(lambda: print("✗ Connection closed."))
-    hub_connection.on_error(lambda data: print(f"✗ Connection error: {data.error}"))
-
-    # Start the connection
-    print(f"\n🔌 Connecting to {hub_url}...")
-    hub_connection.start()
-    await asyncio.sleep(1)
-    print("✓ Connection established.")
 
-    # Authenticate
-    print("\n🔐 Authenticating...")
-    hub_connection.send("Authenticate", [api_key])
-    await asyncio.sleep(1)
-    print("✓ Authentication complete.")
+    # Start the connection; returns once the hub has accepted the API key
+    print(f"\n🔌 Connecting to {', '.join(hub_url)} and authenticating...")
+    await hub_connection.start()
+    print("✓ Connection established and authenticated.")
 
     print("\n" + "="*50)
     print("🌐 Testing Browser Control Commands")
@@ -57,38 +50,32 @@ async def main():
 
     # Test 1: Navigate to Google (current tab)
     print("\n[Test 1] Navigating to Google in current tab...")
-    hub_connection.send("SendBrowserCommand", ["Navigate", "https://google.com", False])
-    await asyncio.sleep(4)
+    await browser_command(hub_connection, "Navigate", "https://google.com", False, 4)
     print("✓ Sent Navigate command to google.com")
 
     # Test 2: Refresh the page
     print("\n[Test 2] Refreshing the page...")
-    hub_connection.send("SendBrowserCommand", ["Refresh", "", False])
-    await asyncio.sleep(3)
+    await browser_command(hub_connection, "Refresh", "", False, 3)
     print("✓ Sent Refresh command")
 
     # Test 3: Navigate to YouTube in new tab
     print("\n[Test 3] Opening YouTube in new tab...")
-    hub_connection.send("SendBrowserCommand", ["Navigate", "https://youtube.com", True])
-    await asyncio.sleep(4)
+    await browser_command(hub_connection, "Navigate", "https://youtube.com", True, 4)
     print("✓ Sent Navigate command to youtube.com (new tab)")
 
     # Test 4: Navigate to ChatGPT
     print("\n[Test 4] Navigating to ChatGPT...")
-    hub_connection.send("SendBrowserCommand", ["Navigate", "https://chatgpt.com", False])
-    await asyncio.sleep(4)
+    await browser_command(hub_connection, "Navigate", "https://chatgpt.com", False, 4)
     print("✓ Sent Navigate command to chatgpt.com")
 
     # Test 5: Go back
     print("\n[Test 5] Going back...")
-    hub_connection.send("SendBrowserCommand", ["Back", "", False])
-    await asyncio.sleep(2)
+    await browser_command(hub_connection, "Back", "", False, 2)
     print("✓ Sent Back command")
 
     # Test 6: Go forward
     print("\n[Test 6] Going forward...")
-    hub_connection.send("SendBrowserCommand", ["Forward", "", False])
-    await asyncio.sleep(2)
+    await browser_command(hub_connection, "Forward", "", False, 2)
     print("✓ Sent Forward command")
 
     print("\n" + "="*50)
@@ -105,7 +92,7 @@ async def main():
     print("   (Look for 'Command: Navigate, URL: ...' messages)")
 
     print("\n🔌 Stopping connection...")
-    hub_connection.stop()
+    await hub_connection.stop()
     print("✓ Connection stopped.")
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+"""
+Round trip through the hub's chunked file transfer: uploads a random file with
+ChunkedUpload, downloads it again with ChunkedDownload and compares the bytes. The
+upload is interrupted halfway (the connection is dropped) to exercise resuming from the
+hub's record of received ranges.
+
+Works against the real hub or any local stand-in that implements BeginUpload,
+UploadChunk, CompleteUpload, GetFileInfo, GetFileChunk and GetFileHash.
+
+Usage:
+    python test_file_transfer.py [remote directory] [--megabytes 8] [--hub-url URL ...]
+"""
+import os
+import sys
+import asyncio
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_hub_endpoints import hub_urls
+from omni_file_upload import ChunkedUpload
+from omni_file_download import ChunkedDownload
+
+# --- CONFIGURATION ---
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("TestFileTransfer")
+
+async def run(args):
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+    await hub.start()
+    remote = args.remote_dir.rstrip("\\/") + "\\omnisync_transfer_test.bin"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source.bin")
+            with open(source, "wb") as f:
+                f.write(os.urandom(args.megabytes << 20))
+
+            dropped = False
+
+            async def drop_halfway(upload):
+                nonlocal dropped
+                if not dropped and upload.acknowledged >= upload.size // 2:
+                    dropped = True
+                    logger.info(f"Dropping the connection at {upload.acknowledged} bytes...")
+                    await hub._ws.close()
+
+            upload = ChunkedUpload(hub, source, remote,
+                                   on_progress=lambda u: asyncio.ensure_future(drop_halfway(u)))
+            entry = await upload.run()
+            logger.info(upload.summary())
+            if entry is None or entry.size != args.megabytes << 20:
+                logger.error(f"FAILURE: CompleteUpload returned {entry!r}")
+                return 1
+
+            copy = os.path.join(directory, "copy.bin")
+            download = ChunkedDownload(hub, remote, copy)
+            await download.run()
+            logger.info(download.summary())
+
+            with open(source, "rb") as a, open(copy, "rb") as b:
+                if a.read() != b.read():
+                    logger.error("FAILURE: downloaded bytes differ from the upload.")
+                    return 1
+            if upload.rounds < 2:
+                logger.warning("The upload finished before the connection could be dropped; resume not exercised.")
+            logger.info("SUCCESS: upload and download round trip matched.")
+            return 0
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload/download round trip through the hub.")
+    parser.add_argument("remote_dir", nargs="?", default="C:\\Temp", help="Writable directory on the hub's PC")
+    parser.add_argument("--megabytes", type=int, default=8)
+    parser.add_argument("--hub-url", nargs="+", default=hub_urls())
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Plays a file through StreamProxy (omni_stream_proxy) the way a media player would: a
+full read, seeks, and the same ranges again. Uploads a random file with ChunkedUpload,
+reads it through an in-process proxy and compares the bytes, checks that repeated
+reads come from the block cache, then uploads different content to the same path and
+checks the proxy serves the new bytes after the hub's FileChanged. A cache cap below
+the file size exercises eviction.
+
+Works against the real hub or any local stand-in that implements the upload methods,
+/api/stream with ranges and ETags, and FileChanged for the written file.
+
+Usage:
+    python test_stream_proxy.py [remote directory] [--megabytes 24] [--hub-url URL ...]
+"""
+import os
+import sys
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "OmniSync.Cli"))
+from omni_hub_client import HubClient
+from omni_hub_endpoints import hub_urls
+from omni_file_upload import ChunkedUpload
+from omni_stream_proxy import BlockCache, StreamProxy, BLOCK_SIZE
+
+# --- CONFIGURATION ---
+API_KEY = "test_api_key"
+# ---------------------
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("TestStreamProxy")
+
+async def fetch(port, remote, first=None, last=None):
+    """GETs /api/stream from the proxy on a fresh connection; returns (status, body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        lines = [f"GET /api/stream?{urllib.parse.urlencode({'path': remote})} HTTP/1.1", "Host: 127.0.0.1", "Connection: close"]
+        if first is not None:
+            lines.append(f"Range: bytes={first}-{'' if last is None else last}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        return int(head.split()[1]), await reader.read()
+    finally:
+        writer.close()
+
+async def upload(hub, directory, remote, size):
+    source = os.path.join(directory, "source.bin")
+    with open(source, "wb") as f:
+        f.write(os.urandom(size))
+    entry = await ChunkedUpload(hub, source, remote).run()
+    if entry is None or entry.size != size:
+        raise RuntimeError(f"CompleteUpload returned {entry!r}")
+    with open(source, "rb") as f:
+        return f.read()
+
+async def run(args):
+    hub = HubClient(args.hub_url, api_key=API_KEY, bulk_window=None)
+    await hub.start()
+    remote = args.remote_dir.rstrip("\\/") + "\\omnisync_stream_proxy_test.bin"
+    size = args.megabytes << 20
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            content = await upload(hub, directory, remote, size)
+            # Room for two thirds of the file, so a full read has to evict
+            cache = BlockCache(os.path.join(directory, "cache"), capacity=size * 2 // 3)
+            proxy = StreamProxy(hub, cache)
+            server = await proxy.serve("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+
+            status, body = await fetch(port, remote)
+            if status != 200 or body != content:
+                logger.error(f"FAILURE: full read returned HTTP {status} with {len(body)} bytes differing from the upload.")
+                return 1
+            if cache.used > cache.capacity or not cache.evictions:
+                logger.error(f"FAILURE: cache holds {cache.used} bytes with a cap of {cache.capacity} ({cache.evictions} evictions).")
+                return 1
+            logger.info(f"Full read matched; {cache.evictions} blocks evicted to stay within {cache.capacity} bytes.")
+
+            rng = random.Random(1)
+            seeks = [(first, min(size - 1, first + rng.randrange(1, 3 * BLOCK_SIZE))) for first in
+                     (rng.randrange(size) for _ in range(8))]
+            for first, last in seeks:
+                status, body = await fetch(port, remote, first, last)
+                if status != 206 or body != content[first:last + 1]:
+                    logger.error(f"FAILURE: bytes {first}-{last} returned HTTP {status} and differ from the upload.")
+                    return 1
+            upstream = proxy.upstream_requests
+            for first, last in seeks:
+                await fetch(port, remote, first, last)
+            if proxy.upstream_requests != upstream:
+                logger.error(f"FAILURE: repeating the seeks went to the hub {proxy.upstream_requests - upstream} times.")
+                return 1
+            logger.info(f"{len(seeks)} seeks matched; replaying them was served entirely from the cache.")
+
+            invalidations = proxy.invalidations
+            content = await upload(hub, directory, remote, size)
+            for _ in range(50):
+                if proxy.invalidations != invalidations:
+                    break
+                await asyncio.sleep(0.1)
+            else:
+                logger.warning("No FileChanged within 5 s; relying on the proxy's ETag check.")
+                cache.file(remote).validated = None
+            first, last = seeks[0]
+            status, body = await fetch(port, remote, first, last)
+            if body != content[first:last + 1]:
+                logger.error("FAILURE: the proxy served the old content after the file changed.")
+                return 1
+            logger.info("SUCCESS: the proxy served the new content after the file changed.")
+            server.close()
+            await server.wait_closed()
+            return 0
+    finally:
+        await hub.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check StreamProxy against the hub's /api/stream.")
+    parser.add_argument("remote_dir", nargs="?", default="C:\\Temp", help="Writable directory on the hub's PC")
+    parser.add_argument("--megabytes", type=int, default=24)
+    parser.add_argument("--hub-url", nargs="+", default=hub_urls())
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+if __name__ == "__main__":
+    main()